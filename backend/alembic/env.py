@@ -12,6 +12,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from app.db.database import Base
+from app.db import models  # noqa: F401  (registers tables on Base.metadata)
 from app.core.config import settings
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,54 @@
+"""index pack for hot query predicates
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns)
+INDEXES = [
+    ('ix_inventories_product_fifo', 'inventories', ['product_id', 'created_at', 'quantity', 'expiry_date']),
+    ('ix_bargain_rooms_type_status_created_at', 'bargain_rooms', ['room_type', 'status', 'created_at', 'expires_at']),
+    ('ix_bargain_rooms_type_status_pincode', 'bargain_rooms', ['room_type', 'status', 'location_pincode', 'created_at', 'expires_at']),
+    ('ix_bargain_bids_room_id_created_at', 'bargain_bids', ['room_id', 'created_at']),
+    ('ix_bargain_messages_room_id_created_at', 'bargain_messages', ['room_id', 'created_at']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_group_order_participants_order_id_buyer_id', 'group_order_participants', ['order_id', 'buyer_id']),
+    ('ix_orders_buyer_id_order_date', 'orders', ['buyer_id', 'order_date']),
+    ('ix_orders_seller_id_order_date', 'orders', ['seller_id', 'order_date']),
+]
+
+
+def upgrade() -> None:
+    # Built concurrently so live tables are not locked against writes
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
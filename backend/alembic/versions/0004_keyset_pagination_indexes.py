@@ -0,0 +1,47 @@
+"""indexes for keyset pagination of list endpoints
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns); each ends in the (sort key, primary key) of a Keyset
+INDEXES = [
+    ('ix_products_created_at_product_id', 'products', ['created_at', 'product_id']),
+    ('ix_products_seller_id_created_at', 'products', ['seller_id', 'created_at', 'product_id']),
+    ('ix_inventories_user_id_created_at', 'inventories', ['user_id', 'created_at', 'inventory_id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
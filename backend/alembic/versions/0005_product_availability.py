@@ -0,0 +1,44 @@
+"""product availability projection
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 15:00:00.000000
+
+Rows are filled in by the availability sweeper on the next application
+start (app.db.availability.refresh_stale_availability), which computes the
+discounted prices with the same code as the write path.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('product_availability',
+    sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('available_quantity', sa.Integer(), nullable=False),
+    sa.Column('active_batches', sa.Integer(), nullable=False),
+    sa.Column('earliest_expiry', sa.Date(), nullable=True),
+    sa.Column('best_singletime_price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('best_subscription_price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('best_group_price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.product_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+    op.create_index('ix_product_availability_quantity', 'product_availability', ['available_quantity', 'product_id'], unique=False)
+    op.create_index('ix_product_availability_best_price', 'product_availability', ['best_singletime_price', 'product_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_availability_best_price', table_name='product_availability')
+    op.drop_index('ix_product_availability_quantity', table_name='product_availability')
+    op.drop_table('product_availability')
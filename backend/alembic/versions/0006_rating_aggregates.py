@@ -0,0 +1,62 @@
+"""running rating aggregates on products and sellers
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# (table, key column, average column, ratings table, ratings key column)
+AGGREGATES = [
+    ('products', 'product_id', 'rating', 'product_ratings', 'product_id'),
+    ('sellers', 'user_id', 'seller_rating', 'seller_ratings', 'seller_id'),
+]
+
+BACKFILL = """
+UPDATE {table} AS t
+SET rating_sum = a.rating_sum,
+    rating_count = a.rating_count,
+    rating_histogram = a.rating_histogram,
+    {average} = a.rating_sum::float / a.rating_count
+FROM (
+    SELECT {ratings_key} AS key,
+           sum(rating) AS rating_sum,
+           count(*) AS rating_count,
+           ARRAY[
+               count(*) FILTER (WHERE rating = 1),
+               count(*) FILTER (WHERE rating = 2),
+               count(*) FILTER (WHERE rating = 3),
+               count(*) FILTER (WHERE rating = 4),
+               count(*) FILTER (WHERE rating = 5)
+           ]::integer[] AS rating_histogram
+    FROM {ratings}
+    GROUP BY {ratings_key}
+) AS a
+WHERE t.{key} = a.key
+"""
+
+
+def upgrade() -> None:
+    for table, key, average, ratings, ratings_key in AGGREGATES:
+        op.add_column(table, sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('rating_histogram', postgresql.ARRAY(sa.Integer()), server_default='{0,0,0,0,0}', nullable=False))
+        # Fold in the ratings recorded before the aggregates existed
+        op.execute(BACKFILL.format(table=table, key=key, average=average, ratings=ratings, ratings_key=ratings_key))
+
+
+def downgrade() -> None:
+    for table, key, average, ratings, ratings_key in reversed(AGGREGATES):
+        op.drop_column(table, 'rating_histogram')
+        op.drop_column(table, 'rating_count')
+        op.drop_column(table, 'rating_sum')
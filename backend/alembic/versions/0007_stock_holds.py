@@ -0,0 +1,47 @@
+"""stock holds
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('stock_holds',
+    sa.Column('hold_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('inventory_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('buyer_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('order_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('participant_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['inventory_id'], ['inventories.inventory_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.product_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['buyer_id'], ['buyers.user_id'], ),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.order_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['participant_id'], ['group_order_participants.participant_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hold_id')
+    )
+    op.create_index('ix_stock_holds_expires_at', 'stock_holds', ['expires_at'], unique=False)
+    op.create_index('ix_stock_holds_order_id', 'stock_holds', ['order_id'], unique=False)
+    op.create_index('ix_stock_holds_participant_id', 'stock_holds', ['participant_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_holds_participant_id', table_name='stock_holds')
+    op.drop_index('ix_stock_holds_order_id', table_name='stock_holds')
+    op.drop_index('ix_stock_holds_expires_at', table_name='stock_holds')
+    op.drop_table('stock_holds')
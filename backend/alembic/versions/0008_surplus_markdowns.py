@@ -0,0 +1,42 @@
+"""surplus flags, markdown policies and expiry indexes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('inventories', sa.Column('is_surplus', sa.Boolean(), server_default='false', nullable=False))
+    op.add_column('inventories', sa.Column('surplus_discount', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_inventories_expiry_date', 'inventories', ['expiry_date'], unique=False)
+    op.create_index('ix_inventories_surplus_expiry', 'inventories', ['is_surplus', 'expiry_date'], unique=False)
+    op.create_table('markdown_policies',
+    sa.Column('seller_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('enabled', sa.Boolean(), nullable=False),
+    sa.Column('window_days', sa.Integer(), nullable=False),
+    sa.Column('start_discount', sa.Integer(), nullable=False),
+    sa.Column('end_discount', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['seller_id'], ['sellers.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('seller_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('markdown_policies')
+    op.drop_index('ix_inventories_surplus_expiry', table_name='inventories')
+    op.drop_index('ix_inventories_expiry_date', table_name='inventories')
+    op.drop_column('inventories', 'surplus_discount')
+    op.drop_column('inventories', 'is_surplus')
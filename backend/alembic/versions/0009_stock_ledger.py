@@ -0,0 +1,57 @@
+"""stock ledger
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('stock_movements',
+    sa.Column('movement_id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('inventory_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('quantity_delta', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('movement_id')
+    )
+    op.create_index('ix_stock_movements_product_id_created_at', 'stock_movements', ['product_id', 'created_at'], unique=False)
+    op.create_index('ix_stock_movements_created_at', 'stock_movements', ['created_at'], unique=False)
+    op.create_table('stock_snapshots',
+    sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('taken_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('received', sa.Integer(), nullable=False),
+    sa.Column('sold', sa.Integer(), nullable=False),
+    sa.Column('adjusted', sa.Integer(), nullable=False),
+    sa.Column('expired', sa.Integer(), nullable=False),
+    sa.Column('reserved', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('product_id', 'taken_at')
+    )
+    op.create_index('ix_stock_snapshots_taken_at', 'stock_snapshots', ['taken_at'], unique=False)
+    # Open the ledger with the current stock of every batch as its receipt
+    op.execute(
+        "INSERT INTO stock_movements (inventory_id, product_id, kind, quantity_delta, created_at) "
+        "SELECT inventory_id, product_id, 'receipt', quantity, coalesce(created_at, now()) "
+        "FROM inventories WHERE quantity <> 0"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_snapshots_taken_at', table_name='stock_snapshots')
+    op.drop_table('stock_snapshots')
+    op.drop_index('ix_stock_movements_created_at', table_name='stock_movements')
+    op.drop_index('ix_stock_movements_product_id_created_at', table_name='stock_movements')
+    op.drop_table('stock_movements')
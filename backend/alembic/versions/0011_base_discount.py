@@ -0,0 +1,28 @@
+"""base discount
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('inventories', sa.Column('base_discount', postgresql.ARRAY(sa.Integer()), nullable=True))
+    # Batches marked down so far lost their own tiers; take the current
+    # ones as the base so the markdown can at least be recomputed from here
+    op.execute("UPDATE inventories SET base_discount = discount WHERE is_surplus")
+
+
+def downgrade() -> None:
+    op.drop_column('inventories', 'base_discount')
@@ -9,6 +9,8 @@ from app.api.endpoints import (
     inventory,
     bargain,
     ratings,
+    surplus,
+    metrics,
 )
 
 api_router_v1 = APIRouter()
@@ -25,3 +27,5 @@ api_router_v1.include_router(ratings.router, prefix="/rating", tags=["Rating"])
 api_router_v1.include_router(
     bargain.router, prefix="/bargain", tags=["Live Bargaining"]
 )
+api_router_v1.include_router(surplus.router, prefix="/surplus", tags=["Surplus"])
+api_router_v1.include_router(metrics.router, tags=["Monitoring"])
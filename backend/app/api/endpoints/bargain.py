@@ -4,25 +4,38 @@ from fastapi import (
     HTTPException,
     status,
     Query,
+    Response,
     WebSocket,
     WebSocketDisconnect,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete, and_, or_, desc
-from typing import List, Optional
+from sqlalchemy import select, update, delete, and_, or_, desc, func
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
-import uuid
-import json
+import logging
 import uuid
 
-from app.db.database import get_db_session
+from jose import ExpiredSignatureError, JWTError
+
+from app.db.allocation import (
+    InsufficientStock,
+    ProductNotFound,
+    StockConflict,
+    reserve_items,
+)
+from app.db.availability import refresh_product_availability
+from app.db.database import AsyncSessionLocal, get_db_session, get_read_db_session
+from app.db.routing import get_replica_db_session
+from app.db.pagination import Keyset
+from app.core.responses import json_text
 from app.db.models import (
     BargainRoom,
     BargainBid,
     BargainMessage,
     BaseUser,
+    BaseUserInDB,
     Buyer,
     Seller,
     Product,
@@ -34,8 +47,17 @@ from app.db.models import (
     BargainMessageResponse,
     BargainRoomWithDetailsResponse,
     PublicBargainResponse,
+    UserRoles,
 )
-from app.core.security import get_current_user
+from app.core.security import (
+    decode_access_token,
+    get_current_user,
+    get_current_user_roles,
+    load_principal,
+    resolve_user_roles,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -59,15 +81,24 @@ class ConnectionManager:
 
     async def send_to_room(self, room_id: str, message: dict):
         if room_id in self.active_connections:
+            text = json_text(message)  # Encoded once for all participants
             for user_id, websocket in self.active_connections[room_id].items():
                 try:
-                    await websocket.send_text(json.dumps(message))
+                    await websocket.send_text(text)
                 except:
                     pass  # Connection closed
 
 
 manager = ConnectionManager()
 
+PUBLIC_BARGAIN_KEYSET = Keyset(BargainRoom.created_at, BargainRoom.room_id)
+# updated_at is NULL until a room is first modified
+MY_BARGAIN_KEYSET = Keyset(
+    func.coalesce(BargainRoom.updated_at, BargainRoom.created_at),
+    BargainRoom.room_id,
+    row_key=lambda room: (room.updated_at or room.created_at, room.room_id),
+)
+
 # === PUBLIC BARGAINING ENDPOINTS ===
 
 
@@ -80,17 +111,13 @@ async def create_public_bargain(
     bargain_data: BargainRoomCreate,
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Create a public bargaining room. Buyers place bids visible to all sellers in the area.
     """
     # Check if user is a buyer
-    buyer_result = await db.execute(
-        select(Buyer).where(Buyer.user_id == current_user.user_id)
-    )
-    buyer = buyer_result.scalar_one_or_none()
-
-    if not buyer:
+    if not roles.is_buyer:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only buyers can create public bargains",
@@ -134,23 +161,21 @@ async def create_public_bargain(
 
 @router.get("/public/available", response_model=List[PublicBargainResponse])
 async def get_available_public_bargains(
+    response: Response,
     location_pincode: Optional[str] = Query(None, description="Filter by location"),
     category: Optional[str] = Query(None, description="Filter by product category"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db_session),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_replica_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Get available public bargains for sellers to respond to.
     """
     # Check if user is a seller
-    seller_result = await db.execute(
-        select(Seller).where(Seller.user_id == current_user.user_id)
-    )
-    seller = seller_result.scalar_one_or_none()
-
-    if not seller:
+    if not roles.is_seller:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only sellers can view public bargains",
@@ -177,11 +202,13 @@ async def get_available_public_bargains(
         query = query.where(Product.category.ilike(f"%{category}%"))
 
     # Add pagination and ordering
-    query = query.order_by(desc(BargainRoom.created_at)).offset(skip).limit(limit)
+    query = PUBLIC_BARGAIN_KEYSET.apply(query, cursor, skip, limit)
 
     result = await db.execute(query)
     bargain_rooms = result.scalars().all()
 
+    PUBLIC_BARGAIN_KEYSET.set_next_cursor(response, bargain_rooms, limit)
+
     # Format response with product details
     public_bargains = []
     for room in bargain_rooms:
@@ -228,17 +255,13 @@ async def create_private_bargain(
     bargain_data: BargainRoomCreate,
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Create a private bargaining room between specific buyer and seller.
     """
     # Check if user is a buyer
-    buyer_result = await db.execute(
-        select(Buyer).where(Buyer.user_id == current_user.user_id)
-    )
-    buyer = buyer_result.scalar_one_or_none()
-
-    if not buyer:
+    if not roles.is_buyer:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only buyers can initiate private bargains",
@@ -297,11 +320,13 @@ async def create_private_bargain(
     return bargain_room
 @router.get("/my-bargains", response_model=List[BargainRoomResponse])
 async def get_my_bargains(
+    response: Response,
     room_type: Optional[str] = Query(None, pattern="^(public|private)$"),
     status: Optional[str] = Query(None, pattern="^(active|closed|accepted|rejected)$"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db_session),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_read_db_session),
     current_user: BaseUser = Depends(get_current_user),
 ):
     """
@@ -323,11 +348,13 @@ async def get_my_bargains(
         query = query.where(BargainRoom.status == status)
 
     # Add pagination and ordering
-    query = query.order_by(desc(BargainRoom.updated_at)).offset(skip).limit(limit)
+    query = MY_BARGAIN_KEYSET.apply(query, cursor, skip, limit)
 
     result = await db.execute(query)
     bargain_rooms = result.scalars().all()
 
+    MY_BARGAIN_KEYSET.set_next_cursor(response, bargain_rooms, limit)
+
     return bargain_rooms
 
 @router.post(
@@ -340,17 +367,13 @@ async def respond_to_public_bargain(
     bid_data: BargainBidCreate,
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Seller responds to a public bargain with their offer.
     """
     # Check if user is a seller
-    seller_result = await db.execute(
-        select(Seller).where(Seller.user_id == current_user.user_id)
-    )
-    seller = seller_result.scalar_one_or_none()
-
-    if not seller:
+    if not roles.is_seller:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only sellers can respond to public bargains",
@@ -430,6 +453,7 @@ async def place_bid_in_room(
     bid_data: BargainBidCreate,
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Place a bid in a bargaining room (both public and private).
@@ -454,10 +478,7 @@ async def place_bid_in_room(
         user_type = "buyer"
     elif room.seller_id == current_user.user_id or room.room_type == "public":
         # For public rooms, any seller can participate
-        seller_result = await db.execute(
-            select(Seller).where(Seller.user_id == current_user.user_id)
-        )
-        if seller_result.scalar_one_or_none():
+        if roles.is_seller:
             user_type = "seller"
 
     if not user_type:
@@ -573,6 +594,20 @@ async def accept_bargain(
         order_buyer_id = room.buyer_id
         order_seller_id = room.seller_id
 
+    # Take the bargained units out of the seller's batches (FIFO); the
+    # agreed bid price replaces the batch discounts
+    try:
+        await reserve_items(
+            db, [(room.product_id, bid.quantity)], seller_id=order_seller_id
+        )
+    except (ProductNotFound, InsufficientStock) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except StockConflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock is changing too quickly, please retry",
+        )
+
     try:
         # Import Order and OrderItem models
         from app.db.models import Order, OrderItem
@@ -600,6 +635,8 @@ async def accept_bargain(
         
         db.add(order_item)
         
+        await refresh_product_availability(db, room.product_id)
+
         # Close the bargain room
         room.status = "accepted"
         
@@ -651,8 +688,9 @@ async def accept_bargain(
 @router.get("/{room_id}", response_model=BargainRoomWithDetailsResponse)
 async def get_bargain_room_details(
     room_id: str,
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Get detailed information about a bargaining room.
@@ -674,10 +712,7 @@ async def get_bargain_room_details(
         has_access = True
     elif room.room_type == "public":
         # Public rooms are viewable by all sellers
-        seller_result = await db.execute(
-            select(Seller).where(Seller.user_id == current_user.user_id)
-        )
-        if seller_result.scalar_one_or_none():
+        if roles.is_seller:
             has_access = True
 
     if not has_access:
@@ -737,20 +772,13 @@ async def get_bargain_room_details(
 
 
 async def get_user_from_websocket_token(
-    websocket: WebSocket, db: AsyncSession
-) -> Optional[BaseUser]:
+    websocket: WebSocket,
+) -> Optional[Tuple[BaseUserInDB, UserRoles]]:
     """
     Extract and validate JWT token from WebSocket connection.
+    Uses the same token and principal caches as the REST dependencies, so a
+    reconnecting client is usually authenticated without touching the database.
     """
-    try:
-        import jwt as pyjwt  # PyJWT library
-    except ImportError:
-        print("PyJWT library not installed. Run: pip install PyJWT")
-        await websocket.close(code=4001, reason="JWT library not available")
-        return None
-        
-    from sqlalchemy import select
-    
     # Try to get token from query parameters first
     token = websocket.query_params.get("token")
 
@@ -758,112 +786,71 @@ async def get_user_from_websocket_token(
         await websocket.close(code=4001, reason="No authentication token provided")
         return None
 
-    try:
-        # Accept the WebSocket connection first
-        await websocket.accept()
-        
-        # Get the secret key - let's try to import it properly
-        try:
-            from app.core.config import settings
-            secret_key = settings.SECRET_KEY
-        except ImportError:
-            try:
-                from app.core.config import SECRET_KEY
-                secret_key = SECRET_KEY
-            except ImportError:
-                try:
-                    # Try different config patterns
-                    from app.core import config
-                    secret_key = "your_very_secret_key_here_please_change_this_in_production"
-                except ImportError:
-                    # Last resort - check environment or use a default for testing
-                    import os
-                    secret_key = os.getenv("SECRET_KEY", "your_very_secret_key_here_please_change_this_in_production")
-                    print(f"Using fallback SECRET_KEY from environment or default")
-        
-        print(f"Using SECRET_KEY for JWT verification")
-        
-        # Decode JWT token
-        payload = pyjwt.decode(token, secret_key, algorithms=["HS256"])
-        email = payload.get("sub")
-        user_id = payload.get("user_id")
-
-        if not email:
-            await websocket.send_text(
-                json.dumps({"type": "error", "message": "Invalid token - no email"})
-            )
-            await websocket.close()
-            return None
-
-        # Get user from database
-        result = await db.execute(select(BaseUser).where(BaseUser.email == email))
-        user = result.scalar_one_or_none()
+    # Accept the WebSocket connection first
+    await websocket.accept()
 
-        if not user:
-            await websocket.send_text(
-                json.dumps({"type": "error", "message": "User not found"})
-            )
-            await websocket.close()
-            return None
-
-        # Send authentication success
-        await websocket.send_text(
-            json.dumps(
-                {
-                    "type": "auth_success",
-                    "message": "Successfully authenticated",
-                    "user_id": str(user.user_id),
-                }
-            )
-        )
-
-        return user
-
-    except pyjwt.ExpiredSignatureError:
+    try:
+        payload = decode_access_token(token)
+    except ExpiredSignatureError:
         await websocket.send_text(
-            json.dumps({"type": "error", "message": "Token has expired"})
+            json_text({"type": "error", "message": "Token has expired"})
         )
         await websocket.close()
         return None
-    except pyjwt.InvalidTokenError as e:
+    except JWTError as e:
         await websocket.send_text(
-            json.dumps({"type": "error", "message": f"Invalid token: {str(e)}"})
+            json_text({"type": "error", "message": f"Invalid token: {str(e)}"})
         )
         await websocket.close()
         return None
-    except Exception as e:
-        print(f"Authentication error: {str(e)}")
-        await websocket.send_text(
-            json.dumps({"type": "error", "message": f"Authentication failed: {str(e)}"})
+
+    # Short-lived session, only opened on a cache miss
+    async with AsyncSessionLocal() as db:
+        user = await load_principal(db, payload["sub"])
+        if user is None:
+            await websocket.send_text(
+                json_text({"type": "error", "message": "User not found"})
+            )
+            await websocket.close()
+            return None
+        roles = await resolve_user_roles(db, payload, user.user_id)
+
+    # Send authentication success
+    await websocket.send_text(
+        json_text(
+            {
+                "type": "auth_success",
+                "message": "Successfully authenticated",
+                "user_id": str(user.user_id),
+            }
         )
-        await websocket.close()
-        return None
+    )
+
+    return user, roles
 
 
-async def verify_room_access(user: BaseUser, room_id: str, db: AsyncSession) -> bool:
+async def verify_room_access(
+    user: BaseUserInDB, roles: UserRoles, room_id: str, db: AsyncSession
+) -> Optional[BargainRoom]:
     """
-    Verify if user has access to the bargaining room.
+    Return the bargaining room if the user has access to it, otherwise None.
     """
-    # Get bargain room
     room_result = await db.execute(
         select(BargainRoom).where(BargainRoom.room_id == room_id)
     )
     room = room_result.scalar_one_or_none()
 
     if not room:
-        return False
+        return None
 
     # Check access permissions
     if room.buyer_id == user.user_id or room.seller_id == user.user_id:
-        return True
-    elif room.room_type == "public":
+        return room
+    elif room.room_type == "public" and roles.is_seller:
         # Public rooms are accessible by all sellers
-        seller_result = await db.execute(
-            select(Seller).where(Seller.user_id == user.user_id)
-        )
-        return seller_result.scalar_one_or_none() is not None
+        return room
 
-    return False
+    return None
 
 
 # === WEBSOCKET ENDPOINT FOR REAL-TIME UPDATES ===
@@ -873,35 +860,26 @@ async def verify_room_access(user: BaseUser, room_id: str, db: AsyncSession) ->
 async def websocket_endpoint(websocket: WebSocket, room_id: str):
     """
     WebSocket endpoint for real-time bargaining updates.
+    Database sessions are opened per operation rather than held for the
+    lifetime of the socket, so idle connections don't pin pool connections.
     """
-    print(f"WebSocket connection attempt for room: {room_id}")
-    print(f"WebSocket headers: {websocket.headers}")
-    print(f"WebSocket query params: {websocket.query_params}")
-    
-    db = None
+    logger.debug("WebSocket connection attempt for room %s", room_id)
+
     user = None
 
     try:
-        # Get database session - create a new session instead of using the generator
-        from app.db.database import AsyncSessionLocal
-        db = AsyncSessionLocal()
-
-        print("Database session obtained")
-
         # Authenticate user (this will accept the WebSocket and authenticate)
-        user = await get_user_from_websocket_token(websocket, db)
-        if not user:
-            print("Authentication failed")
+        auth = await get_user_from_websocket_token(websocket)
+        if not auth:
             return  # Connection already closed in auth function
-
-        print(f"User authenticated: {user.email}")
+        user, roles = auth
 
         # Verify room access
-        has_access = await verify_room_access(user, room_id, db)
-        if not has_access:
-            print(f"Access denied for user {user.email} to room {room_id}")
+        async with AsyncSessionLocal() as db:
+            room = await verify_room_access(user, roles, room_id, db)
+        if not room:
             await websocket.send_text(
-                json.dumps(
+                json_text(
                     {
                         "type": "error",
                         "message": "You don't have access to this bargaining room",
@@ -911,15 +889,10 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
             await websocket.close()
             return
 
-        print(f"Access granted for user {user.email} to room {room_id}")
-
         # Connect user to room
         user_id = str(user.user_id)
-        if room_id not in manager.active_connections:
-            manager.active_connections[room_id] = {}
-        manager.active_connections[room_id][user_id] = websocket
-
-        print(f"User {user_id} connected to room {room_id}")
+        await manager.connect(websocket, room_id, user_id)
+        logger.debug("User %s connected to room %s", user_id, room_id)
 
         # Notify other users that someone joined
         await manager.send_to_room(
@@ -932,13 +905,8 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
         )
 
         # Send room information to newly connected user
-        room_result = await db.execute(
-            select(BargainRoom).where(BargainRoom.room_id == room_id)
-        )
-        room = room_result.scalar_one()
-
         await websocket.send_text(
-            json.dumps(
+            json_text(
                 {
                     "type": "room_info",
                     "room": {
@@ -952,8 +920,6 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
             )
         )
 
-        print("Initial room data sent")
-
         # Listen for messages
         while True:
             try:
@@ -961,12 +927,10 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
                 message_data = json.loads(data)
                 message_type = message_data.get("type")
 
-                print(f"Received message type: {message_type}")
-
                 if message_type == "ping":
                     # Respond to ping to keep connection alive
                     await websocket.send_text(
-                        json.dumps(
+                        json_text(
                             {"type": "pong", "timestamp": datetime.utcnow().isoformat()}
                         )
                     )
@@ -988,15 +952,16 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
                     content = message_data.get("content", "").strip()
                     if content:
                         # Save message to database
-                        chat_message = BargainMessage(
-                            room_id=room_id,
-                            user_id=user.user_id,
-                            message_type="text",
-                            content=content,
-                        )
-                        db.add(chat_message)
-                        await db.commit()
-                        await db.refresh(chat_message)
+                        async with AsyncSessionLocal() as db:
+                            chat_message = BargainMessage(
+                                room_id=room_id,
+                                user_id=user.user_id,
+                                message_type="text",
+                                content=content,
+                            )
+                            db.add(chat_message)
+                            await db.commit()
+                            await db.refresh(chat_message)
 
                         # Broadcast to all users in room
                         await manager.send_to_room(
@@ -1014,24 +979,25 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
 
                 elif message_type == "get_recent_activity":
                     # Send recent bids and messages to user
-                    bids_result = await db.execute(
-                        select(BargainBid)
-                        .where(BargainBid.room_id == room_id)
-                        .order_by(desc(BargainBid.created_at))
-                        .limit(10)
-                    )
-                    recent_bids = bids_result.scalars().all()
+                    async with AsyncSessionLocal() as db:
+                        bids_result = await db.execute(
+                            select(BargainBid)
+                            .where(BargainBid.room_id == room_id)
+                            .order_by(desc(BargainBid.created_at))
+                            .limit(10)
+                        )
+                        recent_bids = bids_result.scalars().all()
 
-                    messages_result = await db.execute(
-                        select(BargainMessage)
-                        .where(BargainMessage.room_id == room_id)
-                        .order_by(desc(BargainMessage.created_at))
-                        .limit(20)
-                    )
-                    recent_messages = messages_result.scalars().all()
+                        messages_result = await db.execute(
+                            select(BargainMessage)
+                            .where(BargainMessage.room_id == room_id)
+                            .order_by(desc(BargainMessage.created_at))
+                            .limit(20)
+                        )
+                        recent_messages = messages_result.scalars().all()
 
                     await websocket.send_text(
-                        json.dumps(
+                        json_text(
                             {
                                 "type": "recent_activity",
                                 "bids": [
@@ -1061,7 +1027,7 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
                 else:
                     # Unknown message type
                     await websocket.send_text(
-                        json.dumps(
+                        json_text(
                             {
                                 "type": "error",
                                 "message": f"Unknown message type: {message_type}",
@@ -1070,13 +1036,13 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
                     )
 
             except WebSocketDisconnect:
-                print(f"WebSocket disconnected for user {user_id}")
+                logger.debug("WebSocket disconnected for user %s", user_id)
                 break
-            except Exception as e:
-                print(f"Error processing WebSocket message: {e}")
+            except Exception:
+                logger.exception("Error processing WebSocket message")
                 try:
                     await websocket.send_text(
-                        json.dumps(
+                        json_text(
                             {
                                 "type": "error", 
                                 "message": "Error processing message"
@@ -1087,14 +1053,14 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
                     break
 
     except WebSocketDisconnect:
-        print("WebSocket disconnect during setup")
-    except Exception as e:
+        logger.debug("WebSocket disconnect during setup")
+    except Exception:
         # Log error and close connection
-        print(f"WebSocket error during setup: {e}")
+        logger.exception("WebSocket error during setup")
         try:
             if websocket.client_state != 3:  # Not DISCONNECTED
                 await websocket.send_text(
-                    json.dumps({"type": "error", "message": "Internal server error"})
+                    json_text({"type": "error", "message": "Internal server error"})
                 )
                 await websocket.close()
         except:
@@ -1104,7 +1070,6 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
         if user:
             user_id = str(user.user_id)
             manager.disconnect(room_id, user_id)
-            print(f"Cleaned up connection for user {user_id}")
 
             # Notify other users that someone left
             try:
@@ -1118,9 +1083,3 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
                 )
             except:
                 pass  # Room might be empty now
-
-        if db:
-            try:
-                await db.close()
-            except:
-                pass  # Session might already be closed
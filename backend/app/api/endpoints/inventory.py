@@ -1,11 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, and_
 from typing import List, Optional
-from datetime import date
+import uuid
+from datetime import date, datetime, timezone
 from decimal import Decimal
 
-from app.db.database import get_db_session
+from app.api.serializers import inventory_row
+from app.core.responses import json_rows
+from app.db.allocation import (
+    InsufficientStock,
+    ItemAllocation,
+    ProductNotFound,
+    allocate,
+    allocate_items,
+    load_stock,
+)
+from app.db.availability import refresh_product_availability
+from app.db.database import get_db_session, get_read_db_session
+from app.db.ledger import movement_report, record_movements, stock_totals_at
+from app.db.pagination import Keyset
+from app.db.stock import stock_cache
+from app.db.surplus import clear_markdown, set_markdown, surplus_feed
 from app.db.models import (
     Inventory,
     Product,
@@ -15,115 +31,134 @@ from app.db.models import (
     InventoryUpdate,
     InventoryResponse,
     DiscountStructure,
+    PricingQuoteRequest,
+    StockAtTime,
+    StockLevel,
+    StockMovementReport,
+    UserRoles,
 )
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_roles
 
 router = APIRouter()
 
+INVENTORY_KEYSET = Keyset(Inventory.created_at, Inventory.inventory_id)
+
 
 # Surplus Endpoints for Seller
-# @router.post("/mark-surplus/{inventory_id}")
-# async def mark_inventory_surplus(
-#     inventory_id: str,
-#     db: AsyncSession = Depends(get_db_session),
-#     current_user: BaseUser = Depends(get_current_user),
-# ):
-#     """
-#     Mark an inventory batch as surplus (if near expiry).
-#     """
-#     # Check if user is a seller
-#     seller_result = await db.execute(
-#         select(Seller).where(Seller.user_id == current_user.user_id)
-#     )
-#     seller = seller_result.scalar_one_or_none()
-#     if not seller:
-#         raise HTTPException(
-#             status_code=status.HTTP_403_FORBIDDEN,
-#             detail="Only sellers can manage inventory",
-#         )
-#     # Get inventory batch
-#     inventory_result = await db.execute(
-#         select(Inventory).where(
-#             and_(
-#                 Inventory.inventory_id == inventory_id,
-#                 Inventory.user_id == current_user.user_id,
-#             )
-#         )
-#     )
-#     inventory = inventory_result.scalar_one_or_none()
-#     if not inventory:
-#         raise HTTPException(
-#             status_code=status.HTTP_404_NOT_FOUND, detail="Inventory batch not found"
-#         )
-#     inventory.is_surplus = True
-#     await db.commit()
-#     await db.refresh(inventory)
-#     return inventory
-
-
-# @router.post("/update-surplus-discount/{inventory_id}")
-# async def update_surplus_discount(
-#     inventory_id: str,
-#     discount: float,
-#     db: AsyncSession = Depends(get_db_session),
-#     current_user: BaseUser = Depends(get_current_user),
-# ):
-#     """
-#     Update discount for surplus inventory batch.
-#     """
-#     seller_result = await db.execute(
-#         select(Seller).where(Seller.user_id == current_user.user_id)
-#     )
-#     seller = seller_result.scalar_one_or_none()
-#     if not seller:
-#         raise HTTPException(
-#             status_code=status.HTTP_403_FORBIDDEN,
-#             detail="Only sellers can manage inventory",
-#         )
-#     inventory_result = await db.execute(
-#         select(Inventory).where(
-#             and_(
-#                 Inventory.inventory_id == inventory_id,
-#                 Inventory.user_id == current_user.user_id,
-#                 Inventory.is_surplus == True,
-#             )
-#         )
-#     )
-#     inventory = inventory_result.scalar_one_or_none()
-#     if not inventory:
-#         raise HTTPException(
-#             status_code=status.HTTP_404_NOT_FOUND,
-#             detail="Surplus inventory batch not found",
-#         )
-#     inventory.discount = discount
-#     await db.commit()
-#     await db.refresh(inventory)
-#     return inventory
-
-
-# @router.get("/my-surplus-items", response_model=List[InventoryResponse])
-# async def list_my_surplus_items(
-#     db: AsyncSession = Depends(get_db_session),
-#     current_user: BaseUser = Depends(get_current_user),
-# ):
-#     """
-#     List all surplus inventory batches for the current seller.
-#     """
-#     seller_result = await db.execute(
-#         select(Seller).where(Seller.user_id == current_user.user_id)
-#     )
-#     seller = seller_result.scalar_one_or_none()
-#     if not seller:
-#         raise HTTPException(
-#             status_code=status.HTTP_403_FORBIDDEN,
-#             detail="Only sellers can view inventory",
-#         )
-#     query = select(Inventory).where(
-#         and_(Inventory.user_id == current_user.user_id, Inventory.is_surplus == True)
-#     )
-#     result = await db.execute(query)
-#     surplus_batches = result.scalars().all()
-#     return surplus_batches
+@router.post("/mark-surplus/{inventory_id}", response_model=InventoryResponse)
+async def mark_inventory_surplus(
+    inventory_id: str,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
+):
+    """
+    Mark an inventory batch as surplus (if near expiry).
+    The markdown job flags batches in their markdown window on its own.
+    """
+    if not roles.is_seller:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only sellers can manage inventory",
+        )
+
+    inventory_result = await db.execute(
+        select(Inventory).where(
+            and_(
+                Inventory.inventory_id == inventory_id,
+                Inventory.user_id == current_user.user_id,
+            )
+        )
+    )
+    inventory = inventory_result.scalar_one_or_none()
+
+    if not inventory:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Inventory batch not found"
+        )
+
+    inventory.is_surplus = True
+    await db.commit()
+    await db.refresh(inventory)
+    surplus_feed.mark_stale()
+
+    return InventoryResponse.from_orm_with_discount(inventory)
+
+
+@router.post("/update-surplus-discount/{inventory_id}", response_model=InventoryResponse)
+async def update_surplus_discount(
+    inventory_id: str,
+    discount: int = Query(..., ge=0, le=100, description="Markdown in percent"),
+    db: AsyncSession = Depends(get_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
+):
+    """
+    Mark down a surplus inventory batch by hand. Like the markdown job, this
+    raises every one of the batch's own discount tiers to at least the
+    markdown; a lower markdown than before brings prices back down. The
+    seller's markdown policy still applies on the next run.
+    """
+    if not roles.is_seller:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only sellers can manage inventory",
+        )
+
+    inventory_result = await db.execute(
+        select(Inventory).where(
+            and_(
+                Inventory.inventory_id == inventory_id,
+                Inventory.user_id == current_user.user_id,
+                Inventory.is_surplus.is_(True),
+            )
+        )
+    )
+    inventory = inventory_result.scalar_one_or_none()
+
+    if not inventory:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Surplus inventory batch not found",
+        )
+
+    set_markdown(inventory, discount)
+    await refresh_product_availability(db, inventory.product_id)
+    await db.commit()
+    await db.refresh(inventory)
+    surplus_feed.mark_stale()
+
+    return InventoryResponse.from_orm_with_discount(inventory)
+
+
+@router.get("/my-surplus-items", response_model=List[InventoryResponse])
+async def list_my_surplus_items(
+    db: AsyncSession = Depends(get_read_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
+):
+    """
+    List all surplus inventory batches for the current seller, soonest expiry first.
+    """
+    if not roles.is_seller:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only sellers can view inventory",
+        )
+
+    result = await db.execute(
+        select(Inventory)
+        .where(
+            and_(
+                Inventory.user_id == current_user.user_id,
+                Inventory.is_surplus.is_(True),
+            )
+        )
+        .order_by(Inventory.expiry_date, Inventory.inventory_id)
+    )
+    surplus_batches = result.scalars().all()
+
+    return json_rows([inventory_row(batch) for batch in surplus_batches])
 
 
 @router.post(
@@ -133,18 +168,14 @@ async def add_inventory_batch(
     inventory_data: InventoryCreate,
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Add a new inventory batch for an existing product.
     Seller can add multiple batches of the same product with different expiry/discount.
     """
     # Check if user is a seller
-    seller_result = await db.execute(
-        select(Seller).where(Seller.user_id == current_user.user_id)
-    )
-    seller = seller_result.scalar_one_or_none()
-
-    if not seller:
+    if not roles.is_seller:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only sellers can manage inventory",
@@ -177,6 +208,11 @@ async def add_inventory_batch(
     )
 
     db.add(inventory)
+    await db.flush()  # Get inventory_id
+    await record_movements(
+        db, [(inventory.inventory_id, inventory.product_id, "receipt", inventory.quantity)]
+    )
+    await refresh_product_availability(db, inventory.product_id)
     await db.commit()
     await db.refresh(inventory)
 
@@ -190,30 +226,29 @@ async def update_inventory_batch(
     inventory_update: InventoryUpdate,
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Update a specific inventory batch (quantity, discount, expiry).
     """
     # Check if user is a seller
-    seller_result = await db.execute(
-        select(Seller).where(Seller.user_id == current_user.user_id)
-    )
-    seller = seller_result.scalar_one_or_none()
-
-    if not seller:
+    if not roles.is_seller:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only sellers can manage inventory",
         )
 
-    # Get inventory batch
+    # Get inventory batch, locked so the ledger adjustment is computed from
+    # the quantity concurrent orders left
     inventory_result = await db.execute(
-        select(Inventory).where(
+        select(Inventory)
+        .where(
             and_(
                 Inventory.inventory_id == inventory_id,
                 Inventory.user_id == current_user.user_id,
             )
         )
+        .with_for_update()
     )
     inventory = inventory_result.scalar_one_or_none()
 
@@ -221,16 +256,44 @@ async def update_inventory_batch(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Inventory batch not found"
         )
+    previous_quantity = inventory.quantity
+    previous_expiry_date = inventory.expiry_date
 
     # Update fields if provided
     update_data = inventory_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         if field == "discount" and value is not None:
             # Convert discount structure to array for storage
-            setattr(inventory, field, value.to_array())
+            if inventory.base_discount is not None:
+                # Marked down: the new tiers are the base of the markdown
+                inventory.base_discount = value.to_array()
+                set_markdown(inventory, inventory.surplus_discount)
+            else:
+                inventory.discount = value.to_array()
         else:
             setattr(inventory, field, value)
 
+    # A new expiry date (e.g. restocked) starts the batch over; the markdown
+    # job flags it again if it is still in its markdown window
+    if inventory.expiry_date != previous_expiry_date and (
+        inventory.is_surplus or inventory.base_discount is not None
+    ):
+        clear_markdown(inventory)
+        inventory.is_surplus = False
+        surplus_feed.mark_stale()
+
+    await record_movements(
+        db,
+        [
+            (
+                inventory.inventory_id,
+                inventory.product_id,
+                "adjustment",
+                inventory.quantity - previous_quantity,
+            )
+        ],
+    )
+    await refresh_product_availability(db, inventory.product_id)
     await db.commit()
     await db.refresh(inventory)
 
@@ -242,7 +305,7 @@ async def update_inventory_batch(
 async def get_product_inventory(
     product_id: str,
     show_expired: bool = Query(False, description="Include expired batches"),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
     current_user: BaseUser = Depends(get_current_user),
 ):
     """
@@ -262,31 +325,27 @@ async def get_product_inventory(
     result = await db.execute(query)
     inventory_batches = result.scalars().all()
 
-    # Convert to proper response format with discount structures
-    return [
-        InventoryResponse.from_orm_with_discount(batch) for batch in inventory_batches
-    ]
+    # Serialize the rows directly, discount arrays as discount structures
+    return json_rows([inventory_row(batch) for batch in inventory_batches])
 
 
 @router.get("/my-inventory", response_model=List[InventoryResponse])
 async def get_my_inventory(
+    response: Response,
     product_name: Optional[str] = Query(None, description="Filter by product name"),
     show_expired: bool = Query(False, description="Include expired batches"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: AsyncSession = Depends(get_db_session),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_read_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Get all inventory batches for the current seller.
     """
     # Check if user is a seller
-    seller_result = await db.execute(
-        select(Seller).where(Seller.user_id == current_user.user_id)
-    )
-    seller = seller_result.scalar_one_or_none()
-
-    if not seller:
+    if not roles.is_seller:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only sellers can view inventory",
@@ -308,16 +367,17 @@ async def get_my_inventory(
             (Inventory.expiry_date.is_(None)) | (Inventory.expiry_date >= today)
         )
 
-    # Add pagination
-    query = query.offset(skip).limit(limit)
+    # Add pagination (newest batches first)
+    query = INVENTORY_KEYSET.apply(query, cursor, skip, limit)
 
     result = await db.execute(query)
     inventory_batches = result.scalars().all()
+    INVENTORY_KEYSET.set_next_cursor(response, inventory_batches, limit)
 
-    # Convert to proper response format with discount structures
-    return [
-        InventoryResponse.from_orm_with_discount(batch) for batch in inventory_batches
-    ]
+    # Serialize the rows directly, discount arrays as discount structures
+    return json_rows(
+        [inventory_row(batch) for batch in inventory_batches], headers=response.headers
+    )
 
 
 @router.delete("/delete/{inventory_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -325,30 +385,28 @@ async def delete_inventory_batch(
     inventory_id: str,
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Delete a specific inventory batch.
     """
     # Check if user is a seller
-    seller_result = await db.execute(
-        select(Seller).where(Seller.user_id == current_user.user_id)
-    )
-    seller = seller_result.scalar_one_or_none()
-
-    if not seller:
+    if not roles.is_seller:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only sellers can manage inventory",
         )
 
-    # Get inventory batch
+    # Get inventory batch, locked like in update_inventory_batch
     inventory_result = await db.execute(
-        select(Inventory).where(
+        select(Inventory)
+        .where(
             and_(
                 Inventory.inventory_id == inventory_id,
                 Inventory.user_id == current_user.user_id,
             )
         )
+        .with_for_update()
     )
     inventory = inventory_result.scalar_one_or_none()
 
@@ -358,23 +416,138 @@ async def delete_inventory_batch(
         )
 
     await db.execute(delete(Inventory).where(Inventory.inventory_id == inventory_id))
+    await record_movements(
+        db,
+        [
+            (
+                inventory.inventory_id,
+                inventory.product_id,
+                "adjustment",
+                # Expired units were already booked as expiry
+                -(inventory.quantity - inventory.written_off_quantity),
+            )
+        ],
+    )
+    await refresh_product_availability(db, inventory.product_id)
     await db.commit()
 
     return {"message": "Inventory batch deleted successfully"}
 
 
+@router.get("/stock", response_model=List[StockLevel])
+async def get_stock_levels(
+    product_ids: List[uuid.UUID] = Query(..., max_length=200),
+    db: AsyncSession = Depends(get_read_db_session),
+):
+    """
+    Available stock of several products, e.g. for product cards. Served from
+    this worker's stock cache; misses are summed in one aggregate query.
+    """
+    levels = await stock_cache.get_many(db, product_ids)
+    return [levels[product_id] for product_id in dict.fromkeys(product_ids)]
+
+
+def _as_utc(moment: datetime) -> datetime:
+    """Query timestamps without an offset are taken as UTC."""
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+async def _check_ledger_access(
+    db: AsyncSession, product_id: uuid.UUID, current_user: BaseUser, roles: UserRoles
+) -> None:
+    if not roles.is_seller:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only sellers can view the stock ledger",
+        )
+    result = await db.execute(
+        select(Product.product_id).where(
+            and_(
+                Product.product_id == product_id,
+                Product.seller_id == current_user.user_id,
+            )
+        )
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found or you don't own this product",
+        )
+
+
+@router.get("/ledger/{product_id}/stock", response_model=StockAtTime)
+async def get_stock_at(
+    product_id: uuid.UUID,
+    at: Optional[datetime] = Query(None, description="Point in time, defaults to now"),
+    db: AsyncSession = Depends(get_read_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
+):
+    """
+    Stock of a product at a point in time, with the received / sold /
+    adjusted / expired / reserved totals that make it up. Computed from the
+    latest ledger snapshot before ``at`` plus the movements since.
+    """
+    await _check_ledger_access(db, product_id, current_user, roles)
+    at = _as_utc(at) if at else datetime.now(timezone.utc)
+    totals = await stock_totals_at(db, product_id, at)
+    return StockAtTime(product_id=product_id, at=at, **totals.model_dump())
+
+
+@router.get("/ledger/{product_id}/report", response_model=StockMovementReport)
+async def get_stock_movement_report(
+    product_id: uuid.UUID,
+    start: datetime = Query(..., description="Start of the period"),
+    end: Optional[datetime] = Query(None, description="End of the period, defaults to now"),
+    db: AsyncSession = Depends(get_read_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
+):
+    """
+    Opening and closing stock of a period and the movements in between,
+    per kind.
+    """
+    await _check_ledger_access(db, product_id, current_user, roles)
+    start = _as_utc(start)
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start",
+        )
+    return await movement_report(db, product_id, start, end)
+
+
 @router.get("/available/{product_id}")
 async def get_available_quantity(
-    product_id: str, db: AsyncSession = Depends(get_db_session)
+    product_id: uuid.UUID,
+    include_batches: bool = Query(False, description="List the batches as well"),
+    db: AsyncSession = Depends(get_read_db_session),
 ):
     """
-    Get total available quantity for a product (sum of all non-expired batches).
+    Get total available quantity for a product (sum of all non-expired
+    batches). The totals come from the stock cache, summed in SQL on a
+    miss; the batches are only loaded when asked for.
     """
+    level = await stock_cache.get(db, product_id)
+    availability = {
+        "product_id": product_id,
+        "total_available_quantity": level.available_quantity,
+        "active_batches": level.active_batches,
+    }
+    if not include_batches:
+        return availability
+
     today = date.today()
 
     # Get all non-expired inventory batches
     result = await db.execute(
-        select(Inventory).where(
+        select(
+            Inventory.inventory_id,
+            Inventory.quantity,
+            Inventory.discount,
+            Inventory.expiry_date,
+        ).where(
             and_(
                 Inventory.product_id == product_id,
                 Inventory.quantity > 0,
@@ -382,15 +555,10 @@ async def get_available_quantity(
             )
         )
     )
-    inventory_batches = result.scalars().all()
-
-    total_quantity = sum(batch.quantity for batch in inventory_batches)
-    active_batches = len(inventory_batches)
+    inventory_batches = result.all()
 
     return {
-        "product_id": product_id,
-        "total_available_quantity": total_quantity,
-        "active_batches": active_batches,
+        **availability,
         "batches": [
             {
                 "inventory_id": str(batch.inventory_id),
@@ -407,104 +575,55 @@ async def get_available_quantity(
 
 @router.get("/pricing/{product_id}")
 async def get_product_pricing(
-    product_id: str,
+    product_id: uuid.UUID,
     quantity: int = Query(..., gt=0, description="Quantity to purchase"),
     purchase_type: str = Query(
         "solo_singletime", regex="^(solo_singletime|subscription|group)$"
     ),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
 ):
     """
     Get pricing information for a product with different discount types.
     Calculates the best price based on available inventory and purchase type.
     """
-    today = date.today()
-
-    # Get product details
-    product_result = await db.execute(
-        select(Product).where(Product.product_id == product_id)
+    purchase_type_param = (
+        "subscription" if purchase_type == "subscription" else "solo_singletime"
     )
-    product = product_result.scalar_one_or_none()
 
-    if not product:
+    # FIFO allocation over the non-expired batches, oldest first
+    try:
+        allocation = await allocate_items(
+            db,
+            [(product_id, quantity)],
+            purchase_type=purchase_type_param,
+            is_group=purchase_type == "group",
+        )
+    except ProductNotFound:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
-
-    # Get available inventory batches (FIFO - oldest first, non-expired)
-    inventory_result = await db.execute(
-        select(Inventory)
-        .where(
-            and_(
-                Inventory.product_id == product_id,
-                Inventory.quantity > 0,
-                (Inventory.expiry_date.is_(None)) | (Inventory.expiry_date >= today),
-            )
-        )
-        .order_by(Inventory.created_at.asc())
-    )
-    available_batches = inventory_result.scalars().all()
-
-    # Check if enough quantity is available
-    total_available = sum(batch.quantity for batch in available_batches)
-
-    if total_available < quantity:
+    except InsufficientStock as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient inventory. Requested: {quantity}, Available: {total_available}",
+            detail=f"Insufficient inventory. Requested: {quantity}, Available: {exc.available}",
         )
 
-    # Calculate pricing for the requested quantity using FIFO
-    remaining_quantity = quantity
-    total_cost = Decimal("0.00")
-    batch_breakdown = []
-
-    is_group = purchase_type == "group"
-    purchase_type_param = (
-        "subscription" if purchase_type == "subscription" else "solo_singletime"
-    )
+    (item,) = allocation.items
+    return _item_pricing(item, purchase_type)
 
-    for batch in available_batches:
-        if remaining_quantity <= 0:
-            break
-
-        # Take from this batch
-        take_quantity = min(remaining_quantity, batch.quantity)
-        discount_struct = DiscountStructure.from_array(batch.discount)
-
-        # Calculate discounted price for this batch
-        discounted_price = discount_struct.calculate_discounted_price(
-            product.price, purchase_type_param, is_group
-        )
-
-        batch_cost = discounted_price * take_quantity
-        total_cost += batch_cost
-
-        batch_breakdown.append(
-            {
-                "inventory_id": str(batch.inventory_id),
-                "quantity_from_batch": take_quantity,
-                "original_price_per_unit": float(product.price),
-                "discounted_price_per_unit": float(discounted_price),
-                "discount_applied": discount_struct.get_applicable_discount(
-                    purchase_type_param, is_group
-                ),
-                "batch_total": float(batch_cost),
-                "expiry_date": batch.expiry_date.isoformat()
-                if batch.expiry_date
-                else None,
-            }
-        )
 
-        remaining_quantity -= take_quantity
+def _item_pricing(item: ItemAllocation, purchase_type: str) -> dict:
+    """Pricing of one allocated item, as returned by the pricing endpoints."""
+    quantity = item.quantity
+    total_cost = item.discounted_total
 
     # Calculate savings
-    original_total = product.price * quantity
+    original_total = item.original_total
     savings = original_total - total_cost
 
     return {
-        "product_id": product_id,
-        "product_name": product.name,
+        "product_id": item.product.product_id,
+        "product_name": item.product.name,
         "quantity_requested": quantity,
         "purchase_type": purchase_type,
         "pricing": {
@@ -516,6 +635,74 @@ async def get_product_pricing(
             else 0,
             "average_price_per_unit": float(total_cost / quantity),
         },
-        "batch_breakdown": batch_breakdown,
-        "available_quantity": total_available,
+        "batch_breakdown": [
+            batch.breakdown(item.product.price) for batch in item.batches
+        ],
+        "available_quantity": item.available,
+    }
+
+
+@router.post("/pricing/quote")
+async def quote_cart_pricing(
+    quote: PricingQuoteRequest,
+    db: AsyncSession = Depends(get_read_db_session),
+):
+    """
+    Price a whole cart in one request: each line is priced like
+    GET /pricing/{product_id}, and the cart totals add up the lines that
+    could be priced. Stock for every product is loaded in one query; lines
+    for the same product draw on what earlier lines left, as the order
+    would. Lines that can't be priced carry an ``error`` instead.
+    """
+    products = await load_stock(db, (line.product_id for line in quote.lines))
+
+    taken = {}
+    lines = []
+    original_total = Decimal("0.00")
+    discounted_total = Decimal("0.00")
+    for line in quote.lines:
+        purchase_type_param = (
+            "subscription" if line.purchase_type == "subscription" else "solo_singletime"
+        )
+        try:
+            allocation = allocate(
+                products,
+                [(line.product_id, line.quantity)],
+                purchase_type=purchase_type_param,
+                is_group=line.purchase_type == "group",
+                remaining=taken,
+            )
+        except ProductNotFound:
+            error = "Product not found"
+        except InsufficientStock as exc:
+            error = f"Insufficient inventory. Requested: {line.quantity}, Available: {exc.available}"
+        else:
+            (item,) = allocation.items
+            original_total += item.original_total
+            discounted_total += item.discounted_total
+            lines.append({**_item_pricing(item, line.purchase_type), "error": None})
+            continue
+        lines.append(
+            {
+                "product_id": line.product_id,
+                "quantity_requested": line.quantity,
+                "purchase_type": line.purchase_type,
+                "error": error,
+            }
+        )
+
+    savings = original_total - discounted_total
+    priced_lines = sum(1 for line in lines if line["error"] is None)
+    return {
+        "lines": lines,
+        "summary": {
+            "priced_lines": priced_lines,
+            "unpriced_lines": len(lines) - priced_lines,
+            "total_original_price": float(original_total),
+            "total_discounted_price": float(discounted_total),
+            "total_savings": float(savings),
+            "overall_savings_percentage": float((savings / original_total) * 100)
+            if original_total > 0
+            else 0,
+        },
     }
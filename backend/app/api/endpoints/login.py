@@ -5,8 +5,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import get_current_user
-from app.core.security import create_access_token
-from app.core.password import verify_password 
+from app.core.security import create_access_token, invalidate_principal
+from app.core.password import password_service
 from app.core.config import settings
 from app.db.models import Token, UserLogin, BaseUserInDB
 from app.db.database import get_db_session
@@ -22,19 +22,30 @@ async def login_for_access_token(
     
     # Find user by email
     user = await get_user_by_email(db, login_data.email)
-    if not user or not verify_password(login_data.password, user.password_hash):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_service.verify_and_update(
+            login_data.password, user.password_hash
+        )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Upgrade hashes made with a different bcrypt cost (committed with the session)
+    if new_hash:
+        user.password_hash = new_hash
+        invalidate_principal(user.email)
     
     # Determine user type (buyer, seller, or both)
     user_type = await get_user_type(db, user.user_id)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # The user_type claim lets role checks skip the Buyer/Seller lookups
     access_token = create_access_token(
-        data={"sub": user.email, "user_id": str(user.user_id)}, 
+        data={"sub": user.email, "user_id": str(user.user_id), "user_type": user_type},
         expires_delta=access_token_expires
     )
     
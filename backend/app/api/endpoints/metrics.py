@@ -0,0 +1,48 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.core.config import settings
+from app.core.password import password_service
+from app.core.security import principal_cache, token_cache
+from app.db.database import pool_stats
+from app.db.facets import facet_cache
+from app.db.query_stats import query_stats
+from app.db.routing import replica_router
+from app.db.stock import stock_cache
+from app.db.surplus import surplus_feed
+
+router = APIRouter()
+
+
+async def require_metrics_token(
+    x_metrics_token: Optional[str] = Header(None),
+) -> None:
+    """Only monitoring holding METRICS_TOKEN may read the metrics; 404 when unset."""
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_metrics_token is None or not secrets.compare_digest(
+        x_metrics_token.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token"
+        )
+
+
+@router.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    """
+    Live in-process metrics for this worker.
+    """
+    return {
+        "password_hashing": password_service.stats(),
+        "principal_cache": principal_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "db_pool": pool_stats(),
+        "db_replicas": replica_router.stats(),
+        "sql": query_stats.stats(),
+        "facets_cache": facet_cache.stats(),
+        "stock_cache": stock_cache.stats(),
+        "surplus_feed": surplus_feed.stats(),
+    }
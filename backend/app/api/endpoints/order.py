@@ -1,53 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, and_
 from typing import List, Optional
 import uuid
-from decimal import Decimal
-from datetime import date
 from pydantic import Field
 
-from app.db.database import get_db_session
+from app.db.allocation import (
+    InsufficientStock,
+    ProductNotFound,
+    StockConflict,
+    allocate_items,
+    reserve_items,
+)
+from app.core.config import settings
+from app.db.availability import refresh_product_availability
+from app.db.holds import confirm_holds, hold_items, place_holds, release_holds
+from app.db.database import get_db_session, get_read_db_session
+from app.db.routing import get_replica_db_session
+from app.db.pagination import Keyset
 from app.db.models import (
     Order,
     OrderItem,
     BaseUser,
     Buyer,
     Seller,
-    Product,
-    Inventory,
     GroupOrderParticipant,
     OrderCreate,
     OrderItemCreate,
     OrderResponse,
     OrderWithItemsResponse,
     OrderItemResponse,
-    DiscountStructure,
     GroupOrderJoinRequest,
     GroupOrderParticipantResponse,
     GroupOrderSummary,
+    UserRoles,
 )
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_roles
 
 router = APIRouter()
 
+ORDER_KEYSET = Keyset(Order.order_date, Order.order_id)
 
-async def get_user_type(db: AsyncSession, user_id: uuid.UUID) -> str:
-    """Helper function to determine user type"""
-    buyer = await db.execute(select(Buyer).where(Buyer.user_id == user_id))
-    seller = await db.execute(select(Seller).where(Seller.user_id == user_id))
 
-    has_buyer = buyer.scalar_one_or_none() is not None
-    has_seller = seller.scalar_one_or_none() is not None
+def _split_share(order_items: List[OrderItem], quantity: int) -> List[tuple]:
+    """
+    Spread a participant's share over the products of a group order in
+    proportion to the order's quantities (largest remainder), as
+    (product_id, quantity) items for the stock hold.
+    """
+    total = sum(item.quantity for item in order_items)
+    shares = [(item, quantity * item.quantity // total) for item in order_items]
+    leftover = quantity - sum(share for _, share in shares)
+    by_remainder = sorted(
+        range(len(shares)),
+        key=lambda i: -(quantity * order_items[i].quantity % total),
+    )
+    for i in by_remainder[:leftover]:
+        item, share = shares[i]
+        shares[i] = (item, share + 1)
+    return [(item.product_id, share) for item, share in shares if share > 0]
 
-    if has_buyer and has_seller:
-        return "both"
-    elif has_buyer:
-        return "buyer"
-    elif has_seller:
-        return "seller"
-    else:
-        return "none"
+
+async def _confirm_group_stock(db: AsyncSession, order: Order) -> None:
+    """
+    Sell the stock behind a pending group order the seller is confirming.
+    The holds of the active participants become permanent decrements; if
+    the primary buyer's holds lapsed, the order's own units are reserved
+    again. Raises 409 when stock the order counts on is back on the shelf
+    and can't be had, so a confirmed order is never oversold.
+    """
+    confirmed_units = await confirm_holds(db, order_id=order.order_id)
+
+    participants_result = await db.execute(
+        select(GroupOrderParticipant).where(
+            GroupOrderParticipant.order_id == order.order_id
+        )
+    )
+    participants = participants_result.scalars().all()
+    held_units = sum(
+        participant.quantity_share
+        for participant in participants
+        if participant.status in ("pending", "confirmed")
+    )
+    # Holds released by the sweeper while the seller was confirming
+    if confirmed_units < held_units:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Held stock of this group order lapsed, please retry",
+        )
+
+    primary = next(
+        (
+            participant
+            for participant in participants
+            if participant.buyer_id == order.buyer_id
+        ),
+        None,
+    )
+    if primary is None or primary.status != "expired":
+        return
+
+    order_items_result = await db.execute(
+        select(OrderItem).where(OrderItem.order_id == order.order_id)
+    )
+    try:
+        allocation = await reserve_items(
+            db,
+            [(item.product_id, item.quantity) for item in order_items_result.scalars()],
+            seller_id=order.seller_id,
+        )
+    except (ProductNotFound, InsufficientStock, StockConflict):
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The stock held for this group order lapsed and is no longer available",
+        )
+    await refresh_product_availability(
+        db, *(item.product.product_id for item in allocation.items)
+    )
+    primary.status = "confirmed"
 
 
 @router.post(
@@ -59,18 +131,14 @@ async def create_order(
     purchase_type: str = "solo_singletime",  # New parameter for discount type
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Create a new order with order items.
     Now checks inventory availability and applies FIFO (First In, First Out) logic.
     """
     # Check if user is a buyer
-    buyer_result = await db.execute(
-        select(Buyer).where(Buyer.user_id == current_user.user_id)
-    )
-    buyer = buyer_result.scalar_one_or_none()
-
-    if not buyer:
+    if not roles.is_buyer:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only buyers can create orders",
@@ -87,96 +155,45 @@ async def create_order(
             status_code=status.HTTP_404_NOT_FOUND, detail="Seller not found"
         )
 
-    total_price = Decimal("0.00")
-    validated_items = []
-    inventory_updates = []  # Track inventory changes
-
-    # Validate each item and check inventory availability
-    for item in order_items:
-        # Check if product exists and belongs to the seller
-        product_result = await db.execute(
-            select(Product).where(
-                Product.product_id == item.product_id,
-                Product.seller_id == order_data.seller_id,
-            )
-        )
-        product = product_result.scalar_one_or_none()
-
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Product {item.product_id} not found or doesn't belong to seller",
-            )
+    purchase_type_param = (
+        "subscription" if purchase_type == "subscription" else "solo_singletime"
+    )
 
-        # Get available inventory batches (FIFO - oldest first, non-expired)
-        today = date.today()
-        inventory_result = await db.execute(
-            select(Inventory)
-            .where(
-                and_(
-                    Inventory.product_id == item.product_id,
-                    Inventory.quantity > 0,
-                    (Inventory.expiry_date.is_(None))
-                    | (Inventory.expiry_date >= today),
-                )
-            )
-            .order_by(Inventory.created_at.asc())  # FIFO
+    # FIFO allocation over the seller's non-expired batches, priced per batch,
+    # and taken out of stock with conditional decrements. Group orders only
+    # hold the units until the seller confirms, so the ledger books them as
+    # a reservation rather than a sale
+    try:
+        allocation = await reserve_items(
+            db,
+            [(item.product_id, item.quantity) for item in order_items],
+            seller_id=order_data.seller_id,
+            purchase_type=purchase_type_param,
+            movement_kind="reservation" if order_data.order_type == "group" else "sale",
         )
-        available_batches = inventory_result.scalars().all()
-
-        # Check if enough quantity is available
-        total_available = sum(batch.quantity for batch in available_batches)
-
-        if total_available < item.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient inventory for {product.name}. "
-                f"Requested: {item.quantity}, Available: {total_available}",
-            )
-
-        # Calculate price with best available discount using new discount structure
-        remaining_quantity = item.quantity
-        weighted_price = Decimal("0.00")
-
-        # Determine if this is a group purchase (let's say >10 items is considered group)
-        is_group = item.quantity > 10
-        purchase_type_param = (
-            "subscription" if purchase_type == "subscription" else "solo_singletime"
+    except ProductNotFound as exc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product {exc.product_id} not found or doesn't belong to seller",
         )
-
-        for batch in available_batches:
-            if remaining_quantity <= 0:
-                break
-
-            # Take from this batch
-            take_quantity = min(remaining_quantity, batch.quantity)
-
-            # Calculate price with new discount structure
-            discount_struct = DiscountStructure.from_array(batch.discount)
-            discounted_price = discount_struct.calculate_discounted_price(
-                product.price, purchase_type_param, is_group
-            )
-
-            weighted_price += discounted_price * take_quantity
-
-            # Track inventory update
-            inventory_updates.append({"batch": batch, "reduce_by": take_quantity})
-
-            remaining_quantity -= take_quantity
-
-        # Average price per unit for this item
-        price_per_unit = weighted_price / item.quantity
-        item_total = weighted_price
-        total_price += item_total
-
-        validated_items.append(
-            {
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "price_per_unit": price_per_unit,
-            }
+    except InsufficientStock as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except StockConflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock is changing too quickly, please retry the order",
         )
 
+    total_price = allocation.discounted_total
+    validated_items = [
+        {
+            "product_id": item.product.product_id,
+            "quantity": item.quantity,
+            "price_per_unit": item.price_per_unit,
+        }
+        for item in allocation.items
+    ]
+
     # Create the order
     order = Order(
         buyer_id=current_user.user_id,
@@ -203,18 +220,27 @@ async def create_order(
             status="confirmed",
         )
         db.add(primary_participant)
+        await db.flush()
+
+        # The primary buyer's units are held until the seller confirms the
+        # group order; the sweeper gives them back if that never happens
+        await place_holds(
+            db,
+            allocation,
+            current_user.user_id,
+            settings.GROUP_ORDER_HOLD_SECONDS,
+            order_id=order.order_id,
+            participant_id=primary_participant.participant_id,
+        )
 
     # Create order items
     for item_data in validated_items:
         order_item = OrderItem(order_id=order.order_id, **item_data)
         db.add(order_item)
 
-    # Update inventory quantities (reduce stock)
-    for update in inventory_updates:
-        batch = update["batch"]
-        reduce_by = update["reduce_by"]
-        batch.quantity -= reduce_by
-
+    await refresh_product_availability(
+        db, *(item.product.product_id for item in allocation.items)
+    )
     await db.commit()
     await db.refresh(order)
 
@@ -228,18 +254,14 @@ async def calculate_order_pricing(
     purchase_type: str = "solo_singletime",
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Calculate order pricing without creating the order.
     Shows breakdown of discounts and total cost.
     """
     # Check if user is a buyer
-    buyer_result = await db.execute(
-        select(Buyer).where(Buyer.user_id == current_user.user_id)
-    )
-    buyer = buyer_result.scalar_one_or_none()
-
-    if not buyer:
+    if not roles.is_buyer:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only buyers can calculate order pricing",
@@ -254,115 +276,49 @@ async def calculate_order_pricing(
             status_code=status.HTTP_404_NOT_FOUND, detail="Seller not found"
         )
 
-    total_original_price = Decimal("0.00")
-    total_discounted_price = Decimal("0.00")
-    item_breakdowns = []
-
-    # Calculate pricing for each item
-    for item in order_items:
-        # Check if product exists and belongs to the seller
-        product_result = await db.execute(
-            select(Product).where(
-                Product.product_id == item.product_id, Product.seller_id == seller_id
-            )
-        )
-        product = product_result.scalar_one_or_none()
-
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Product {item.product_id} not found or doesn't belong to seller",
-            )
+    purchase_type_param = (
+        "subscription" if purchase_type == "subscription" else "solo_singletime"
+    )
 
-        # Get available inventory batches (FIFO)
-        today = date.today()
-        inventory_result = await db.execute(
-            select(Inventory)
-            .where(
-                and_(
-                    Inventory.product_id == item.product_id,
-                    Inventory.quantity > 0,
-                    (Inventory.expiry_date.is_(None))
-                    | (Inventory.expiry_date >= today),
-                )
-            )
-            .order_by(Inventory.created_at.asc())
+    # Same FIFO allocation and pricing as order creation
+    try:
+        allocation = await allocate_items(
+            db,
+            [(item.product_id, item.quantity) for item in order_items],
+            seller_id=seller_id,
+            purchase_type=purchase_type_param,
         )
-        available_batches = inventory_result.scalars().all()
-
-        # Check if enough quantity is available
-        total_available = sum(batch.quantity for batch in available_batches)
-
-        if total_available < item.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient inventory for {product.name}. "
-                f"Requested: {item.quantity}, Available: {total_available}",
-            )
-
-        # Calculate pricing
-        remaining_quantity = item.quantity
-        item_original_price = product.price * item.quantity
-        item_discounted_price = Decimal("0.00")
-        batch_details = []
-
-        is_group = item.quantity > 10
-        purchase_type_param = (
-            "subscription" if purchase_type == "subscription" else "solo_singletime"
+    except ProductNotFound as exc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product {exc.product_id} not found or doesn't belong to seller",
         )
+    except InsufficientStock as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
-        for batch in available_batches:
-            if remaining_quantity <= 0:
-                break
-
-            take_quantity = min(remaining_quantity, batch.quantity)
-            discount_struct = DiscountStructure.from_array(batch.discount)
-
-            discounted_price = discount_struct.calculate_discounted_price(
-                product.price, purchase_type_param, is_group
-            )
-
-            batch_cost = discounted_price * take_quantity
-            item_discounted_price += batch_cost
-
-            batch_details.append(
-                {
-                    "inventory_id": str(batch.inventory_id),
-                    "quantity_from_batch": take_quantity,
-                    "original_price_per_unit": float(product.price),
-                    "discounted_price_per_unit": float(discounted_price),
-                    "discount_applied": discount_struct.get_applicable_discount(
-                        purchase_type_param, is_group
-                    ),
-                    "batch_total": float(batch_cost),
-                    "expiry_date": batch.expiry_date.isoformat()
-                    if batch.expiry_date
-                    else None,
-                }
-            )
-
-            remaining_quantity -= take_quantity
-
-        item_savings = item_original_price - item_discounted_price
-
+    item_breakdowns = []
+    for item in allocation.items:
+        item_original_price = item.original_total
+        item_savings = item_original_price - item.discounted_total
         item_breakdowns.append(
             {
-                "product_id": str(item.product_id),
-                "product_name": product.name,
+                "product_id": str(item.product.product_id),
+                "product_name": item.product.name,
                 "quantity": item.quantity,
                 "original_total": float(item_original_price),
-                "discounted_total": float(item_discounted_price),
+                "discounted_total": float(item.discounted_total),
                 "savings": float(item_savings),
                 "savings_percentage": float((item_savings / item_original_price) * 100)
                 if item_original_price > 0
                 else 0,
-                "batch_details": batch_details,
+                "batch_details": [
+                    batch.breakdown(item.product.price) for batch in item.batches
+                ],
             }
         )
 
-        total_original_price += item_original_price
-        total_discounted_price += item_discounted_price
-
+    total_original_price = allocation.original_total
+    total_discounted_price = allocation.discounted_total
     total_savings = total_original_price - total_discounted_price
 
     return {
@@ -387,17 +343,13 @@ async def join_group_order(
     join_request: GroupOrderJoinRequest,
     db: AsyncSession = Depends(get_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Join an existing group order.
     """
     # Check if user is a buyer
-    buyer_result = await db.execute(
-        select(Buyer).where(Buyer.user_id == current_user.user_id)
-    )
-    buyer = buyer_result.scalar_one_or_none()
-
-    if not buyer:
+    if not roles.is_buyer:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only buyers can join group orders",
@@ -461,6 +413,31 @@ async def join_group_order(
     )
 
     db.add(participant)
+    await db.flush()  # Get participant_id
+
+    # Hold the participant's units so seats can't outrun the seller's stock
+    try:
+        await hold_items(
+            db,
+            _split_share(order_items, join_request.quantity_requested),
+            current_user.user_id,
+            settings.GROUP_ORDER_HOLD_SECONDS,
+            seller_id=order.seller_id,
+            order_id=order.order_id,
+            participant_id=participant.participant_id,
+        )
+    except (ProductNotFound, InsufficientStock):
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not enough stock left to join this group order",
+        )
+    except StockConflict:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock is changing too quickly, please retry",
+        )
 
     # Update order's group_buyer_ids
     current_buyer_ids = order.group_buyer_ids or []
@@ -476,24 +453,22 @@ async def join_group_order(
 
 @router.get("/group/available", response_model=List[GroupOrderSummary])
 async def get_available_group_orders(
+    response: Response,
     seller_id: Optional[uuid.UUID] = None,
     product_category: Optional[str] = None,
     max_distance_km: Optional[int] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db_session),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_replica_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Get available group orders that buyers can join.
     """
     # Check if user is a buyer
-    buyer_result = await db.execute(
-        select(Buyer).where(Buyer.user_id == current_user.user_id)
-    )
-    buyer = buyer_result.scalar_one_or_none()
-
-    if not buyer:
+    if not roles.is_buyer:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only buyers can view available group orders",
@@ -508,10 +483,11 @@ async def get_available_group_orders(
         query = query.where(Order.seller_id == seller_id)
 
     # Add pagination
-    query = query.offset(skip).limit(limit)
+    query = ORDER_KEYSET.apply(query, cursor, skip, limit)
 
     result = await db.execute(query)
     orders = result.scalars().all()
+    ORDER_KEYSET.set_next_cursor(response, orders, limit)
 
     group_summaries = []
 
@@ -550,7 +526,7 @@ async def get_available_group_orders(
 @router.get("/group/{order_id}", response_model=GroupOrderSummary)
 async def get_group_order_details(
     order_id: uuid.UUID,
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
     current_user: BaseUser = Depends(get_current_user),
 ):
     """
@@ -570,9 +546,6 @@ async def get_group_order_details(
             status_code=status.HTTP_400_BAD_REQUEST, detail="This is not a group order"
         )
 
-    # Check if user has permission to view this order
-    user_type = await get_user_type(db, current_user.user_id)
-
     # Allow if user is the seller, primary buyer, or a participant
     is_participant = False
     if order.group_buyer_ids:
@@ -676,7 +649,23 @@ async def update_participant_status(
             detail="You don't have permission to update this participant's status",
         )
 
+    valid_statuses = ["pending", "confirmed", "cancelled"]
+    if new_status not in valid_statuses:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid participant status. Must be one of: {valid_statuses}",
+        )
+
+    # The stock of a cancelled or expired participant is no longer held
+    if participant.status in ("cancelled", "expired") and new_status != participant.status:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot change the status of a {participant.status} participant",
+        )
+
     participant.status = new_status
+    if new_status == "cancelled":
+        await release_holds(db, participant_id=participant.participant_id)
     await db.commit()
 
     return {"message": f"Participant status updated to {new_status}"}
@@ -685,7 +674,7 @@ async def update_participant_status(
 @router.get("/{order_id}", response_model=OrderWithItemsResponse)
 async def get_order_details(
     order_id: uuid.UUID,
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
     current_user: BaseUser = Depends(get_current_user),
 ):
     """
@@ -700,9 +689,6 @@ async def get_order_details(
             status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
         )
 
-    # Check permissions
-    user_type = await get_user_type(db, current_user.user_id)
-
     # Check if user has permission to view this order
     is_participant = False
     if order.group_buyer_ids:
@@ -810,9 +796,6 @@ async def update_order(
             status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
         )
 
-    # Check permissions
-    user_type = await get_user_type(db, current_user.user_id)
-
     # Check if user has permission to update this order
     if (
         order.buyer_id != current_user.user_id
@@ -841,6 +824,13 @@ async def update_order(
                 detail=f"Invalid order status. Must be one of: {valid_statuses}",
             )
 
+        # A cancelled order's held stock has been released
+        if order.order_status == "Cancelled" and order_status != "Cancelled":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot change the status of a cancelled order",
+            )
+
         update_data["order_status"] = order_status
 
     if estimated_delivery_date:
@@ -848,6 +838,13 @@ async def update_order(
         update_data["estimated_delivery_date"] = estimated_delivery_date
 
     if update_data:
+        # Held group order stock is sold once the seller confirms, and goes
+        # back on the shelf if the order is cancelled
+        if order_status in ("Confirmed", "Shipped", "Delivered"):
+            if order.order_type == "group" and order.order_status == "Pending":
+                await _confirm_group_stock(db, order)
+        elif order_status == "Cancelled":
+            await release_holds(db, order_id=order_id)
         await db.execute(
             update(Order).where(Order.order_id == order_id).values(**update_data)
         )
@@ -860,7 +857,7 @@ async def update_order(
 @router.get("/{order_id}", response_model=OrderWithItemsResponse)
 async def get_order_details(
     order_id: uuid.UUID,
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
     current_user: BaseUser = Depends(get_current_user),
 ):
     """
@@ -917,18 +914,21 @@ async def get_order_details(
 
 @router.get("/", response_model=List[OrderWithItemsResponse])
 async def get_all_orders(
+    response: Response,
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
     order_status: Optional[str] = None,
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_replica_db_session),
     current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
     """
     Get all orders for the current user.
     Buyers see their purchase orders, sellers see orders for their products.
     """
     # Determine user type and get appropriate orders
-    user_type = await get_user_type(db, current_user.user_id)
+    user_type = roles.user_type
 
     if user_type == "buyer":
         # Get orders where user is the buyer
@@ -953,11 +953,12 @@ async def get_all_orders(
         query = query.where(Order.order_status == order_status)
 
     # Add pagination
-    query = query.offset(skip).limit(limit)
+    query = ORDER_KEYSET.apply(query, cursor, skip, limit)
 
     # Execute query
     orders_result = await db.execute(query)
     orders = orders_result.scalars().all()
+    ORDER_KEYSET.set_next_cursor(response, orders, limit)
 
     # Get order items for each order
     orders_with_items = []
@@ -1036,21 +1037,3 @@ async def get_all_orders(
 
     return orders_with_items
 
-
-# Helper function to get user type
-async def get_user_type(db: AsyncSession, user_id: uuid.UUID) -> str:
-    """Determine if user is buyer, seller, or both."""
-    buyer_result = await db.execute(select(Buyer).where(Buyer.user_id == user_id))
-    seller_result = await db.execute(select(Seller).where(Seller.user_id == user_id))
-
-    is_buyer = buyer_result.scalar_one_or_none() is not None
-    is_seller = seller_result.scalar_one_or_none() is not None
-
-    if is_buyer and is_seller:
-        return "both"
-    elif is_buyer:
-        return "buyer"
-    elif is_seller:
-        return "seller"
-    else:
-        return "none"
@@ -1,34 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
-from typing import List, Optional
+from sqlalchemy.orm import contains_eager, selectinload
+from typing import List, Literal, Optional
 import uuid
 
-from app.db.database import get_db_session
+from app.api.serializers import product_row, product_with_inventory_row
+from app.core.config import settings
+from app.core.responses import json_rows
+from app.db.availability import refresh_product_availability
+from app.db.bulk_import import (
+    CSV_CONTENT_TYPES, NDJSON_CONTENT_TYPES, BulkImporter, iter_import_rows
+)
+from app.db.database import get_db_session, get_read_db_session
+from app.db.facets import facet_cache
+from app.db.routing import get_replica_db_session
+from app.db.pagination import Keyset
 from app.db.models import (
-    Product, BaseUser, Seller, Inventory,
+    Product, BaseUser, Seller, Inventory, ProductAvailability,
     ProductCreate, ProductUpdate, ProductResponse, ProductWithInventoryResponse,
-    InventoryResponse
+    ProductSearchResult, UserRoles,
+    ImportReport, ProductFacetsResponse
 )
-from app.core.security import get_current_user
+from app.db.search import product_search_query
+from app.core.security import get_current_user, get_current_user_roles
 
 router = APIRouter()
 
+PRODUCT_KEYSET = Keyset(Product.created_at, Product.product_id)
+
+# Listing sort orders; the availability ones are served by the
+# product_availability projection and its indexes
+PRODUCT_SORT_KEYSETS = {
+    "newest": PRODUCT_KEYSET,
+    "price": Keyset(
+        ProductAvailability.best_singletime_price,
+        Product.product_id,
+        descending=False,
+        row_key=lambda product: (
+            product.availability.best_singletime_price, product.product_id
+        ),
+    ),
+    "availability": Keyset(
+        ProductAvailability.available_quantity,
+        Product.product_id,
+        row_key=lambda product: (
+            product.availability.available_quantity, product.product_id
+        ),
+    ),
+}
+
+
 @router.post("/create", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_data: ProductCreate,
     db: AsyncSession = Depends(get_db_session),
-    current_user: BaseUser = Depends(get_current_user)
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles)
 ):
     """
     Create a new product.
     Only sellers can create products.
     """
     # Check if user is a seller
-    seller_result = await db.execute(select(Seller).where(Seller.user_id == current_user.user_id))
-    seller = seller_result.scalar_one_or_none()
-    
-    if not seller:
+    if not roles.is_seller:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only sellers can create products"
@@ -43,11 +78,49 @@ async def create_product(
     )
     
     db.add(new_product)
+    await db.flush()  # Get product_id
+    await refresh_product_availability(db, new_product.product_id)
     await db.commit()
     await db.refresh(new_product)
     
     return new_product
 
+@router.post("/import", response_model=ImportReport)
+async def import_products(
+    request: Request,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles)
+):
+    """
+    Bulk-create products and inventory batches from a CSV (text/csv, with a
+    header row) or NDJSON (application/x-ndjson) request body. The body is
+    parsed as it streams in and written in chunks of IMPORT_CHUNK_SIZE rows,
+    one transaction per chunk. Invalid rows are skipped and listed in the
+    report by their 1-based data row number.
+    """
+    # Check if user is a seller
+    if not roles.is_seller:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only sellers can import products"
+        )
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in CSV_CONTENT_TYPES | NDJSON_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send the rows as text/csv or application/x-ndjson"
+        )
+    
+    importer = BulkImporter(
+        db,
+        current_user.user_id,
+        chunk_size=settings.IMPORT_CHUNK_SIZE,
+        max_reported_errors=settings.IMPORT_MAX_REPORTED_ERRORS,
+    )
+    return await importer.run(iter_import_rows(request.stream(), content_type))
+
 @router.put("/update/{product_id}", response_model=ProductResponse)
 async def update_product(
     product_id: uuid.UUID,
@@ -91,23 +164,63 @@ async def update_product(
             .where(Product.product_id == product_id)
             .values(**update_data)
         )
+        if "price" in update_data:
+            await refresh_product_availability(db, product.product_id)
+        facet_cache.mark_dirty(db)
         await db.commit()
         await db.refresh(product)
     
     return product
 
+# Declared before /{product_id}, like /search
+@router.get("/facets", response_model=ProductFacetsResponse)
+async def get_product_facets(
+    db: AsyncSession = Depends(get_read_db_session),
+    current_user: BaseUser = Depends(get_current_user)
+):
+    """
+    Category counts, price ranges and in-stock counts for the filter bar.
+    Served from an in-process cache that product and inventory writes drop.
+    """
+    return await facet_cache.get(db)
+
+# Declared before /{product_id} so "search" isn't parsed as a product ID
+@router.get("/search", response_model=List[ProductSearchResult])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=100, description="Search text, typos are tolerated"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price filter"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price filter"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_replica_db_session),
+    current_user: BaseUser = Depends(get_current_user)
+):
+    """
+    Search products by name and category, best matches first.
+    """
+    query = product_search_query(q, category, min_price, max_price)
+    result = await db.execute(query.offset(skip).limit(limit))
+    
+    return json_rows([{**product_row(product), "rank": rank} for product, rank in result.all()])
+
 @router.get("/{product_id}", response_model=ProductWithInventoryResponse)
 async def get_product_details(
     product_id: uuid.UUID,
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
     current_user: BaseUser = Depends(get_current_user)
 ):
     """
     Get details of a particular product including inventory information.
     All authenticated users can view product details.
     """
-    # Get the product
-    product_result = await db.execute(select(Product).where(Product.product_id == product_id))
+    # Get the product with its inventory batches
+    product_result = await db.execute(
+        select(Product)
+        .outerjoin(Product.availability)
+        .options(selectinload(Product.inventories), contains_eager(Product.availability))
+        .where(Product.product_id == product_id)
+    )
     product = product_result.scalar_one_or_none()
     
     if not product:
@@ -116,54 +229,43 @@ async def get_product_details(
             detail="Product not found"
         )
     
-    # Get inventory information for this product
-    inventory_result = await db.execute(
-        select(Inventory).where(Inventory.product_id == product_id)
-    )
-    inventories = inventory_result.scalars().all()
-    
-    # Convert inventories to response format
-    inventory_responses = [
-        InventoryResponse.from_orm_with_discount(inv)
-        for inv in inventories
-    ]
-    
-    return ProductWithInventoryResponse(
-        product_id=product.product_id,
-        seller_id=product.seller_id,
-        name=product.name,
-        category=product.category,
-        price=product.price,
-        rating=product.rating,
-        created_at=product.created_at,
-        inventories=inventory_responses
-    )
+    return json_rows(product_with_inventory_row(product))
 
 @router.get("/", response_model=List[ProductWithInventoryResponse])
 async def get_all_products(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of products to skip"),
     limit: int = Query(10, ge=1, le=100, description="Number of products to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
     category: Optional[str] = Query(None, description="Filter by category"),
     min_price: Optional[float] = Query(None, ge=0, description="Minimum price filter"),
     max_price: Optional[float] = Query(None, ge=0, description="Maximum price filter"),
     seller_only: bool = Query(False, description="Get only current user's products (seller only)"),
-    db: AsyncSession = Depends(get_db_session),
-    current_user: BaseUser = Depends(get_current_user)
+    in_stock: bool = Query(False, description="Only products with non-expired stock"),
+    min_available: Optional[int] = Query(None, ge=1, description="Minimum available quantity"),
+    max_best_price: Optional[float] = Query(None, ge=0, description="Maximum best single-purchase price after discounts"),
+    sort: Literal["newest", "price", "availability"] = Query("newest", description="newest first, cheapest discounted price first, or most available first"),
+    db: AsyncSession = Depends(get_replica_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles)
 ):
     """
     Get all products with optional filters.
     If seller_only=True, returns only products for the current seller.
     Otherwise, returns all products (for buyers to browse).
+    Availability filters and sorts read the maintained product_availability
+    projection rather than the inventory batches.
     """
-    # Base query
-    query = select(Product)
+    # Base query; inventory for the whole page is loaded in one extra IN query
+    query = (
+        select(Product)
+        .outerjoin(Product.availability)
+        .options(selectinload(Product.inventories), contains_eager(Product.availability))
+    )
     
     # If seller_only is True, check if user is a seller and filter by seller_id
     if seller_only:
-        seller_result = await db.execute(select(Seller).where(Seller.user_id == current_user.user_id))
-        seller = seller_result.scalar_one_or_none()
-        
-        if not seller:
+        if not roles.is_seller:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Only sellers can view their own products"
@@ -181,40 +283,31 @@ async def get_all_products(
     if max_price is not None:
         query = query.where(Product.price <= max_price)
     
-    # Apply pagination
-    query = query.offset(skip).limit(limit)
+    if in_stock:
+        query = query.where(ProductAvailability.available_quantity > 0)
+    
+    if min_available is not None:
+        query = query.where(ProductAvailability.available_quantity >= min_available)
+    
+    if max_best_price is not None:
+        query = query.where(ProductAvailability.best_singletime_price <= max_best_price)
+    
+    # Apply pagination in the requested order. Products without a value for
+    # the sort key (no stock for "price") are left out of availability sorts.
+    keyset = PRODUCT_SORT_KEYSETS[sort]
+    if sort != "newest":
+        query = query.where(keyset.columns[0].is_not(None))
+    query = keyset.apply(query, cursor, skip, limit)
     
     # Execute query
     products_result = await db.execute(query)
     products = products_result.scalars().all()
+    keyset.set_next_cursor(response, products, limit)
     
-    # Get inventory information for each product
-    products_with_inventory = []
-    for product in products:
-        inventory_result = await db.execute(
-            select(Inventory).where(Inventory.product_id == product.product_id)
-        )
-        inventories = inventory_result.scalars().all()
-        
-        inventory_responses = [
-            InventoryResponse.from_orm_with_discount(inv)
-            for inv in inventories
-        ]
-        
-        products_with_inventory.append(
-            ProductWithInventoryResponse(
-                product_id=product.product_id,
-                seller_id=product.seller_id,
-                name=product.name,
-                category=product.category,
-                price=product.price,
-                rating=product.rating,
-                created_at=product.created_at,
-                inventories=inventory_responses
-            )
-        )
-    
-    return products_with_inventory
+    return json_rows(
+        [product_with_inventory_row(product) for product in products],
+        headers=response.headers
+    )
 
 @router.delete("/delete/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
@@ -245,35 +338,41 @@ async def delete_product(
     
     # Delete the product
     await db.execute(delete(Product).where(Product.product_id == product_id))
+    facet_cache.mark_dirty(db)
     await db.commit()
     
     return None
 
 @router.get("/category/{category}", response_model=List[ProductResponse])
 async def get_products_by_category(
+    response: Response,
     category: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    db: AsyncSession = Depends(get_db_session),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_replica_db_session),
     current_user: BaseUser = Depends(get_current_user)
 ):
     """
     Get all products in a specific category.
     """
     query = select(Product).where(Product.category.ilike(f"%{category}%"))
-    query = query.offset(skip).limit(limit)
+    query = PRODUCT_KEYSET.apply(query, cursor, skip, limit)
     
     products_result = await db.execute(query)
     products = products_result.scalars().all()
+    PRODUCT_KEYSET.set_next_cursor(response, products, limit)
     
-    return products
+    return json_rows([product_row(product) for product in products], headers=response.headers)
 
 @router.get("/seller/{seller_id}", response_model=List[ProductResponse])
 async def get_products_by_seller(
+    response: Response,
     seller_id: uuid.UUID,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    db: AsyncSession = Depends(get_db_session),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    db: AsyncSession = Depends(get_replica_db_session),
     current_user: BaseUser = Depends(get_current_user)
 ):
     """
@@ -290,9 +389,10 @@ async def get_products_by_seller(
         )
     
     query = select(Product).where(Product.seller_id == seller_id)
-    query = query.offset(skip).limit(limit)
+    query = PRODUCT_KEYSET.apply(query, cursor, skip, limit)
     
     products_result = await db.execute(query)
     products = products_result.scalars().all()
+    PRODUCT_KEYSET.set_next_cursor(response, products, limit)
     
-    return products
+    return json_rows([product_row(product) for product in products], headers=response.headers)
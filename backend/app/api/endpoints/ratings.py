@@ -1,46 +1,62 @@
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import models
-from app.db.database import get_db_session
+from app.db.database import get_db_session, get_read_db_session
+from app.db.ratings import (
+    add_product_rating as add_to_product_aggregate,
+    add_seller_rating as add_to_seller_aggregate,
+    product_rating_summary,
+    seller_rating_summary,
+)
 from app.db.models import (
+    BaseUser,
     ProductRatingCreate,
     ProductRatingResponse,
+    RatingSummary,
     SellerRatingCreate,
     SellerRatingResponse,
+    UserRoles,
 )
+from app.core.security import get_current_user, get_current_user_roles
 
 router = APIRouter()
 
 
+def _require_buyer(roles: UserRoles) -> None:
+    if not roles.is_buyer:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Only buyers can leave ratings"
+        )
+
+
 # Endpoint to add a product rating
 @router.post(
     "/product",
     response_model=ProductRatingResponse,
     status_code=status.HTTP_201_CREATED,
 )
-def add_product_rating(
+async def add_product_rating(
     rating_in: ProductRatingCreate,
-    buyer_id: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
-    # Check if product exists
-    product = (
-        db.query(models.Product)
-        .filter(models.Product.product_id == rating_in.product_id)
-        .first()
-    )
-    if not product:
+    _require_buyer(roles)
+    # Update the product's aggregates first; this also checks it exists
+    if not await add_to_product_aggregate(db, rating_in.product_id, rating_in.rating):
         raise HTTPException(status_code=404, detail="Product not found")
-    # Create ProductRating
+    # Create ProductRating in the same transaction
     rating = models.ProductRating(
         product_id=rating_in.product_id,
-        buyer_id=buyer_id,
+        buyer_id=current_user.user_id,
         rating=rating_in.rating,
         review_text=rating_in.review_text,
     )
     db.add(rating)
-    db.commit()
-    db.refresh(rating)
+    await db.commit()
+    await db.refresh(rating)
     return rating
 
 
@@ -48,27 +64,49 @@ def add_product_rating(
 @router.post(
     "/seller", response_model=SellerRatingResponse, status_code=status.HTTP_201_CREATED
 )
-def add_seller_rating(
+async def add_seller_rating(
     rating_in: SellerRatingCreate,
-    buyer_id: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
 ):
-    # Check if seller exists
-    seller = (
-        db.query(models.Seller)
-        .filter(models.Seller.user_id == rating_in.seller_id)
-        .first()
-    )
-    if not seller:
+    _require_buyer(roles)
+    # Update the seller's aggregates first; this also checks they exist
+    if not await add_to_seller_aggregate(db, rating_in.seller_id, rating_in.rating):
         raise HTTPException(status_code=404, detail="Seller not found")
-    # Create SellerRating
+    # Create SellerRating in the same transaction
     rating = models.SellerRating(
         seller_id=rating_in.seller_id,
-        buyer_id=buyer_id,
+        buyer_id=current_user.user_id,
         rating=rating_in.rating,
         review_text=rating_in.review_text,
     )
     db.add(rating)
-    db.commit()
-    db.refresh(rating)
+    await db.commit()
+    await db.refresh(rating)
     return rating
+
+
+# Rating summaries are read from the aggregates, not the rating rows
+@router.get("/product/{product_id}/summary", response_model=RatingSummary)
+async def get_product_rating_summary(
+    product_id: uuid.UUID,
+    db: AsyncSession = Depends(get_read_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+):
+    summary = await product_rating_summary(db, product_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return summary
+
+
+@router.get("/seller/{seller_id}/summary", response_model=RatingSummary)
+async def get_seller_rating_summary(
+    seller_id: uuid.UUID,
+    db: AsyncSession = Depends(get_read_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+):
+    summary = await seller_rating_summary(db, seller_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Seller not found")
+    return summary
@@ -1,22 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException
-from backend.app.db import crud, models, database
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+from typing import List, Optional
+
+from app.core.responses import json_rows
+from app.core.security import get_current_user, get_current_user_roles
+from app.db.database import get_db_session, get_read_db_session
+from app.db.models import (
+    BaseUser,
+    MarkdownPolicy,
+    MarkdownPolicyResponse,
+    MarkdownPolicyUpdate,
+    SurplusFeedItem,
+    UserRoles,
+)
+from app.db.surplus import apply_markdowns, reset_markdowns, surplus_feed
 
 router = APIRouter()
 
 
 # Endpoint: List all surplus items (for buyers)
-@router.get("/surplus-items", response_model=List[models.Inventory])
-def list_surplus_items():
-    db = database.get_db()
-    return crud.get_surplus_items(db)
-
-
-# Endpoint: Buy a surplus item
-@router.post("/buy-surplus/{item_id}")
-def buy_surplus_item(item_id: int, buyer_id: int):
-    db = database.get_db()
-    try:
-        return crud.buy_surplus_item(db, item_id, buyer_id)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+@router.get("/feed", response_model=List[SurplusFeedItem])
+async def list_surplus_items(
+    category: Optional[str] = Query(None, description="Filter by category"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+):
+    """
+    Near-expiry batches on offer, soonest expiry first. Served from the
+    feed precomputed by the surplus markdown job; quantities are as of the
+    last rebuild and are checked again when the order is placed.
+    """
+    rows = await surplus_feed.get(db)
+    if category:
+        category = category.lower()
+        rows = [row for row in rows if row["category"].lower() == category]
+    return json_rows(rows[skip : skip + limit])
+
+
+# Endpoint: The seller's markdown curve
+@router.get("/policy", response_model=MarkdownPolicyResponse)
+async def get_markdown_policy(
+    db: AsyncSession = Depends(get_read_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
+):
+    if not roles.is_seller:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only sellers have markdown policies",
+        )
+
+    result = await db.execute(
+        select(MarkdownPolicy).where(MarkdownPolicy.seller_id == current_user.user_id)
+    )
+    policy = result.scalar_one_or_none()
+    if not policy:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No markdown policy set"
+        )
+    return policy
+
+
+@router.put("/policy", response_model=MarkdownPolicyResponse)
+async def set_markdown_policy(
+    policy_data: MarkdownPolicyUpdate,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: BaseUser = Depends(get_current_user),
+    roles: UserRoles = Depends(get_current_user_roles),
+):
+    """
+    Create or replace the seller's markdown curve. The seller's current
+    markdowns are taken back and their batches marked down along the new
+    curve right away, so lowering or disabling a policy restores prices.
+    """
+    if not roles.is_seller:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only sellers have markdown policies",
+        )
+
+    values = policy_data.model_dump()
+    statement = insert(MarkdownPolicy).values(seller_id=current_user.user_id, **values)
+    result = await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[MarkdownPolicy.seller_id],
+            set_={**values, "updated_at": func.now()},
+        ).returning(MarkdownPolicy)
+    )
+    policy = result.scalar_one()
+    await reset_markdowns(db, current_user.user_id)
+    await apply_markdowns(db, seller_id=current_user.user_id)  # Commits
+    surplus_feed.mark_stale()
+    return policy
@@ -2,10 +2,31 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import BaseUserResponse, BaseUserInDB, BuyerResponse, SellerResponse
-from app.db.crud import get_buyer_profile, get_seller_profile, get_user_type
-from app.core.security import get_current_user
-from app.db.database import get_db_session
+from app.db.models import (
+    BaseUserResponse,
+    BaseUserInDB,
+    BuyerResponse,
+    SellerResponse,
+    BuyerUpdate,
+    SellerUpdate,
+    PasswordChange,
+    UserRoles,
+)
+from app.db.crud import (
+    get_buyer_profile,
+    get_seller_profile,
+    get_user_by_id,
+    update_buyer_profile,
+    update_seller_profile,
+    update_user_password,
+)
+from app.core.password import password_service
+from app.core.security import (
+    get_current_user,
+    get_current_user_roles,
+    invalidate_principal,
+)
+from app.db.database import get_db_session, get_read_db_session
 
 router = APIRouter()
 
@@ -25,18 +46,16 @@ async def read_user_profile(
 
 @router.get("/user/type")
 async def get_user_type_endpoint(
-    current_user: Annotated[BaseUserInDB, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db_session)],
+    roles: Annotated[UserRoles, Depends(get_current_user_roles)],
 ):
     """Get user type (buyer, seller, both, or none)."""
-    user_type = await get_user_type(db, current_user.user_id)
-    return {"user_type": user_type}
+    return {"user_type": roles.user_type}
 
 
 @router.get("/buyer/profile", response_model=BuyerResponse)
 async def read_buyer_profile(
     current_user: Annotated[BaseUserInDB, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db_session)],
+    db: Annotated[AsyncSession, Depends(get_read_db_session)],
 ):
     """Get buyer profile information."""
     buyer = await get_buyer_profile(db, current_user.user_id)
@@ -50,7 +69,7 @@ async def read_buyer_profile(
 @router.get("/seller/profile", response_model=SellerResponse)
 async def read_seller_profile(
     current_user: Annotated[BaseUserInDB, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db_session)],
+    db: Annotated[AsyncSession, Depends(get_read_db_session)],
 ):
     """Get seller profile information."""
     seller = await get_seller_profile(db, current_user.user_id)
@@ -59,3 +78,61 @@ async def read_seller_profile(
             status_code=status.HTTP_404_NOT_FOUND, detail="Seller profile not found"
         )
     return seller
+
+
+@router.put("/user/password")
+async def change_password(
+    password_data: PasswordChange,
+    current_user: Annotated[BaseUserInDB, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+):
+    """Change the current user's password."""
+    # The cached principal may predate a password change on another worker
+    user = await get_user_by_id(db, current_user.user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    if not await password_service.verify(
+        password_data.current_password, user.password_hash
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Current password is incorrect",
+        )
+
+    await update_user_password(db, current_user.user_id, password_data.new_password)
+    invalidate_principal(current_user.email)
+    return {"message": "Password updated successfully"}
+
+
+@router.put("/buyer/profile", response_model=BuyerResponse)
+async def update_buyer_profile_endpoint(
+    buyer_data: BuyerUpdate,
+    current_user: Annotated[BaseUserInDB, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+):
+    """Update buyer profile information."""
+    buyer = await update_buyer_profile(db, current_user.user_id, buyer_data)
+    if not buyer:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Buyer profile not found"
+        )
+    invalidate_principal(current_user.email)
+    return buyer
+
+
+@router.put("/seller/profile", response_model=SellerResponse)
+async def update_seller_profile_endpoint(
+    seller_data: SellerUpdate,
+    current_user: Annotated[BaseUserInDB, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db_session)],
+):
+    """Update seller profile information."""
+    seller = await update_seller_profile(db, current_user.user_id, seller_data)
+    if not seller:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Seller profile not found"
+        )
+    invalidate_principal(current_user.email)
+    return seller
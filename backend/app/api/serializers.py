@@ -0,0 +1,85 @@
+"""
+Plain-dict renderings of ORM rows for the list endpoints, returned with
+app.core.responses.json_rows. They produce the same JSON as the matching
+response models in app.db.models without building and validating a model
+per row; keep the two in sync when a response model changes.
+"""
+from typing import List, Optional
+
+from app.db.models import Inventory, Product, ProductAvailability
+
+_NO_DISCOUNT = {"solo_singletime": 0.0, "subscription": 0.0, "group": 0.0}
+
+
+def discount_row(discount: Optional[List[float]]) -> dict:
+    """DiscountStructure.from_array(discount)"""
+    if not discount or len(discount) != 3:
+        return dict(_NO_DISCOUNT)
+    return {
+        "solo_singletime": float(discount[0]),
+        "subscription": float(discount[1]),
+        "group": float(discount[2]),
+    }
+
+
+def inventory_row(inventory: Inventory) -> dict:
+    """InventoryResponse.from_orm_with_discount(inventory)"""
+    return {
+        "inventory_id": inventory.inventory_id,
+        "product_id": inventory.product_id,
+        "user_id": inventory.user_id,
+        "quantity": inventory.quantity,
+        "discount": discount_row(inventory.discount),
+        "expiry_date": inventory.expiry_date,
+        "is_surplus": inventory.is_surplus,
+        "surplus_discount": inventory.surplus_discount,
+        "created_at": inventory.created_at,
+        "updated_at": inventory.updated_at,
+    }
+
+
+def availability_row(availability: Optional[ProductAvailability]) -> Optional[dict]:
+    """ProductAvailabilityResponse"""
+    if availability is None:
+        return None
+    return {
+        "available_quantity": availability.available_quantity,
+        "active_batches": availability.active_batches,
+        "earliest_expiry": availability.earliest_expiry,
+        "best_singletime_price": availability.best_singletime_price,
+        "best_subscription_price": availability.best_subscription_price,
+        "best_group_price": availability.best_group_price,
+    }
+
+
+def product_row(product: Product) -> dict:
+    """ProductResponse"""
+    return {
+        "product_id": product.product_id,
+        "seller_id": product.seller_id,
+        "name": product.name,
+        "category": product.category,
+        "price": product.price,
+        "rating": product.rating,
+        "created_at": product.created_at,
+        "updated_at": product.updated_at,
+    }
+
+
+def product_with_inventory_row(product: Product) -> dict:
+    """
+    ProductWithInventoryResponse, for a product loaded with
+    selectinload(Product.inventories) and contains_eager(Product.availability).
+    """
+    return {
+        "product_id": product.product_id,
+        "seller_id": product.seller_id,
+        "name": product.name,
+        "category": product.category,
+        "price": product.price,
+        "rating": product.rating,
+        "created_at": product.created_at,
+        "inventory": None,
+        "inventories": [inventory_row(inventory) for inventory in product.inventories],
+        "availability": availability_row(product.availability),
+    }
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 from pydantic_settings import BaseSettings
 import cloudinary
 import cloudinary.uploader
@@ -8,6 +8,19 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Authenticated principal cache (set TTL to 0 to disable)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+
+    # Password hashing (bcrypt runs on its own thread pool)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_REHASH_ON_LOGIN: bool = False  # Rehash to BCRYPT_ROUNDS on login
+
+    # GET /metrics is served only to requests sending this value in the
+    # X-Metrics-Token header; empty disables the endpoint
+    METRICS_TOKEN: str = ""
+
     # PostgreSQL Settings
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
@@ -19,6 +32,59 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    # Engine profile (pool is per uvicorn worker: keep
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below max_connections)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 300
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection, 0 for pgbouncer
+    DB_ECHO: Union[bool, Literal["debug"]] = False  # true logs SQL, debug also logs rows
+    DB_CHECK_MIGRATIONS: bool = True  # Refuse to start unless the schema is at the Alembic head
+
+    # Read replicas for listing endpoints (comma-separated SQLAlchemy URLs)
+    DB_REPLICA_URLS: str = ""
+    DB_READ_YOUR_WRITES_SECONDS: int = 5  # Keep a writer on the primary this long
+
+    @property
+    def DB_REPLICA_URL_LIST(self) -> List[str]:
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
+    # Per-request SQL statement counting (X-DB-* response headers)
+    SQL_STATS_ENABLED: bool = True
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10  # Warn when one statement repeats more often
+
+    # Product availability projection (app.db.availability)
+    AVAILABILITY_SWEEP_INTERVAL_SECONDS: int = 3600  # Re-check projections of expired batches
+
+    # Stock decrements (app.db.allocation.reserve_items)
+    STOCK_RESERVE_ATTEMPTS: int = 5  # Re-allocations when concurrent orders take the same batches
+
+    # Per-product stock levels (app.db.stock), updated by this worker's writes
+    STOCK_CACHE_TTL_SECONDS: int = 30
+    STOCK_CACHE_MAX_SIZE: int = 50000
+
+    # Stock holds of pending group orders (app.db.holds)
+    GROUP_ORDER_HOLD_SECONDS: int = 86400  # Until the seller confirms or the holds lapse
+    STOCK_HOLD_SWEEP_INTERVAL_SECONDS: int = 60
+
+    # Surplus markdowns and feed (app.db.surplus)
+    SURPLUS_WINDOW_DAYS: int = 3  # Flag batches this close to expiry for sellers without a policy
+    SURPLUS_JOB_INTERVAL_SECONDS: int = 900
+    SURPLUS_FEED_MAX_ITEMS: int = 5000
+
+    # Stock ledger snapshots and expiry write-offs (app.db.ledger)
+    STOCK_SNAPSHOT_INTERVAL_SECONDS: int = 3600
+    STOCK_SNAPSHOT_LAG_SECONDS: int = 300  # Leave movements of still-open transactions to the next snapshot
+
+    # Bulk product import (POST /product/import)
+    IMPORT_CHUNK_SIZE: int = 1000  # Rows per INSERT and commit; Postgres allows 32767 parameters
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000
+
+    # Product facets (GET /product/facets), dropped on product and stock writes
+    FACETS_CACHE_TTL_SECONDS: int = 300
+
     # Cloudinary settings (optional for file uploads)
     CLOUDINARY_CLOUD_NAME: str = ""
     CLOUDINARY_API_KEY: str = ""
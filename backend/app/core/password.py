@@ -1,9 +1,107 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.config import settings
+
+_bcrypt_options = {"bcrypt__rounds": settings.BCRYPT_ROUNDS}
+if settings.PASSWORD_REHASH_ON_LOGIN:
+    # Hashes made with any other cost are flagged by verify_and_update()
+    _bcrypt_options["bcrypt__min_rounds"] = settings.BCRYPT_ROUNDS
+    _bcrypt_options["bcrypt__max_rounds"] = settings.BCRYPT_ROUNDS
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", **_bcrypt_options)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+class PasswordService:
+    """
+    Runs bcrypt hashing and verification on a dedicated, size-limited thread
+    pool so that it never blocks the event loop. Calls beyond the pool size
+    wait in line; the queue depth and timings are exposed through stats().
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = asyncio.Semaphore(max_workers)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password"
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait_seconds += started_at - queued_at
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.total_run_seconds += time.perf_counter() - started_at
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password. If it matches and the stored hash does not use the
+        configured cost, also return a replacement hash to store.
+        """
+        return await self._run(
+            pwd_context.verify_and_update, plain_password, hashed_password
+        )
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "avg_wait_ms": round(
+                self.total_wait_seconds * 1000 / self.completed, 2
+            ) if self.completed else 0.0,
+            "avg_run_ms": round(
+                self.total_run_seconds * 1000 / self.completed, 2
+            ) if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_service = PasswordService(max_workers=settings.PASSWORD_HASH_WORKERS)
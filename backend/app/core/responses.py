@@ -0,0 +1,45 @@
+from decimal import Decimal
+from typing import Any, Mapping, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# UTC datetimes end in "Z" and dict keys may be UUIDs/ints, as with Pydantic
+_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    # Same wire format as Pydantic: Decimal as a string so no precision is lost
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def json_bytes(content: Any) -> bytes:
+    """Encode with orjson; UUID, datetime and date are handled natively."""
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+def json_text(content: Any) -> str:
+    """json_bytes for text channels such as WebSocket send_text()."""
+    return json_bytes(content).decode()
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class of the app; renders with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return json_bytes(content)
+
+
+def json_rows(content: Any, headers: Optional[Mapping[str, str]] = None) -> FastJSONResponse:
+    """
+    Return already-serialized rows (see app.api.serializers) as-is. FastAPI
+    does not validate Response objects against the response_model, which
+    stays on the route for the OpenAPI schema. Pass the injected Response's
+    headers to keep e.g. X-Next-Cursor.
+    """
+    return FastJSONResponse(content, headers=headers)
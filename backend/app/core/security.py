@@ -1,4 +1,4 @@
-
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Annotated
 
@@ -7,14 +7,34 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.password import verify_password
-from app.db.models import TokenData, BaseUserInDB
-from app.db.database import get_db_session
-from app.db.crud import get_user_by_email
+from app.db.models import TokenData, BaseUserInDB, UserRoles
+from app.db.database import get_read_db_session
+from app.db.crud import get_user_by_email, get_user_type
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 
+# Authenticated users keyed by token subject (email), so repeat requests with
+# the same token skip the user lookup.
+principal_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+# Verified token payloads keyed by the raw token, never kept past token expiry
+token_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_principal(email: str) -> None:
+    """Drop a cached principal, e.g. after a password or profile change."""
+    principal_cache.pop(email)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -25,37 +45,104 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[AsyncSession, Depends(get_db_session)]
-) -> BaseUserInDB:
-    """
-    Dependency to get the current authenticated user from JWT token.
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: Optional[str] = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
 
-    user = await get_user_by_email(db, email=token_data.email)
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verify a JWT access token and return its payload.
+    Raises JWTError (or its ExpiredSignatureError subclass) if it is invalid.
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if payload.get("sub") is None:
+        raise JWTError("Token has no subject")
+
+    expires_in = payload.get("exp", 0) - datetime.now(timezone.utc).timestamp()
+    token_cache.set(token, payload, ttl=min(token_cache.ttl, expires_in))
+    return payload
+
+
+async def load_principal(db: AsyncSession, email: str) -> Optional[BaseUserInDB]:
+    """
+    Get the user for a token subject, from the principal cache when possible.
+    The session is only used on a cache miss.
+    """
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+
+    user = await get_user_by_email(db, email=email)
     if user is None:
-        raise credentials_exception
+        return None
     
     # Convert SQLAlchemy model to Pydantic model
-    return BaseUserInDB(
+    principal = BaseUserInDB(
         user_id=user.user_id,
         email=user.email,
         mobile_number=user.mobile_number,
         password_hash=user.password_hash,
         created_at=user.created_at
-    )
\ No newline at end of file
+    )
+    principal_cache.set(email, principal)
+    return principal
+
+
+async def resolve_user_roles(
+    db: AsyncSession, payload: dict, user_id: uuid.UUID
+) -> UserRoles:
+    """
+    Get buyer/seller roles from the token's user_type claim. Tokens issued
+    before the claim existed fall back to a single lookup.
+    """
+    user_type = payload.get("user_type")
+    if user_type is None:
+        user_type = await get_user_type(db, user_id)
+    return UserRoles.from_user_type(user_type)
+
+
+async def get_token_payload(
+    token: Annotated[str, Depends(oauth2_scheme)],
+) -> dict:
+    """
+    Dependency to decode and validate the JWT token.
+    FastAPI caches it per request, so the token is only decoded once.
+    """
+    try:
+        return decode_access_token(token)
+    except JWTError:
+        raise _credentials_exception()
+
+
+async def get_current_user(
+    payload: Annotated[dict, Depends(get_token_payload)],
+    db: Annotated[AsyncSession, Depends(get_read_db_session)]
+) -> BaseUserInDB:
+    """
+    Dependency to get the current authenticated user from JWT token.
+    """
+    token_data = TokenData(email=payload["sub"])
+
+    principal = await load_principal(db, token_data.email)
+    if principal is None:
+        raise _credentials_exception()
+    return principal
+
+
+async def get_current_user_roles(
+    payload: Annotated[dict, Depends(get_token_payload)],
+    current_user: Annotated[BaseUserInDB, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db_session)],
+) -> UserRoles:
+    """
+    Dependency to get the buyer/seller roles of the current user.
+    """
+    return await resolve_user_roles(db, payload, current_user.user_id)
\ No newline at end of file
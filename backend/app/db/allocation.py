@@ -0,0 +1,350 @@
+import asyncio
+import random
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.ledger import record_movements
+from app.db.models import Inventory, Product
+
+# Items of more than this many units get the group discount when the caller
+# doesn't decide (order creation and quoting)
+GROUP_PURCHASE_MIN_QUANTITY = 10
+
+# Position of each tier in Inventory.discount, see DiscountStructure.to_array
+_SINGLETIME, _SUBSCRIPTION, _GROUP = range(3)
+
+
+class ProductNotFound(Exception):
+    def __init__(self, product_id):
+        super().__init__(f"Product {product_id} not found")
+        self.product_id = product_id
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, product_name: str, requested: int, available: int):
+        super().__init__(
+            f"Insufficient inventory for {product_name}. "
+            f"Requested: {requested}, Available: {available}"
+        )
+        self.product_id = product_id
+        self.product_name = product_name
+        self.requested = requested
+        self.available = available
+
+
+class StockConflict(Exception):
+    """A batch no longer had the allocated units when they were taken out."""
+
+    def __init__(self, inventory_id):
+        super().__init__(f"Inventory batch {inventory_id} changed during allocation")
+        self.inventory_id = inventory_id
+
+
+class StockBatch:
+    """An in-stock, non-expired inventory batch as loaded for allocation."""
+
+    __slots__ = ("inventory_id", "product_id", "quantity", "discount", "expiry_date")
+
+    def __init__(self, inventory_id, product_id, quantity: int, discount, expiry_date):
+        self.inventory_id = inventory_id
+        self.product_id = product_id
+        self.quantity = quantity
+        self.discount = discount
+        self.expiry_date = expiry_date
+
+
+class StockProduct:
+    """A product with its batches in FIFO order (oldest first)."""
+
+    __slots__ = ("product_id", "name", "price", "batches")
+
+    def __init__(self, product_id, name: str, price: Decimal):
+        self.product_id = product_id
+        self.name = name
+        self.price = price
+        self.batches: List[StockBatch] = []
+
+    @property
+    def available(self) -> int:
+        return sum(batch.quantity for batch in self.batches)
+
+
+class BatchAllocation:
+    __slots__ = ("batch", "quantity", "discount_percent", "unit_price")
+
+    def __init__(self, batch: StockBatch, quantity: int, discount_percent: float, unit_price: Decimal):
+        self.batch = batch
+        self.quantity = quantity
+        self.discount_percent = discount_percent
+        self.unit_price = unit_price
+
+    @property
+    def total(self) -> Decimal:
+        return self.unit_price * self.quantity
+
+    def breakdown(self, list_price: Decimal) -> dict:
+        """The per-batch entry of the pricing endpoints."""
+        return {
+            "inventory_id": str(self.batch.inventory_id),
+            "quantity_from_batch": self.quantity,
+            "original_price_per_unit": float(list_price),
+            "discounted_price_per_unit": float(self.unit_price),
+            "discount_applied": self.discount_percent,
+            "batch_total": float(self.total),
+            "expiry_date": self.batch.expiry_date.isoformat()
+            if self.batch.expiry_date
+            else None,
+        }
+
+
+class ItemAllocation:
+    def __init__(self, product: StockProduct, quantity: int, available: int):
+        self.product = product
+        self.quantity = quantity
+        self.available = available  # Before this item was allocated
+        self.batches: List[BatchAllocation] = []
+
+    @property
+    def original_total(self) -> Decimal:
+        return self.product.price * self.quantity
+
+    @property
+    def discounted_total(self) -> Decimal:
+        return sum((batch.total for batch in self.batches), Decimal("0.00"))
+
+    @property
+    def price_per_unit(self) -> Decimal:
+        return self.discounted_total / self.quantity
+
+
+class Allocation:
+    def __init__(self, items: List[ItemAllocation]):
+        self.items = items
+
+    @property
+    def original_total(self) -> Decimal:
+        return sum((item.original_total for item in self.items), Decimal("0.00"))
+
+    @property
+    def discounted_total(self) -> Decimal:
+        return sum((item.discounted_total for item in self.items), Decimal("0.00"))
+
+    @property
+    def batch_quantities(self) -> Dict[object, int]:
+        """Units taken per inventory_id, for decrementing stock."""
+        taken: Dict[object, int] = {}
+        for item in self.items:
+            for allocated in item.batches:
+                inventory_id = allocated.batch.inventory_id
+                taken[inventory_id] = taken.get(inventory_id, 0) + allocated.quantity
+        return taken
+
+
+def discount_percent(discount: Optional[Sequence], purchase_type: str, is_group: bool) -> float:
+    """DiscountStructure.from_array(discount).get_applicable_discount(...) without the model."""
+    if not discount or len(discount) != 3:
+        return 0.0
+    if is_group:
+        return float(discount[_GROUP])
+    if purchase_type == "subscription":
+        return float(discount[_SUBSCRIPTION])
+    return float(discount[_SINGLETIME])
+
+
+def discounted_price(price: Decimal, percent: float) -> Decimal:
+    """Same arithmetic as DiscountStructure.calculate_discounted_price."""
+    return price - price * Decimal(percent) / Decimal(100)
+
+
+async def load_stock(
+    db: AsyncSession,
+    product_ids: Iterable,
+    seller_id=None,
+    on_date: Optional[date] = None,
+) -> Dict[object, StockProduct]:
+    """
+    Load the products and their in-stock, non-expired batches (oldest first)
+    in one query. Products of another seller are left out when seller_id
+    is given.
+    """
+    on_date = on_date or date.today()
+    query = (
+        select(
+            Product.product_id,
+            Product.name,
+            Product.price,
+            Inventory.inventory_id,
+            Inventory.quantity,
+            Inventory.discount,
+            Inventory.expiry_date,
+        )
+        .outerjoin(
+            Inventory,
+            and_(
+                Inventory.product_id == Product.product_id,
+                Inventory.quantity > 0,
+                (Inventory.expiry_date.is_(None)) | (Inventory.expiry_date >= on_date),
+            ),
+        )
+        .where(Product.product_id.in_(set(product_ids)))
+        .order_by(Product.product_id, Inventory.created_at, Inventory.inventory_id)
+    )
+    if seller_id is not None:
+        query = query.where(Product.seller_id == seller_id)
+
+    result = await db.execute(query)
+    products: Dict[object, StockProduct] = {}
+    for row in result.all():
+        product = products.get(row.product_id)
+        if product is None:
+            product = products[row.product_id] = StockProduct(
+                row.product_id, row.name, row.price
+            )
+        if row.inventory_id is not None:
+            product.batches.append(
+                StockBatch(
+                    row.inventory_id,
+                    row.product_id,
+                    row.quantity,
+                    row.discount,
+                    row.expiry_date,
+                )
+            )
+    return products
+
+
+def allocate(
+    products: Dict[object, StockProduct],
+    items: Sequence[Tuple[object, int]],
+    purchase_type: str = "solo_singletime",
+    is_group: Optional[bool] = None,
+    remaining: Optional[Dict[object, int]] = None,
+) -> Allocation:
+    """
+    Allocate (product_id, quantity) items to batches first-in-first-out and
+    price each batch with its discount. is_group=None applies the group
+    discount to items above GROUP_PURCHASE_MIN_QUANTITY units. Items for
+    the same product draw from what earlier items left. It doesn't change
+    ``products``; pass a ``remaining`` dict (units left per inventory_id)
+    to carry what was taken over to later calls on the same products; the
+    item that raises has taken nothing from it.
+    """
+    remaining = {} if remaining is None else remaining
+    allocated_items = []
+
+    for product_id, quantity in items:
+        product = products.get(product_id)
+        if product is None:
+            raise ProductNotFound(product_id)
+
+        batches = [
+            (batch, remaining.get(batch.inventory_id, batch.quantity))
+            for batch in product.batches
+        ]
+        available = sum(left for _, left in batches)
+        if available < quantity:
+            raise InsufficientStock(product_id, product.name, quantity, available)
+
+        item_is_group = quantity > GROUP_PURCHASE_MIN_QUANTITY if is_group is None else is_group
+        item = ItemAllocation(product, quantity, available)
+        needed = quantity
+        for batch, left in batches:
+            if needed <= 0:
+                break
+            if left <= 0:
+                continue
+            take = min(needed, left)
+            percent = discount_percent(batch.discount, purchase_type, item_is_group)
+            item.batches.append(
+                BatchAllocation(batch, take, percent, discounted_price(product.price, percent))
+            )
+            remaining[batch.inventory_id] = left - take
+            needed -= take
+
+        allocated_items.append(item)
+
+    return Allocation(allocated_items)
+
+
+async def allocate_items(
+    db: AsyncSession,
+    items: Sequence[Tuple[object, int]],
+    seller_id=None,
+    purchase_type: str = "solo_singletime",
+    is_group: Optional[bool] = None,
+) -> Allocation:
+    """load_stock() for every product of the items, then allocate()."""
+    products = await load_stock(db, (product_id for product_id, _ in items), seller_id)
+    return allocate(products, items, purchase_type, is_group)
+
+
+async def apply_allocation(
+    db: AsyncSession, allocation: Allocation, movement_kind: str = "sale"
+) -> None:
+    """
+    Take the allocated units out of their batches and record them in the
+    stock ledger as ``movement_kind`` movements. Each decrement is
+    conditional on the batch still holding the units, so a concurrent order
+    can never drive a batch negative; StockConflict is raised instead, with
+    the earlier decrements of this allocation left for the caller to roll
+    back. Batches are updated in inventory_id order so two orders touching
+    the same batches lock them in the same order and can't deadlock.
+    """
+    for inventory_id, quantity in sorted(allocation.batch_quantities.items()):
+        result = await db.execute(
+            update(Inventory)
+            .where(
+                Inventory.inventory_id == inventory_id,
+                Inventory.quantity >= quantity,
+            )
+            .values(quantity=Inventory.quantity - quantity)
+            .returning(Inventory.inventory_id)
+        )
+        if result.scalar_one_or_none() is None:
+            raise StockConflict(inventory_id)
+    await record_movements(
+        db,
+        (
+            (
+                allocated.batch.inventory_id,
+                item.product.product_id,
+                movement_kind,
+                -allocated.quantity,
+            )
+            for item in allocation.items
+            for allocated in item.batches
+        ),
+    )
+
+
+async def reserve_items(
+    db: AsyncSession,
+    items: Sequence[Tuple[object, int]],
+    seller_id=None,
+    purchase_type: str = "solo_singletime",
+    is_group: Optional[bool] = None,
+    movement_kind: str = "sale",
+) -> Allocation:
+    """
+    Allocate the items and take them out of stock in the current transaction.
+    When another order wins a batch in between, the decrements are undone
+    (savepoint) and the items are allocated again from fresh stock, up to
+    STOCK_RESERVE_ATTEMPTS times. Raises InsufficientStock once the stock is
+    really gone, StockConflict if contention outlasts the attempts.
+    """
+    for attempt in range(1, settings.STOCK_RESERVE_ATTEMPTS + 1):
+        allocation = await allocate_items(db, items, seller_id, purchase_type, is_group)
+        try:
+            async with db.begin_nested():
+                await apply_allocation(db, allocation, movement_kind)
+            return allocation
+        except StockConflict:
+            if attempt == settings.STOCK_RESERVE_ATTEMPTS:
+                raise
+            # Jittered backoff so the losers of a race don't collide again
+            await asyncio.sleep(random.uniform(0, 0.005 * attempt))
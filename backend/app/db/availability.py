@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.facets import facet_cache
+from app.db.jobs import job_lock
+from app.db.models import (
+    DiscountStructure,
+    Inventory,
+    Product,
+    ProductAvailability,
+    StockLevel,
+)
+from app.db.stock import stock_cache
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+
+# (projection column, purchase_type, is_group) for each price tier
+PRICE_TIERS = (
+    ("best_singletime_price", "solo_singletime", False),
+    ("best_subscription_price", "subscription", False),
+    ("best_group_price", "solo_singletime", True),
+)
+
+
+def summarize_batches(price: Decimal, batches: Iterable) -> dict:
+    """Projection values for one product from its in-stock, non-expired batches."""
+    batches = list(batches)
+    summary = {
+        "available_quantity": sum(batch.quantity for batch in batches),
+        "active_batches": len(batches),
+        "earliest_expiry": min(
+            (batch.expiry_date for batch in batches if batch.expiry_date), default=None
+        ),
+    }
+    for column, purchase_type, is_group in PRICE_TIERS:
+        summary[column] = min(
+            (
+                DiscountStructure.from_array(batch.discount)
+                .calculate_discounted_price(price, purchase_type, is_group)
+                .quantize(CENT, rounding=ROUND_HALF_UP)
+                for batch in batches
+            ),
+            default=None,
+        )
+    return summary
+
+
+async def refresh_product_availability(db: AsyncSession, *product_ids) -> None:
+    """
+    Recompute the availability projection of the given products inside the
+    caller's transaction. Call it after changing their inventory batches or
+    price and before committing.
+
+    The product rows are locked first, so concurrent refreshes of the same
+    product run one after the other and the later one reads the earlier
+    one's committed batches instead of overwriting it with a stale sum.
+    """
+    product_ids = sorted(set(product_ids), key=str)
+    if not product_ids:
+        return
+    facet_cache.mark_dirty(db)
+
+    prices_result = await db.execute(
+        select(Product.product_id, Product.price)
+        .where(Product.product_id.in_(product_ids))
+        .order_by(Product.product_id)
+        .with_for_update(key_share=True)
+    )
+    prices = dict(prices_result.all())
+    for product_id in product_ids:
+        if product_id not in prices:  # Deleted
+            stock_cache.stage(db, product_id, None)
+    if not prices:
+        return
+
+    today = date.today()
+    batches_result = await db.execute(
+        select(
+            Inventory.product_id,
+            Inventory.quantity,
+            Inventory.discount,
+            Inventory.expiry_date,
+        ).where(
+            and_(
+                Inventory.product_id.in_(list(prices)),
+                Inventory.quantity > 0,
+                (Inventory.expiry_date.is_(None)) | (Inventory.expiry_date >= today),
+            )
+        )
+    )
+    batches: Dict[object, List] = {product_id: [] for product_id in prices}
+    for batch in batches_result.all():
+        batches[batch.product_id].append(batch)
+
+    rows = [
+        {"product_id": product_id, **summarize_batches(prices[product_id], batches[product_id])}
+        for product_id in prices
+    ]
+    for row in rows:
+        stock_cache.stage(
+            db,
+            row["product_id"],
+            StockLevel(
+                product_id=row["product_id"],
+                available_quantity=row["available_quantity"],
+                active_batches=row["active_batches"],
+                earliest_expiry=row["earliest_expiry"],
+            ),
+        )
+    statement = insert(ProductAvailability).values(rows)
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[ProductAvailability.product_id],
+            set_={
+                **{
+                    column: statement.excluded[column]
+                    for column in rows[0]
+                    if column != "product_id"
+                },
+                "refreshed_at": func.now(),
+            },
+        )
+    )
+
+
+async def refresh_stale_availability(db: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Refresh projections that went stale without a write: a counted batch
+    has expired since, or the product has no projection row yet (created
+    before the projection existed). Returns the number of products refreshed.
+    """
+    refreshed = 0
+    while True:
+        stale_result = await db.execute(
+            select(Product.product_id)
+            .outerjoin(ProductAvailability)
+            .where(
+                or_(
+                    ProductAvailability.product_id.is_(None),
+                    ProductAvailability.earliest_expiry < date.today(),
+                )
+            )
+            .limit(batch_size)
+        )
+        stale = stale_result.scalars().all()
+        if not stale:
+            return refreshed
+        await refresh_product_availability(db, *stale)
+        await db.commit()
+        refreshed += len(stale)
+
+
+async def run_availability_sweeper() -> None:
+    """
+    Background task refreshing stale projections every
+    AVAILABILITY_SWEEP_INTERVAL_SECONDS, in one worker at a time.
+    """
+    while True:
+        try:
+            async with job_lock("availability_sweeper") as acquired:
+                if acquired:
+                    async with AsyncSessionLocal() as db:
+                        refreshed = await refresh_stale_availability(db)
+                    if refreshed:
+                        logger.info("Refreshed availability of %d products", refreshed)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Availability sweep failed")
+        await asyncio.sleep(settings.AVAILABILITY_SWEEP_INTERVAL_SECONDS)
@@ -0,0 +1,236 @@
+import codecs
+import csv
+import io
+import json
+import logging
+import uuid
+from typing import AsyncIterator, List, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.availability import refresh_product_availability
+from app.db.ledger import record_movements
+from app.db.models import (
+    ImportReport,
+    ImportRowError,
+    Inventory,
+    Product,
+    ProductImportRow,
+)
+
+logger = logging.getLogger(__name__)
+
+CSV_CONTENT_TYPES = {"text/csv", "application/csv"}
+NDJSON_CONTENT_TYPES = {
+    "application/x-ndjson",
+    "application/ndjson",
+    "application/jsonl",
+    "application/x-jsonlines",
+}
+
+# (row number, field values or a parse error)
+ParsedRow = Tuple[int, Union[dict, str]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a UTF-8 byte stream into lines (with their newline) as it arrives."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[ParsedRow]:
+    """
+    Rows of a CSV stream whose first record is the header. A record may span
+    lines inside a quoted field, so lines are joined until the quotes balance.
+    Empty cells are left out so they fall back to the field defaults.
+    """
+    header = None
+    record = ""
+    row_number = 0
+    async for line in lines:
+        record += line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader(io.StringIO(record)), [])
+        record = ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, f"expected {len(header)} columns, got {len(values)}"
+        else:
+            yield row_number, {
+                name: value.strip()
+                for name, value in zip(header, values)
+                if value.strip()
+            }
+    if record.strip():
+        yield row_number + 1, "unterminated quoted field"
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[ParsedRow]:
+    """Rows of a newline-delimited JSON stream, one object per line."""
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield row_number, f"invalid JSON: {exc}"
+            continue
+        if isinstance(data, dict):
+            yield row_number, data
+        else:
+            yield row_number, "expected a JSON object"
+
+
+def iter_import_rows(chunks: AsyncIterator[bytes], content_type: str) -> AsyncIterator[ParsedRow]:
+    lines = iter_lines(chunks)
+    if content_type in CSV_CONTENT_TYPES:
+        return iter_csv_rows(lines)
+    return iter_ndjson_rows(lines)
+
+
+class BulkImporter:
+    """
+    Validates import rows and writes them in chunks: one multi-row INSERT
+    per table and one commit per chunk, so import time grows with the
+    number of rows rather than with requests or statements per row. A chunk
+    that fails to write is rolled back and its rows are reported as failed;
+    earlier chunks stay committed.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        seller_id: uuid.UUID,
+        chunk_size: int,
+        max_reported_errors: int,
+    ):
+        self.db = db
+        self.seller_id = seller_id
+        self.chunk_size = chunk_size
+        self.max_reported_errors = max_reported_errors
+        self.report = ImportReport()
+
+    def _fail(self, row_number: int, errors: List[str]) -> None:
+        self.report.failed += 1
+        if len(self.report.errors) < self.max_reported_errors:
+            self.report.errors.append(ImportRowError(row=row_number, errors=errors))
+
+    async def run(self, rows: AsyncIterator[ParsedRow]) -> ImportReport:
+        chunk: List[Tuple[int, ProductImportRow]] = []
+        try:
+            async for row_number, data in rows:
+                self.report.rows += 1
+                if isinstance(data, str):
+                    self._fail(row_number, [data])
+                    continue
+                try:
+                    chunk.append((row_number, ProductImportRow.model_validate(data)))
+                except ValidationError as exc:
+                    self._fail(row_number, [_format_error(error) for error in exc.errors()])
+                    continue
+                if len(chunk) >= self.chunk_size:
+                    await self._write(chunk)
+                    chunk = []
+        except UnicodeDecodeError:
+            self._fail(self.report.rows + 1, ["not valid UTF-8, the import stopped here"])
+
+        if chunk:
+            await self._write(chunk)
+        self.report.errors.sort(key=lambda error: error.row)
+        return self.report
+
+    async def _write(self, chunk: List[Tuple[int, ProductImportRow]]) -> None:
+        existing_ids = {row.product_id for _, row in chunk if row.product_id is not None}
+        owned = set()
+        if existing_ids:
+            owned_result = await self.db.execute(
+                select(Product.product_id).where(
+                    Product.product_id.in_(existing_ids),
+                    Product.seller_id == self.seller_id,
+                )
+            )
+            owned = set(owned_result.scalars().all())
+
+        products, batches, written = [], [], []
+        for row_number, row in chunk:
+            if row.product_id is not None and row.product_id not in owned:
+                self._fail(row_number, ["product_id: product not found or you don't own it"])
+                continue
+
+            product_id = row.product_id or uuid.uuid4()
+            if row.product_id is None:
+                products.append(
+                    {
+                        "product_id": product_id,
+                        "seller_id": self.seller_id,
+                        "name": row.name,
+                        "category": row.category,
+                        "price": row.price,
+                    }
+                )
+            if row.quantity is not None:
+                batches.append(
+                    {
+                        "inventory_id": uuid.uuid4(),
+                        "product_id": product_id,
+                        "user_id": self.seller_id,
+                        "quantity": row.quantity,
+                        "discount": row.discount.to_array(),
+                        "expiry_date": row.expiry_date,
+                    }
+                )
+            written.append((row_number, product_id))
+
+        if not written:
+            return
+
+        try:
+            if products:
+                await self.db.execute(insert(Product).values(products))
+            if batches:
+                await self.db.execute(insert(Inventory).values(batches))
+                await record_movements(
+                    self.db,
+                    (
+                        (batch["inventory_id"], batch["product_id"], "receipt", batch["quantity"])
+                        for batch in batches
+                    ),
+                )
+            await refresh_product_availability(
+                self.db, *(product_id for _, product_id in written)
+            )
+            await self.db.commit()
+        except SQLAlchemyError as exc:
+            await self.db.rollback()
+            logger.warning("Import chunk of %d rows failed: %s", len(written), exc)
+            for row_number, _ in written:
+                self._fail(row_number, [f"not imported, the chunk failed to write ({type(exc).__name__})"])
+            return
+
+        self.report.products_created += len(products)
+        self.report.inventory_batches_created += len(batches)
+
+
+def _format_error(error: dict) -> str:
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
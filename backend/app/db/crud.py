@@ -3,7 +3,7 @@ from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, exists
 
 from app.db.models import (
     BaseUser,
@@ -19,8 +19,10 @@ from app.db.models import (
     BaseUserCreate,
     BuyerCreate,
     SellerCreate,
+    BuyerUpdate,
+    SellerUpdate,
 )
-from app.core.password import get_password_hash
+from app.core.password import password_service
 
 # --- Base User CRUD ---
 
@@ -51,7 +53,7 @@ async def create_user_account(db: AsyncSession, user_data: UserRegister) -> Base
     """Create a new user account with buyer/seller profiles based on user_type."""
 
     # Create base user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_service.hash(user_data.password)
     base_user = BaseUser(
         email=user_data.email,
         mobile_number=user_data.mobile_number,
@@ -86,11 +88,13 @@ async def create_user_account(db: AsyncSession, user_data: UserRegister) -> Base
 
 async def get_user_type(db: AsyncSession, user_id: uuid.UUID) -> str:
     """Determine if user is buyer, seller, or both."""
-    buyer_result = await db.execute(select(Buyer).where(Buyer.user_id == user_id))
-    seller_result = await db.execute(select(Seller).where(Seller.user_id == user_id))
-
-    is_buyer = buyer_result.scalar_one_or_none() is not None
-    is_seller = seller_result.scalar_one_or_none() is not None
+    result = await db.execute(
+        select(
+            exists().where(Buyer.user_id == user_id),
+            exists().where(Seller.user_id == user_id),
+        )
+    )
+    is_buyer, is_seller = result.one()
 
     if is_buyer and is_seller:
         return "both"
@@ -114,6 +118,52 @@ async def get_seller_profile(db: AsyncSession, user_id: uuid.UUID) -> Optional[S
     return result.scalar_one_or_none()
 
 
+async def update_user_password(
+    db: AsyncSession, user_id: uuid.UUID, new_password: str
+) -> Optional[BaseUser]:
+    """Set a new password for a user."""
+    user = await get_user_by_id(db, user_id)
+    if not user:
+        return None
+
+    user.password_hash = await password_service.hash(new_password)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def update_buyer_profile(
+    db: AsyncSession, user_id: uuid.UUID, buyer_data: BuyerUpdate
+) -> Optional[Buyer]:
+    """Update the provided fields of a buyer profile."""
+    buyer = await get_buyer_profile(db, user_id)
+    if not buyer:
+        return None
+
+    for field, value in buyer_data.model_dump(exclude_unset=True).items():
+        setattr(buyer, field, value)
+
+    await db.commit()
+    await db.refresh(buyer)
+    return buyer
+
+
+async def update_seller_profile(
+    db: AsyncSession, user_id: uuid.UUID, seller_data: SellerUpdate
+) -> Optional[Seller]:
+    """Update the provided fields of a seller profile."""
+    seller = await get_seller_profile(db, user_id)
+    if not seller:
+        return None
+
+    for field, value in seller_data.model_dump(exclude_unset=True).items():
+        setattr(seller, field, value)
+
+    await db.commit()
+    await db.refresh(seller)
+    return seller
+
+
 # --- Product CRUD ---
 
 
@@ -1,18 +1,42 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import MetaData
 from typing import AsyncGenerator
 import logging
 
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncPool
+
+
+def build_engine(url: str, **overrides) -> AsyncEngine:
+    """
+    Create an async engine using the pool profile from settings.
+    Keyword arguments override the profile; connect_args are merged.
+    """
+    connect_args = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    connect_args.update(overrides.pop("connect_args", {}))
+
+    options = dict(
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    options.update(overrides)
+    return create_async_engine(url, **options)
+
 
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,  # Set to False in production
-    pool_pre_ping=True,
-    pool_recycle=300,
-)
+engine = build_engine(settings.DATABASE_URL)
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -21,6 +45,44 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Engine for pure reads: shares the pool, but connections run in autocommit
+# mode, so no transaction is opened and there is nothing to commit
+read_engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
+class ReadOnlySession(AsyncSession):
+    """
+    Session for read-only requests. AsyncSession.execute() already buffers
+    the rows, so the connection is handed back to the pool after every
+    statement instead of at the end of the request. Loaded objects are
+    detached, which is fine for handlers that only serialize them.
+    """
+
+    async def execute(self, *args, **kwargs):
+        try:
+            return await super().execute(*args, **kwargs)
+        finally:
+            await self.close()
+
+    async def scalar(self, *args, **kwargs):
+        try:
+            return await super().scalar(*args, **kwargs)
+        finally:
+            await self.close()
+
+    async def get(self, *args, **kwargs):
+        try:
+            return await super().get(*args, **kwargs)
+        finally:
+            await self.close()
+
+
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=ReadOnlySession,
+    expire_on_commit=False,
+)
+
 # Database base class
 class Base(DeclarativeBase):
     metadata = MetaData()
@@ -37,11 +99,16 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
-# Function to create tables
-async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        
+# Dependency for GET endpoints: never commits
+async def get_read_db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with ReadSessionLocal() as session:
+        yield session
+
 # Function to close database connection
 async def close_db_connection():
     await engine.dispose()
+
+
+def pool_stats() -> dict:
+    """Live connection pool statistics for this worker."""
+    return engine.pool.stats()
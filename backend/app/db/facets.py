@@ -0,0 +1,130 @@
+import asyncio
+from decimal import Decimal
+from typing import List
+
+from sqlalchemy import and_, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.models import (
+    CategoryFacet,
+    PriceRangeFacet,
+    Product,
+    ProductAvailability,
+    ProductFacetsResponse,
+)
+
+# Upper bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES = [Decimal(edge) for edge in (50, 100, 250, 500, 1000)]
+
+_FACETS_KEY = "facets"
+_DIRTY_FLAG = "facets_dirty"
+
+
+class FacetCache:
+    """
+    Caches the product facets of this worker. Writes that change products
+    or stock call mark_dirty(db); the cache is dropped once that session
+    commits, so the next read recomputes. Other workers catch up within
+    FACETS_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, ttl: float):
+        self.cache = TTLCache(max_size=1, ttl=ttl)
+        self.generation = 0
+        self.invalidations = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self.invalidations += 1
+        self.cache.clear()
+
+    def mark_dirty(self, db: AsyncSession) -> None:
+        db.sync_session.info[_DIRTY_FLAG] = True
+
+    async def get(self, db: AsyncSession) -> ProductFacetsResponse:
+        facets = self.cache.get(_FACETS_KEY)
+        if facets is not None:
+            return facets
+
+        # One computation at a time; waiters reuse its result
+        async with self._lock:
+            facets = self.cache.get(_FACETS_KEY)
+            if facets is not None:
+                return facets
+            generation = self.generation
+            facets = await compute_facets(db)
+            # Don't store a result that a commit made stale mid-computation
+            if generation == self.generation:
+                self.cache.set(_FACETS_KEY, facets)
+            return facets
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "invalidations": self.invalidations}
+
+
+facet_cache = FacetCache(ttl=settings.FACETS_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_FLAG, False):
+        facet_cache.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(_DIRTY_FLAG, None)
+
+
+def _price_buckets() -> List[tuple]:
+    bounds = [Decimal(0), *PRICE_BUCKET_EDGES]
+    return list(zip(bounds, PRICE_BUCKET_EDGES + [None]))
+
+
+async def compute_facets(db: AsyncSession) -> ProductFacetsResponse:
+    """Category counts, price buckets and in-stock counts in two aggregate queries."""
+    in_stock = ProductAvailability.available_quantity > 0
+
+    categories_result = await db.execute(
+        select(
+            Product.category,
+            func.count(),
+            func.count().filter(in_stock),
+        )
+        .outerjoin(Product.availability)
+        .group_by(Product.category)
+        .order_by(func.count().desc(), Product.category)
+    )
+
+    buckets = _price_buckets()
+    bucket_counts = [
+        func.count().filter(
+            and_(Product.price >= low, Product.price < high)
+            if high is not None
+            else Product.price >= low
+        )
+        for low, high in buckets
+    ]
+    totals_result = await db.execute(
+        select(func.count(), func.count().filter(in_stock), *bucket_counts)
+        .select_from(Product)
+        .outerjoin(Product.availability)
+    )
+    total, total_in_stock, *counts = totals_result.one()
+
+    return ProductFacetsResponse(
+        total_products=total,
+        in_stock_products=total_in_stock,
+        categories=[
+            CategoryFacet(category=category, count=count, in_stock=stocked)
+            for category, count, stocked in categories_result.all()
+        ],
+        price_ranges=[
+            PriceRangeFacet(min_price=low, max_price=high, count=count)
+            for (low, high), count in zip(buckets, counts)
+        ],
+    )
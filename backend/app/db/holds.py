@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.allocation import Allocation, reserve_items
+from app.db.availability import refresh_product_availability
+from app.db.database import AsyncSessionLocal
+from app.db.jobs import job_lock
+from app.db.ledger import record_movements
+from app.db.models import GroupOrderParticipant, Inventory, StockHold
+
+logger = logging.getLogger(__name__)
+
+
+async def place_holds(
+    db: AsyncSession,
+    allocation: Allocation,
+    buyer_id,
+    ttl_seconds: int,
+    order_id=None,
+    participant_id=None,
+) -> datetime:
+    """
+    Record holds for an allocation whose units reserve_items() already took
+    out of stock, one per batch. Returns when they expire.
+    """
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+    rows = [
+        {
+            "hold_id": uuid.uuid4(),
+            "inventory_id": allocated.batch.inventory_id,
+            "product_id": item.product.product_id,
+            "buyer_id": buyer_id,
+            "order_id": order_id,
+            "participant_id": participant_id,
+            "quantity": allocated.quantity,
+            "expires_at": expires_at,
+        }
+        for item in allocation.items
+        for allocated in item.batches
+    ]
+    if rows:
+        await db.execute(insert(StockHold).values(rows))
+    return expires_at
+
+
+async def hold_items(
+    db: AsyncSession,
+    items: Sequence[Tuple[object, int]],
+    buyer_id,
+    ttl_seconds: int,
+    seller_id=None,
+    order_id=None,
+    participant_id=None,
+) -> Tuple[Allocation, datetime]:
+    """
+    reserve_items() and place_holds() on the result, in the caller's
+    transaction, with the products' availability refreshed.
+    """
+    allocation = await reserve_items(
+        db, items, seller_id=seller_id, movement_kind="reservation"
+    )
+    expires_at = await place_holds(
+        db, allocation, buyer_id, ttl_seconds, order_id, participant_id
+    )
+    await refresh_product_availability(
+        db, *(item.product.product_id for item in allocation.items)
+    )
+    return allocation, expires_at
+
+
+def _owner_condition(order_id, participant_id):
+    if order_id is None and participant_id is None:
+        raise ValueError("order_id or participant_id is required")
+    if participant_id is not None:
+        return StockHold.participant_id == participant_id
+    return StockHold.order_id == order_id
+
+
+async def _release(db: AsyncSession, condition) -> List:
+    """
+    Delete the matching holds, put their units back into the batches and
+    book them as negative reservations in the stock ledger.
+    """
+    result = await db.execute(
+        delete(StockHold)
+        .where(condition)
+        .returning(
+            StockHold.inventory_id,
+            StockHold.product_id,
+            StockHold.participant_id,
+            StockHold.quantity,
+        )
+    )
+    released = result.all()
+
+    returned: Dict[object, int] = {}
+    for hold in released:
+        returned[hold.inventory_id] = returned.get(hold.inventory_id, 0) + hold.quantity
+    # Same lock order as apply_allocation
+    for inventory_id, quantity in sorted(returned.items()):
+        await db.execute(
+            update(Inventory)
+            .where(Inventory.inventory_id == inventory_id)
+            .values(quantity=Inventory.quantity + quantity)
+        )
+    await record_movements(
+        db,
+        (
+            (hold.inventory_id, hold.product_id, "reservation", hold.quantity)
+            for hold in released
+        ),
+    )
+    await refresh_product_availability(db, *(hold.product_id for hold in released))
+    return released
+
+
+async def release_holds(db: AsyncSession, order_id=None, participant_id=None) -> int:
+    """
+    Give the held units of a participant (or of every participant of an
+    order) back to stock. Returns the number of units released.
+    """
+    released = await _release(db, _owner_condition(order_id, participant_id))
+    return sum(hold.quantity for hold in released)
+
+
+async def confirm_holds(db: AsyncSession, order_id=None, participant_id=None) -> int:
+    """
+    Turn the holds of a participant (or of an order) into a plain decrement:
+    the units stay out of stock and the holds are dropped, so they no longer
+    expire. The ledger moves the units from reserved to sold. Returns the
+    number of units confirmed.
+    """
+    result = await db.execute(
+        delete(StockHold)
+        .where(_owner_condition(order_id, participant_id))
+        .returning(StockHold.inventory_id, StockHold.product_id, StockHold.quantity)
+    )
+    confirmed = result.all()
+    await record_movements(
+        db,
+        (
+            movement
+            for hold in confirmed
+            for movement in (
+                (hold.inventory_id, hold.product_id, "reservation", hold.quantity),
+                (hold.inventory_id, hold.product_id, "sale", -hold.quantity),
+            )
+        ),
+    )
+    return sum(hold.quantity for hold in confirmed)
+
+
+async def release_expired_holds(
+    db: AsyncSession, now: Optional[datetime] = None, batch_size: int = 500
+) -> int:
+    """
+    Release holds past their expiry, batch_size at a time, and mark the
+    group order participants that held them as expired. Expired holds are
+    found through ix_stock_holds_expires_at, so a sweep costs in proportion
+    to what expired rather than to the number of holds. The sweep runs in
+    one worker at a time (see run_hold_sweeper); SKIP LOCKED only keeps it
+    from blocking on holds that confirm_holds() or release_holds() are
+    changing at that moment. Returns the number of holds released.
+    """
+    now = now or datetime.now(timezone.utc)
+    released_holds = 0
+    while True:
+        expired = (
+            select(StockHold.hold_id)
+            .where(StockHold.expires_at <= now)
+            .order_by(StockHold.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        released = await _release(db, StockHold.hold_id.in_(expired))
+        if not released:
+            await db.commit()
+            return released_holds
+
+        participant_ids = {hold.participant_id for hold in released if hold.participant_id}
+        if participant_ids:
+            await db.execute(
+                update(GroupOrderParticipant)
+                .where(
+                    GroupOrderParticipant.participant_id.in_(participant_ids),
+                    GroupOrderParticipant.status.in_(("pending", "confirmed")),
+                )
+                .values(status="expired")
+            )
+        await db.commit()
+        released_holds += len(released)
+
+
+async def run_hold_sweeper() -> None:
+    """
+    Background task releasing expired holds every
+    STOCK_HOLD_SWEEP_INTERVAL_SECONDS, in one worker at a time.
+    """
+    while True:
+        try:
+            async with job_lock("hold_sweeper") as acquired:
+                if acquired:
+                    async with AsyncSessionLocal() as db:
+                        released = await release_expired_holds(db)
+                    if released:
+                        logger.info("Released %d expired stock holds", released)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Stock hold sweep failed")
+        await asyncio.sleep(settings.STOCK_HOLD_SWEEP_INTERVAL_SECONDS)
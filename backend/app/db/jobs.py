@@ -0,0 +1,39 @@
+import zlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import read_engine
+
+
+def _lock_key(name: str) -> int:
+    return zlib.crc32(f"saathi.job.{name}".encode())
+
+
+@asynccontextmanager
+async def job_lock(name: str) -> AsyncIterator[bool]:
+    """
+    Cluster-wide lock for a background job. Every uvicorn worker runs the
+    job loops; only the one holding the lock does the work of a run. The
+    lock is a Postgres session-level advisory lock on a dedicated
+    autocommit connection, held until the block exits and released by
+    Postgres if the worker dies. Yields whether it was acquired.
+    """
+    key = _lock_key(name)
+    async with read_engine.connect() as conn:
+        acquired = await conn.scalar(select(func.pg_try_advisory_lock(key)))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.execute(select(func.pg_advisory_unlock(key)))
+
+
+async def try_job_xact_lock(db: AsyncSession, name: str) -> bool:
+    """
+    Transaction-level counterpart of job_lock, for work done in a single
+    transaction of ``db``: released when it commits or rolls back.
+    """
+    return await db.scalar(select(func.pg_try_advisory_xact_lock(_lock_key(name))))
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.jobs import job_lock, try_job_xact_lock
+from app.db.models import (
+    Inventory,
+    StockMovement,
+    StockMovementReport,
+    StockSnapshot,
+    StockTotals,
+)
+
+logger = logging.getLogger(__name__)
+
+# Movement kind -> its running total in StockSnapshot / StockTotals
+KIND_TOTALS = {
+    "receipt": "received",
+    "sale": "sold",
+    "adjustment": "adjusted",
+    "expiry": "expired",
+    "reservation": "reserved",
+}
+TOTAL_FIELDS = ("quantity", *KIND_TOTALS.values())
+
+# Products per snapshot query and insert
+_SNAPSHOT_CHUNK = 1000
+
+# (inventory_id, product_id, kind, signed quantity delta)
+Movement = Tuple[object, object, str, int]
+
+
+async def record_movements(db: AsyncSession, movements: Iterable[Movement]) -> None:
+    """Append movements to the ledger in the caller's transaction; zero deltas are skipped."""
+    rows = [
+        {
+            "inventory_id": inventory_id,
+            "product_id": product_id,
+            "kind": kind,
+            "quantity_delta": delta,
+        }
+        for inventory_id, product_id, kind, delta in movements
+        if delta
+    ]
+    if rows:
+        await db.execute(insert(StockMovement).values(rows))
+
+
+def _add_deltas(base: Dict[str, int], deltas: Iterable[Tuple[str, int]]) -> Dict[str, int]:
+    totals = dict(base)
+    for kind, delta in deltas:
+        totals[KIND_TOTALS[kind]] += delta
+        totals["quantity"] += delta
+    return totals
+
+
+def _snapshot_totals(snapshot: Optional[StockSnapshot]) -> Dict[str, int]:
+    return {field: getattr(snapshot, field) if snapshot else 0 for field in TOTAL_FIELDS}
+
+
+async def stock_totals_at(db: AsyncSession, product_id, at: datetime) -> StockTotals:
+    """
+    Ledger totals of a product as of ``at``: the latest snapshot taken by
+    then plus the movements after it, in two indexed queries.
+    """
+    snapshot_result = await db.execute(
+        select(StockSnapshot)
+        .where(StockSnapshot.product_id == product_id, StockSnapshot.taken_at <= at)
+        .order_by(StockSnapshot.taken_at.desc())
+        .limit(1)
+    )
+    snapshot = snapshot_result.scalar_one_or_none()
+
+    deltas_query = (
+        select(StockMovement.kind, func.sum(StockMovement.quantity_delta))
+        .where(StockMovement.product_id == product_id, StockMovement.created_at <= at)
+        .group_by(StockMovement.kind)
+    )
+    if snapshot is not None:
+        deltas_query = deltas_query.where(StockMovement.created_at > snapshot.taken_at)
+    deltas = (await db.execute(deltas_query)).all()
+
+    return StockTotals(**_add_deltas(_snapshot_totals(snapshot), deltas))
+
+
+async def movement_report(
+    db: AsyncSession, product_id, start: datetime, end: datetime
+) -> StockMovementReport:
+    """Totals at start and end of the period, and the movements in between per kind."""
+    opening = await stock_totals_at(db, product_id, start)
+    closing = await stock_totals_at(db, product_id, end)
+    movements = StockTotals(
+        **{field: getattr(closing, field) - getattr(opening, field) for field in TOTAL_FIELDS}
+    )
+    return StockMovementReport(
+        product_id=product_id,
+        start=start,
+        end=end,
+        opening=opening,
+        closing=closing,
+        movements=movements,
+    )
+
+
+async def take_snapshots(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """
+    Compact the movements since the previous snapshot run into a new
+    snapshot for every product that moved, and commit. Movements are only
+    covered up to STOCK_SNAPSHOT_LAG_SECONDS ago: their created_at is the
+    start of their transaction, and a transaction still open at the cutoff
+    must not commit movements behind a snapshot. Runs are serialized with
+    an advisory lock, as two runs from the same previous snapshot would
+    count its movements twice; a run that finds the lock taken does
+    nothing. Returns the number of snapshots written.
+    """
+    if not await try_job_xact_lock(db, "ledger_snapshots"):
+        await db.rollback()
+        return 0
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(
+        seconds=settings.STOCK_SNAPSHOT_LAG_SECONDS
+    )
+    previous = (await db.execute(select(func.max(StockSnapshot.taken_at)))).scalar()
+    if previous is not None and previous >= cutoff:
+        await db.rollback()
+        return 0
+
+    deltas_query = (
+        select(
+            StockMovement.product_id,
+            StockMovement.kind,
+            func.sum(StockMovement.quantity_delta),
+        )
+        .where(StockMovement.created_at <= cutoff)
+        .group_by(StockMovement.product_id, StockMovement.kind)
+    )
+    if previous is not None:
+        deltas_query = deltas_query.where(StockMovement.created_at > previous)
+    deltas: Dict[object, List[Tuple[str, int]]] = defaultdict(list)
+    for product_id, kind, delta in (await db.execute(deltas_query)).all():
+        deltas[product_id].append((kind, delta))
+
+    product_ids = list(deltas)
+    for start in range(0, len(product_ids), _SNAPSHOT_CHUNK):
+        chunk = product_ids[start : start + _SNAPSHOT_CHUNK]
+        latest_result = await db.execute(
+            select(StockSnapshot)
+            .where(StockSnapshot.product_id.in_(chunk))
+            .order_by(StockSnapshot.product_id, StockSnapshot.taken_at.desc())
+            .distinct(StockSnapshot.product_id)
+        )
+        latest = {snapshot.product_id: snapshot for snapshot in latest_result.scalars()}
+        await db.execute(
+            insert(StockSnapshot).values(
+                [
+                    {
+                        "product_id": product_id,
+                        "taken_at": cutoff,
+                        **_add_deltas(
+                            _snapshot_totals(latest.get(product_id)), deltas[product_id]
+                        ),
+                    }
+                    for product_id in chunk
+                ]
+            )
+        )
+    await db.commit()
+    return len(product_ids)
+
+
+async def write_off_expired(db: AsyncSession, today: Optional[date] = None) -> int:
+    """
+    Book the units of batches past their expiry date as expiry movements,
+    then commit. Expired batches were already left out of availability and
+    pricing; this makes the ledger say where the units went. The batches
+    keep their quantity for the seller to see: written_off_quantity tracks
+    what was booked, so units that come back later (a released hold, a
+    seller edit) are booked on the next run. Rows are locked in
+    inventory_id order, like apply_allocation. Returns the number of
+    batches written off.
+    """
+    today = today or date.today()
+    expired = (
+        select(
+            Inventory.inventory_id,
+            (Inventory.quantity - Inventory.written_off_quantity).label("unbooked"),
+        )
+        .where(
+            Inventory.expiry_date < today,
+            Inventory.quantity != Inventory.written_off_quantity,
+        )
+        .order_by(Inventory.inventory_id)
+        .with_for_update(skip_locked=True)
+        .subquery()
+    )
+    result = await db.execute(
+        update(Inventory)
+        .where(Inventory.inventory_id == expired.c.inventory_id)
+        # Bookkeeping only, not a change by the seller
+        .values(written_off_quantity=Inventory.quantity, updated_at=Inventory.updated_at)
+        .returning(Inventory.inventory_id, Inventory.product_id, expired.c.unbooked)
+        .execution_options(synchronize_session=False)
+    )
+    written_off = result.all()
+    await record_movements(
+        db,
+        (
+            (inventory_id, product_id, "expiry", -unbooked)
+            for inventory_id, product_id, unbooked in written_off
+        ),
+    )
+    await db.commit()
+    return len(written_off)
+
+
+async def run_ledger_job() -> None:
+    """
+    Background task: expiry write-offs, then snapshots, every
+    STOCK_SNAPSHOT_INTERVAL_SECONDS, in one worker at a time.
+    """
+    while True:
+        try:
+            async with job_lock("ledger") as acquired:
+                if acquired:
+                    async with AsyncSessionLocal() as db:
+                        written_off = await write_off_expired(db)
+                        snapshots = await take_snapshots(db)
+                    if written_off or snapshots:
+                        logger.info(
+                            "Wrote off %d expired batches, took %d stock snapshots",
+                            written_off,
+                            snapshots,
+                        )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Inventory ledger job failed")
+        await asyncio.sleep(settings.STOCK_SNAPSHOT_INTERVAL_SECONDS)
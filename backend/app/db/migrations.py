@@ -0,0 +1,49 @@
+from pathlib import Path
+from typing import Optional, Tuple
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from app.db.database import engine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+class SchemaRevisionMismatch(RuntimeError):
+    """The database is not migrated to the revision this code expects."""
+
+
+def expected_revision() -> str:
+    """Head revision of the migration scripts shipped with this code."""
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+async def current_revision() -> Optional[str]:
+    """Revision recorded in the database, or None if it was never migrated."""
+    async with engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        except ProgrammingError:
+            return None
+        return result.scalar_one_or_none()
+
+
+async def check_schema_revision() -> Tuple[Optional[str], str]:
+    """
+    Compare the database revision with the migration head and raise
+    SchemaRevisionMismatch if they differ. This is one indexed read,
+    unlike create_all which inspects every table.
+    """
+    expected = expected_revision()
+    current = await current_revision()
+    if current != expected:
+        raise SchemaRevisionMismatch(
+            f"Database schema is at revision {current or 'none'}, "
+            f"this build expects {expected}. Run `alembic upgrade head` "
+            f"(or `alembic stamp 0001` first for databases created by create_all)."
+        )
+    return current, expected
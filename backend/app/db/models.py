@@ -2,8 +2,9 @@ import uuid
 from datetime import datetime, date
 from typing import List, Optional, Dict, Any
 from decimal import Decimal
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, model_validator
 from sqlalchemy import (
+    BigInteger,
     Column,
     String,
     DateTime,
@@ -14,9 +15,11 @@ from sqlalchemy import (
     Date,
     ForeignKey,
     Float,
+    Index,
+    Computed,
 )
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 
 from app.db.database import Base
@@ -64,7 +67,16 @@ class Seller(Base):
     )
     seller_address = Column(Text, nullable=True)
     seller_pincode = Column(String(10), nullable=True)
-    seller_rating = Column(Float, default=0.0)
+    seller_rating = Column(Float, default=0.0)  # rating_sum / rating_count
+    # Running rating aggregates, maintained by app.db.ratings
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_histogram = Column(
+        ARRAY(Integer),
+        nullable=False,
+        default=lambda: [0] * 5,
+        server_default="{0,0,0,0,0}",
+    )  # Number of 1..5 star ratings
 
     # Relationships
     base_user = relationship("BaseUser", back_populates="seller_profile")
@@ -72,10 +84,33 @@ class Seller(Base):
     orders = relationship("Order", back_populates="seller")
     seller_ratings = relationship("SellerRating", back_populates="seller")
     bargain_rooms = relationship("BargainRoom", foreign_keys="BargainRoom.seller_id")
+    markdown_policy = relationship("MarkdownPolicy", uselist=False)
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Product search (app.db.search): full text plus trigram typo tolerance.
+        # The trigram indexes also serve the ilike category/name filters.
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_products_category_trgm",
+            "category",
+            postgresql_using="gin",
+            postgresql_ops={"category": "gin_trgm_ops"},
+        ),
+        # Keyset pagination of the product listings (newest first)
+        Index("ix_products_created_at_product_id", "created_at", "product_id"),
+        Index(
+            "ix_products_seller_id_created_at", "seller_id", "created_at", "product_id"
+        ),
+    )
 
     product_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     seller_id = Column(
@@ -84,9 +119,29 @@ class Product(Base):
     name = Column(String(255), nullable=False)
     category = Column(String(100), nullable=False)
     price = Column(Numeric(10, 2), nullable=False)
-    rating = Column(Float, default=0.0)
+    rating = Column(Float, default=0.0)  # rating_sum / rating_count
+    # Running rating aggregates, maintained by app.db.ratings
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_histogram = Column(
+        ARRAY(Integer),
+        nullable=False,
+        default=lambda: [0] * 5,
+        server_default="{0,0,0,0,0}",
+    )  # Number of 1..5 star ratings
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Maintained by Postgres; deferred so regular product loads don't fetch it
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(category, '')), 'B')",
+                persisted=True,
+            ),
+        )
+    )
 
     # Relationships
     seller = relationship("Seller", back_populates="products")
@@ -94,10 +149,18 @@ class Product(Base):
     product_ratings = relationship("ProductRating", back_populates="product")
     inventories = relationship("Inventory", back_populates="product")
     bargain_rooms = relationship("BargainRoom", back_populates="product")
+    availability = relationship(
+        "ProductAvailability", back_populates="product", uselist=False
+    )
 
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Order history for buyers and sellers
+        Index("ix_orders_buyer_id_order_date", "buyer_id", "order_date"),
+        Index("ix_orders_seller_id_order_date", "seller_id", "order_date"),
+    )
 
     order_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     buyer_id = Column(
@@ -128,6 +191,9 @@ class Order(Base):
 
 class GroupOrderParticipant(Base):
     __tablename__ = "group_order_participants"
+    __table_args__ = (
+        Index("ix_group_order_participants_order_id_buyer_id", "order_id", "buyer_id"),
+    )
 
     participant_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     order_id = Column(UUID(as_uuid=True), ForeignKey("orders.order_id"), nullable=False)
@@ -136,7 +202,7 @@ class GroupOrderParticipant(Base):
     price_share = Column(Numeric(10, 2), nullable=False)  # How much this buyer pays
     status = Column(
         String(20), default="pending"
-    )  # pending, confirmed, paid, cancelled
+    )  # pending, confirmed, paid, cancelled, expired
     joined_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
@@ -146,6 +212,7 @@ class GroupOrderParticipant(Base):
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (Index("ix_order_items_order_id", "order_id"),)
 
     order_item_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     order_id = Column(UUID(as_uuid=True), ForeignKey("orders.order_id"), nullable=False)
@@ -196,6 +263,26 @@ class SellerRating(Base):
 
 class Inventory(Base):
     __tablename__ = "inventories"
+    __table_args__ = (
+        # FIFO batch lookup: in-stock batches of a product, oldest first.
+        # Not partial, since quantity/status are bound parameters in our
+        # queries and generic plans can't prove a partial index predicate.
+        Index(
+            "ix_inventories_product_fifo",
+            "product_id",
+            "created_at",
+            "quantity",
+            "expiry_date",
+        ),
+        # Keyset pagination of a seller's own batches
+        Index(
+            "ix_inventories_user_id_created_at", "user_id", "created_at", "inventory_id"
+        ),
+        # Near-expiry batches for the surplus markdown job
+        Index("ix_inventories_expiry_date", "expiry_date"),
+        # Buyer-facing surplus feed
+        Index("ix_inventories_surplus_expiry", "is_surplus", "expiry_date"),
+    )
     inventory_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     product_id = Column(
         UUID(as_uuid=True), ForeignKey("products.product_id"), nullable=False
@@ -211,7 +298,15 @@ class Inventory(Base):
     expiry_date = Column(
         Date, nullable=True
     )  # Optional expiry date for the inventory item
-    # is_surplus = Column(Boolean, default=False)  # Marks inventory as surplus
+    # Near expiry and on offer in the surplus feed (app.db.surplus)
+    is_surplus = Column(Boolean, nullable=False, default=False, server_default="false")
+    # Markdown in percent; already folded into ``discount``, kept for display
+    surplus_discount = Column(Integer, nullable=False, default=0, server_default="0")
+    # The seller's own discount tiers while a markdown is folded into
+    # ``discount``, so it can be taken back; NULL when not marked down
+    base_discount = Column(ARRAY(Integer), nullable=True)
+    # Units of this batch booked as expired in the stock ledger (app.db.ledger)
+    written_off_quantity = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -220,8 +315,167 @@ class Inventory(Base):
     user = relationship("BaseUser", back_populates="inventories")
 
 
+class StockMovement(Base):
+    """
+    Append-only ledger of inventory quantity changes, written in the same
+    transaction as the change (app.db.ledger). Deltas are signed; per batch
+    they add up to Inventory.quantity less written_off_quantity. No foreign
+    keys, so the history outlives deleted batches and products.
+    """
+
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        Index("ix_stock_movements_product_id_created_at", "product_id", "created_at"),
+        Index("ix_stock_movements_created_at", "created_at"),
+    )
+
+    movement_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    inventory_id = Column(UUID(as_uuid=True), nullable=False)
+    product_id = Column(UUID(as_uuid=True), nullable=False)
+    kind = Column(String(20), nullable=False)  # receipt, sale, adjustment, expiry, reservation
+    quantity_delta = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class StockSnapshot(Base):
+    """
+    Per-product running totals of the ledger up to taken_at, compacted
+    periodically, so stock at a point in time is a snapshot plus the
+    movements after it.
+    """
+
+    __tablename__ = "stock_snapshots"
+    __table_args__ = (Index("ix_stock_snapshots_taken_at", "taken_at"),)
+
+    product_id = Column(UUID(as_uuid=True), primary_key=True)
+    taken_at = Column(DateTime(timezone=True), primary_key=True)
+    quantity = Column(Integer, nullable=False)
+    received = Column(Integer, nullable=False)
+    sold = Column(Integer, nullable=False)
+    adjusted = Column(Integer, nullable=False)
+    expired = Column(Integer, nullable=False)
+    reserved = Column(Integer, nullable=False)
+
+
+class MarkdownPolicy(Base):
+    """
+    A seller's markdown curve for near-expiry batches: the discount rises
+    linearly from start_discount, window_days before expiry, to end_discount
+    on the expiry date. Applied by app.db.surplus.apply_markdowns.
+    """
+
+    __tablename__ = "markdown_policies"
+
+    seller_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("sellers.user_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    enabled = Column(Boolean, nullable=False, default=True)
+    window_days = Column(Integer, nullable=False)
+    start_discount = Column(Integer, nullable=False)
+    end_discount = Column(Integer, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class ProductAvailability(Base):
+    """
+    Per-product projection of the in-stock, non-expired inventory batches.
+    Maintained by app.db.availability in the same transaction as the
+    inventory or price change, so listings can filter and sort on it.
+    """
+
+    __tablename__ = "product_availability"
+    __table_args__ = (
+        Index("ix_product_availability_quantity", "available_quantity", "product_id"),
+        Index(
+            "ix_product_availability_best_price", "best_singletime_price", "product_id"
+        ),
+    )
+
+    product_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("products.product_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    available_quantity = Column(Integer, nullable=False, default=0)
+    active_batches = Column(Integer, nullable=False, default=0)
+    # Earliest expiry among the counted batches; the row is stale after it
+    earliest_expiry = Column(Date, nullable=True)
+    # Cheapest discounted unit price per tier, NULL when out of stock
+    best_singletime_price = Column(Numeric(10, 2), nullable=True)
+    best_subscription_price = Column(Numeric(10, 2), nullable=True)
+    best_group_price = Column(Numeric(10, 2), nullable=True)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    product = relationship("Product", back_populates="availability")
+
+
+class StockHold(Base):
+    """
+    Units taken out of an inventory batch for a limited time, e.g. for a
+    participant of a pending group order. The batch quantity is decremented
+    when the hold is placed, so every availability read already excludes
+    held units. Confirming deletes the hold and keeps the decrement;
+    releasing (or expiry, see app.db.holds) puts the units back.
+    """
+
+    __tablename__ = "stock_holds"
+    __table_args__ = (
+        Index("ix_stock_holds_expires_at", "expires_at"),
+        Index("ix_stock_holds_order_id", "order_id"),
+        Index("ix_stock_holds_participant_id", "participant_id"),
+    )
+
+    hold_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    inventory_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("inventories.inventory_id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    product_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("products.product_id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    buyer_id = Column(UUID(as_uuid=True), ForeignKey("buyers.user_id"), nullable=False)
+    order_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("orders.order_id", ondelete="CASCADE"),
+        nullable=True,
+    )
+    participant_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("group_order_participants.participant_id", ondelete="CASCADE"),
+        nullable=True,
+    )
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class BargainRoom(Base):
     __tablename__ = "bargain_rooms"
+    __table_args__ = (
+        # Open public bargains, newest first, with and without a pincode filter
+        Index(
+            "ix_bargain_rooms_type_status_created_at",
+            "room_type",
+            "status",
+            "created_at",
+            "expires_at",
+        ),
+        Index(
+            "ix_bargain_rooms_type_status_pincode",
+            "room_type",
+            "status",
+            "location_pincode",
+            "created_at",
+            "expires_at",
+        ),
+    )
 
     room_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     product_id = Column(
@@ -253,6 +507,7 @@ class BargainRoom(Base):
 
 class BargainBid(Base):
     __tablename__ = "bargain_bids"
+    __table_args__ = (Index("ix_bargain_bids_room_id_created_at", "room_id", "created_at"),)
 
     bid_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     room_id = Column(
@@ -275,6 +530,9 @@ class BargainBid(Base):
 
 class BargainMessage(Base):
     __tablename__ = "bargain_messages"
+    __table_args__ = (
+        Index("ix_bargain_messages_room_id_created_at", "room_id", "created_at"),
+    )
 
     message_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     room_id = Column(
@@ -447,14 +705,24 @@ class InventoryCreate(BaseModel):
     quantity: int = Field(..., ge=0)
     discount: DiscountStructure = Field(default_factory=DiscountStructure)
     expiry_date: Optional[date] = None
-    # is_surplus: Optional[bool] = False
 
 
 class InventoryUpdate(BaseModel):
     quantity: Optional[int] = Field(None, ge=0)
     discount: Optional[DiscountStructure] = None
     expiry_date: Optional[date] = None
-    # is_surplus: Optional[bool] = None
+
+
+class PricingQuoteLine(BaseModel):
+    product_id: uuid.UUID
+    quantity: int = Field(..., gt=0)
+    purchase_type: str = Field(
+        "solo_singletime", pattern="^(solo_singletime|subscription|group)$"
+    )
+
+
+class PricingQuoteRequest(BaseModel):
+    lines: List[PricingQuoteLine] = Field(..., min_length=1, max_length=200)
 
 
 class InventoryResponse(BaseModel):
@@ -464,7 +732,8 @@ class InventoryResponse(BaseModel):
     quantity: int
     discount: DiscountStructure
     expiry_date: Optional[date]
-    # is_surplus: bool
+    is_surplus: bool = False
+    surplus_discount: int = 0
     created_at: datetime
     updated_at: Optional[datetime]
 
@@ -482,11 +751,32 @@ class InventoryResponse(BaseModel):
             quantity=inventory_orm.quantity,
             discount=discount_struct,
             expiry_date=inventory_orm.expiry_date,
+            is_surplus=inventory_orm.is_surplus,
+            surplus_discount=inventory_orm.surplus_discount,
             created_at=inventory_orm.created_at,
             updated_at=inventory_orm.updated_at,
         )
 
 
+class ProductAvailabilityResponse(BaseModel):
+    available_quantity: int
+    active_batches: int
+    earliest_expiry: Optional[date]
+    best_singletime_price: Optional[Decimal]
+    best_subscription_price: Optional[Decimal]
+    best_group_price: Optional[Decimal]
+
+    class Config:
+        from_attributes = True
+
+
+class StockLevel(BaseModel):
+    product_id: uuid.UUID
+    available_quantity: int
+    active_batches: int
+    earliest_expiry: Optional[date]
+
+
 # Fix Rating Models to match your separate tables
 class ProductRatingCreate(BaseModel):
     product_id: uuid.UUID
@@ -524,6 +814,24 @@ class SellerRatingResponse(BaseModel):
         from_attributes = True
 
 
+class RatingSummary(BaseModel):
+    average: float
+    count: int
+    histogram: Dict[int, int]  # stars -> number of ratings
+
+    @classmethod
+    def from_aggregate(
+        cls, rating_sum: int, rating_count: int, histogram: Optional[List[int]]
+    ) -> "RatingSummary":
+        """Build from the rating_sum/rating_count/rating_histogram columns"""
+        histogram = histogram or [0] * 5
+        return cls(
+            average=round(rating_sum / rating_count, 2) if rating_count else 0.0,
+            count=rating_count,
+            histogram={stars: histogram[stars - 1] for stars in range(1, 6)},
+        )
+
+
 # Update Order Models
 class OrderCreate(BaseModel):
     seller_id: uuid.UUID
@@ -625,6 +933,140 @@ class GroupOrderSummary(BaseModel):
 
 
 # Combined response models for better API responses
+class ProductSearchResult(ProductResponse):
+    rank: float
+
+
+# Bulk import (POST /product/import)
+class ProductImportRow(BaseModel):
+    """
+    One CSV/NDJSON row. Without product_id it creates a product, plus an
+    inventory batch if quantity is given; with product_id it adds a batch
+    to that existing product.
+    """
+
+    product_id: Optional[uuid.UUID] = None
+    name: Optional[str] = Field(None, min_length=1, max_length=255)
+    category: Optional[str] = Field(None, min_length=1, max_length=100)
+    price: Optional[Decimal] = Field(None, gt=0)
+    quantity: Optional[int] = Field(None, ge=0)
+    discount_singletime: float = Field(0.0, ge=0, le=100)
+    discount_subscription: float = Field(0.0, ge=0, le=100)
+    discount_group: float = Field(0.0, ge=0, le=100)
+    expiry_date: Optional[date] = None
+
+    @model_validator(mode="after")
+    def check_target(self) -> "ProductImportRow":
+        if self.product_id is None:
+            missing = [f for f in ("name", "category", "price") if getattr(self, f) is None]
+            if missing:
+                raise ValueError(f"{', '.join(missing)} required for a new product")
+        elif self.quantity is None:
+            raise ValueError("quantity required when adding stock to an existing product")
+        return self
+
+    @property
+    def discount(self) -> DiscountStructure:
+        return DiscountStructure(
+            solo_singletime=self.discount_singletime,
+            subscription=self.discount_subscription,
+            group=self.discount_group,
+        )
+
+
+# Surplus (near-expiry) stock
+class MarkdownPolicyUpdate(BaseModel):
+    enabled: bool = True
+    window_days: int = Field(..., ge=1, le=30)
+    start_discount: int = Field(..., ge=0, le=100)
+    end_discount: int = Field(..., ge=0, le=100)
+
+    @model_validator(mode="after")
+    def check_curve(self) -> "MarkdownPolicyUpdate":
+        if self.end_discount < self.start_discount:
+            raise ValueError("end_discount must be at least start_discount")
+        return self
+
+
+class MarkdownPolicyResponse(MarkdownPolicyUpdate):
+    seller_id: uuid.UUID
+    updated_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+# Inventory ledger
+class StockTotals(BaseModel):
+    """Ledger totals per movement kind; quantity is their sum."""
+
+    quantity: int = 0
+    received: int = 0
+    sold: int = 0
+    adjusted: int = 0
+    expired: int = 0
+    reserved: int = 0
+
+
+class StockAtTime(StockTotals):
+    product_id: uuid.UUID
+    at: datetime
+
+
+class StockMovementReport(BaseModel):
+    product_id: uuid.UUID
+    start: datetime
+    end: datetime
+    opening: StockTotals
+    closing: StockTotals
+    movements: StockTotals
+
+
+class SurplusFeedItem(BaseModel):
+    inventory_id: uuid.UUID
+    product_id: uuid.UUID
+    seller_id: uuid.UUID
+    product_name: str
+    category: str
+    quantity: int
+    expiry_date: date
+    surplus_discount: int
+    original_price: Decimal
+    discounted_price: Decimal
+
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ImportReport(BaseModel):
+    rows: int = 0
+    products_created: int = 0
+    inventory_batches_created: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+
+
+class CategoryFacet(BaseModel):
+    category: str
+    count: int
+    in_stock: int
+
+
+class PriceRangeFacet(BaseModel):
+    min_price: Decimal
+    max_price: Optional[Decimal]  # None for the open-ended top bucket
+    count: int
+
+
+class ProductFacetsResponse(BaseModel):
+    total_products: int
+    in_stock_products: int
+    categories: List[CategoryFacet]
+    price_ranges: List[PriceRangeFacet]
+
+
 class ProductWithInventoryResponse(BaseModel):
     product_id: uuid.UUID
     seller_id: uuid.UUID
@@ -634,6 +1076,8 @@ class ProductWithInventoryResponse(BaseModel):
     rating: float
     created_at: datetime
     inventory: Optional[InventoryResponse] = None
+    inventories: List[InventoryResponse] = []
+    availability: Optional[ProductAvailabilityResponse] = None
 
     class Config:
         from_attributes = True
@@ -689,6 +1133,35 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 
+class UserRoles(BaseModel):
+    is_buyer: bool = False
+    is_seller: bool = False
+
+    @classmethod
+    def from_user_type(cls, user_type: str) -> "UserRoles":
+        """Create from a "buyer", "seller", "both" or "none" user type"""
+        return cls(
+            is_buyer=user_type in ("buyer", "both"),
+            is_seller=user_type in ("seller", "both"),
+        )
+
+    @property
+    def user_type(self) -> str:
+        if self.is_buyer and self.is_seller:
+            return "both"
+        elif self.is_buyer:
+            return "buyer"
+        elif self.is_seller:
+            return "seller"
+        else:
+            return "none"
+
+
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str = Field(..., min_length=6)
+
+
 class UserRegister(BaseModel):
     email: EmailStr
     mobile_number: str = Field(..., min_length=10, max_length=20)
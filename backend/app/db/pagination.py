@@ -0,0 +1,100 @@
+import base64
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, literal, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"u": str(value)}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    return value
+
+
+def _load(value: Any) -> Any:
+    if isinstance(value, dict):
+        (kind, raw), = value.items()
+        return {
+            "dt": datetime.fromisoformat,
+            "d": date.fromisoformat,
+            "u": uuid.UUID,
+            "n": Decimal,
+        }[kind](raw)
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = json.dumps([_dump(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = tuple(_load(v) for v in json.loads(base64.urlsafe_b64decode(padded)))
+    except (ValueError, TypeError, KeyError):
+        values = ()
+    if len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return values
+
+
+class Keyset:
+    """
+    Keyset (cursor) pagination over a fixed sort key. The last column should
+    be the primary key so the ordering is total and stable. ``row_key``
+    returns the sort key of a loaded row; it defaults to reading the mapped
+    attributes and is only needed for SQL expressions.
+
+    Pages are requested with the opaque cursor from the previous response's
+    X-Next-Cursor header. Without a cursor, ``skip`` is still honoured so
+    existing skip/limit clients keep working, just with a stable ordering.
+    """
+
+    def __init__(
+        self,
+        *columns: ColumnElement,
+        descending: bool = True,
+        row_key: Optional[Callable[[Any], Sequence[Any]]] = None,
+    ):
+        self.columns = columns
+        self.descending = descending
+        self.row_key = row_key or (
+            lambda row: tuple(getattr(row, c.key) for c in columns)
+        )
+
+    def apply(
+        self, query: Select, cursor: Optional[str], skip: int, limit: int
+    ) -> Select:
+        order = [c.desc() if self.descending else c.asc() for c in self.columns]
+        query = query.order_by(*order)
+
+        if cursor:
+            values = decode_cursor(cursor, len(self.columns))
+            key = tuple_(*self.columns)
+            after = tuple_(*[literal(v, c.type) for v, c in zip(values, self.columns)])
+            query = query.where(key < after if self.descending else key > after)
+        else:
+            query = query.offset(skip)
+
+        return query.limit(limit)
+
+    def set_next_cursor(self, response: Response, rows: Sequence[Any], limit: int) -> None:
+        """Advertise the next page in the response headers if this one was full."""
+        if rows and len(rows) >= limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(self.row_key(rows[-1]))
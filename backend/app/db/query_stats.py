@@ -0,0 +1,123 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestQueryStats:
+    """SQL statements executed while handling one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.templates: Counter = Counter()
+
+    def repeated_templates(self, threshold: int) -> list:
+        return [(sql, n) for sql, n in self.templates.items() if n > threshold]
+
+
+class QueryStatsCollector:
+    """Per-worker totals across requests, published on /metrics."""
+
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.db_time = 0.0
+        self.max_statements = 0
+        self.n_plus_one_warnings = 0
+
+    def record(self, stats: RequestQueryStats) -> None:
+        self.requests += 1
+        self.statements += stats.count
+        self.db_time += stats.db_time
+        self.max_statements = max(self.max_statements, stats.count)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "statements": self.statements,
+            "db_time_ms": round(self.db_time * 1000, 3),
+            "avg_statements_per_request": round(
+                self.statements / self.requests, 2
+            ) if self.requests else 0.0,
+            "max_statements_per_request": self.max_statements,
+            "n_plus_one_warnings": self.n_plus_one_warnings,
+        }
+
+
+query_stats = QueryStatsCollector()
+
+# Set by QueryStatsMiddleware; SQLAlchemy's greenlets inherit the context
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None or not conn.info.get("query_started_at"):
+        return
+    stats.count += 1
+    stats.db_time += time.perf_counter() - conn.info["query_started_at"].pop()
+    stats.templates[statement] += 1
+
+
+class QueryStatsMiddleware:
+    """
+    Counts SQL statements and database time per HTTP request and returns
+    them in the X-DB-Statement-Count and X-DB-Time-Ms headers. Logs a
+    warning when a request runs the same statement more than
+    SQL_N_PLUS_ONE_THRESHOLD times, which is usually a query per row.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-statement-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.db_time * 1000:.2f}".encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            query_stats.record(stats)
+            self._warn_repeated(scope, stats)
+
+    def _warn_repeated(self, scope, stats: RequestQueryStats) -> None:
+        for sql, n in stats.repeated_templates(settings.SQL_N_PLUS_ONE_THRESHOLD):
+            query_stats.n_plus_one_warnings += 1
+            logger.warning(
+                "Possible N+1: %s %s ran the same statement %d times: %s",
+                scope["method"],
+                scope["path"],
+                n,
+                " ".join(sql.split())[:500],
+            )
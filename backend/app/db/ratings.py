@@ -0,0 +1,59 @@
+from typing import Optional
+
+from sqlalchemy import Float, cast, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Product, RatingSummary, Seller
+
+
+async def _add_to_aggregate(db: AsyncSession, model, key_column, key, average_column, stars: int) -> bool:
+    """
+    Fold one rating into the running sum, count, histogram and average of
+    the row in a single UPDATE, so concurrent ratings serialize on the row
+    lock and none are lost. Returns False if the row does not exist.
+    """
+    result = await db.execute(
+        update(model)
+        .where(key_column == key)
+        .values(
+            {
+                model.rating_sum: model.rating_sum + stars,
+                model.rating_count: model.rating_count + 1,
+                model.rating_histogram[stars]: model.rating_histogram[stars] + 1,
+                average_column: cast(model.rating_sum + stars, Float)
+                / (model.rating_count + 1),
+            }
+        )
+        .returning(key_column)
+    )
+    return result.first() is not None
+
+
+async def add_product_rating(db: AsyncSession, product_id, stars: int) -> bool:
+    return await _add_to_aggregate(
+        db, Product, Product.product_id, product_id, Product.rating, stars
+    )
+
+
+async def add_seller_rating(db: AsyncSession, seller_id, stars: int) -> bool:
+    return await _add_to_aggregate(
+        db, Seller, Seller.user_id, seller_id, Seller.seller_rating, stars
+    )
+
+
+async def _summary(db: AsyncSession, model, key_column, key) -> Optional[RatingSummary]:
+    result = await db.execute(
+        select(model.rating_sum, model.rating_count, model.rating_histogram).where(
+            key_column == key
+        )
+    )
+    row = result.first()
+    return RatingSummary.from_aggregate(*row) if row else None
+
+
+async def product_rating_summary(db: AsyncSession, product_id) -> Optional[RatingSummary]:
+    return await _summary(db, Product, Product.product_id, product_id)
+
+
+async def seller_rating_summary(db: AsyncSession, seller_id) -> Optional[RatingSummary]:
+    return await _summary(db, Seller, Seller.user_id, seller_id)
@@ -0,0 +1,155 @@
+import itertools
+import time
+from typing import AsyncGenerator, List, Optional
+
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from starlette.datastructures import Headers
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.database import ReadOnlySession, ReadSessionLocal, build_engine
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Cookie carrying the time of the client's last write (epoch milliseconds)
+LAST_WRITE_COOKIE = "last_write"
+
+
+def request_subject(headers: Headers) -> Optional[str]:
+    """
+    Token subject of a request, used only to pick a database. The signature
+    is not checked here: authentication still happens in get_current_user,
+    and a forged token can at most pin itself to the primary.
+    """
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+
+class ReplicaRouter:
+    """
+    Routes read-only sessions between the primary and the read replicas.
+
+    Replicas are used round robin. A client that wrote within the last
+    ``pin_seconds`` is pinned to the primary so it reads its own writes.
+    The pin travels with the client in the LAST_WRITE_COOKIE cookie, so it
+    holds whichever worker serves the next read. For clients that drop
+    cookies, the worker that served the write also pins the user itself.
+    """
+
+    def __init__(self, replica_urls: List[str], pin_seconds: float):
+        self.engines: List[AsyncEngine] = [build_engine(url) for url in replica_urls]
+        self._replica_sessions = [
+            async_sessionmaker(
+                engine.execution_options(isolation_level="AUTOCOMMIT"),
+                class_=ReadOnlySession,
+                expire_on_commit=False,
+            )
+            for engine in self.engines
+        ]
+        self._next_replica = itertools.cycle(range(len(self.engines)))
+        self.pin_seconds = pin_seconds
+        self._pins = TTLCache(max_size=settings.PRINCIPAL_CACHE_MAX_SIZE, ttl=pin_seconds)
+        self.primary_reads = 0
+        self.replica_reads = 0
+        self.pinned_reads = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    def pin(self, subject: str) -> None:
+        self._pins.set(subject, True)
+
+    def last_write_cookie(self) -> str:
+        """Set-Cookie value pinning the client to the primary for pin_seconds."""
+        return (
+            f"{LAST_WRITE_COOKIE}={int(time.time() * 1000)}; "
+            f"Max-Age={int(self.pin_seconds)}; Path=/; HttpOnly; SameSite=Lax"
+        )
+
+    def _recent_write(self, last_write: Optional[str]) -> bool:
+        try:
+            written_at = int(last_write) / 1000
+        except (TypeError, ValueError):
+            return False
+        return time.time() - written_at < self.pin_seconds
+
+    def sessionmaker_for(
+        self, subject: Optional[str], last_write: Optional[str] = None
+    ) -> async_sessionmaker:
+        if not self.enabled:
+            self.primary_reads += 1
+            return ReadSessionLocal
+        if self._recent_write(last_write) or (
+            subject is not None and self._pins.get(subject)
+        ):
+            self.pinned_reads += 1
+            return ReadSessionLocal
+        self.replica_reads += 1
+        return self._replica_sessions[next(self._next_replica)]
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.engines),
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "pinned_reads": self.pinned_reads,
+            "pinned_users": len(self._pins),
+            "pools": [engine.pool.stats() for engine in self.engines],
+        }
+
+
+replica_router = ReplicaRouter(settings.DB_REPLICA_URL_LIST, settings.DB_READ_YOUR_WRITES_SECONDS)
+
+
+# Dependency for listing/search endpoints that tolerate replica lag
+async def get_replica_db_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    session_factory = replica_router.sessionmaker_for(
+        request_subject(request.headers), request.cookies.get(LAST_WRITE_COOKIE)
+    )
+    async with session_factory() as session:
+        yield session
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins the caller to the primary after any successful non-GET request,
+    before the response is sent, so the client's next read sees the write:
+    the response sets the last-write cookie, and the user is pinned in
+    this worker as well.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or not replica_router.enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        subject = request_subject(Headers(scope=scope))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                if subject is not None:
+                    replica_router.pin(subject)
+                cookie = (b"set-cookie", replica_router.last_write_cookie().encode())
+                message = {**message, "headers": [*message.get("headers", []), cookie]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,46 @@
+from typing import Optional
+
+from sqlalchemy import Select, desc, func, literal_column, or_, select
+
+from app.db.models import Product
+
+# Must match the configuration of the products.search_vector column. Inlined
+# rather than bound, since asyncpg can't infer a regconfig parameter.
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+
+
+def product_search_query(
+    q: str,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+) -> Select:
+    """
+    Ranked product search. A product matches if its name/category match the
+    full-text query, or if the query is close to a word in its name
+    (pg_trgm word similarity, which is what absorbs typos). Both predicates
+    are served by GIN indexes. Rows are (Product, rank), best match first.
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = (
+        func.ts_rank_cd(Product.search_vector, ts_query)
+        + func.word_similarity(q, Product.name)
+    ).label("rank")
+
+    query = select(Product, rank).where(
+        or_(
+            Product.search_vector.op("@@")(ts_query),
+            Product.name.op("%>")(q),
+        )
+    )
+
+    if category:
+        query = query.where(Product.category.ilike(f"%{category}%"))
+
+    if min_price is not None:
+        query = query.where(Product.price >= min_price)
+
+    if max_price is not None:
+        query = query.where(Product.price <= max_price)
+
+    return query.order_by(desc(rank), Product.product_id)
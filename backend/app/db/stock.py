@@ -0,0 +1,135 @@
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import and_, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.models import Inventory, StockLevel
+
+_STAGED_KEY = "staged_stock_levels"
+
+
+async def stock_levels(db: AsyncSession, product_ids: Iterable) -> Dict[object, StockLevel]:
+    """
+    Available stock of the given products from their in-stock, non-expired
+    batches, aggregated in SQL. Products without such batches get zeroes.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+
+    result = await db.execute(
+        select(
+            Inventory.product_id,
+            func.sum(Inventory.quantity),
+            func.count(),
+            func.min(Inventory.expiry_date),
+        )
+        .where(
+            and_(
+                Inventory.product_id.in_(product_ids),
+                Inventory.quantity > 0,
+                (Inventory.expiry_date.is_(None))
+                | (Inventory.expiry_date >= date.today()),
+            )
+        )
+        .group_by(Inventory.product_id)
+    )
+    levels = {
+        product_id: StockLevel(
+            product_id=product_id,
+            available_quantity=quantity,
+            active_batches=batches,
+            earliest_expiry=earliest_expiry,
+        )
+        for product_id, quantity, batches, earliest_expiry in result.all()
+    }
+    for product_id in product_ids - levels.keys():
+        levels[product_id] = StockLevel(
+            product_id=product_id,
+            available_quantity=0,
+            active_batches=0,
+            earliest_expiry=None,
+        )
+    return levels
+
+
+class StockCache:
+    """
+    Per-product stock levels of this worker. Writes stage the levels they
+    computed (refresh_product_availability does it for every stock write)
+    and the cache takes them over once the session commits; a rollback
+    drops them. Other workers catch up within STOCK_CACHE_TTL_SECONDS.
+    An entry whose earliest batch has expired since is treated as a miss.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.generation = 0
+        self.updates = 0
+
+    def stage(self, db: AsyncSession, product_id, level: Optional[StockLevel]) -> None:
+        """Record a level (None to evict) to apply when ``db`` commits."""
+        db.sync_session.info.setdefault(_STAGED_KEY, {})[product_id] = level
+
+    def apply(self, staged: Dict[object, Optional[StockLevel]]) -> None:
+        self.generation += 1
+        for product_id, level in staged.items():
+            self.updates += 1
+            if level is None:
+                self.cache.pop(product_id)
+            else:
+                self.cache.set(product_id, level)
+
+    def _fresh(self, level: Optional[StockLevel], today: date) -> Optional[StockLevel]:
+        if level is None or (level.earliest_expiry and level.earliest_expiry < today):
+            return None
+        return level
+
+    async def get_many(self, db: AsyncSession, product_ids: Iterable) -> Dict[object, StockLevel]:
+        """Stock levels from the cache, with the misses aggregated in one query."""
+        today = date.today()
+        levels = {}
+        missing = []
+        for product_id in dict.fromkeys(product_ids):
+            level = self._fresh(self.cache.get(product_id), today)
+            if level is None:
+                missing.append(product_id)
+            else:
+                levels[product_id] = level
+
+        if missing:
+            generation = self.generation
+            loaded = await stock_levels(db, missing)
+            # A commit in between may have staged newer levels; keep those
+            if generation == self.generation:
+                for product_id, level in loaded.items():
+                    self.cache.set(product_id, level)
+            levels.update(loaded)
+        return levels
+
+    async def get(self, db: AsyncSession, product_id) -> StockLevel:
+        return (await self.get_many(db, [product_id]))[product_id]
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "updates": self.updates}
+
+
+stock_cache = StockCache(
+    max_size=settings.STOCK_CACHE_MAX_SIZE, ttl=settings.STOCK_CACHE_TTL_SECONDS
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session) -> None:
+    staged = session.info.pop(_STAGED_KEY, None)
+    if staged:
+        stock_cache.apply(staged)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(_STAGED_KEY, None)
@@ -0,0 +1,267 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from typing import List, Optional
+
+from sqlalchemy import Integer, Numeric, and_, case, cast, func, or_, select, update
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.allocation import discount_percent, discounted_price
+from app.db.availability import refresh_product_availability
+from app.db.database import AsyncSessionLocal
+from app.db.jobs import job_lock
+from app.db.models import Inventory, MarkdownPolicy, Product
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+
+# Longest markdown window a seller can configure (MarkdownPolicyUpdate)
+MAX_WINDOW_DAYS = 30
+
+
+def set_markdown(inventory: Inventory, markdown: int) -> None:
+    """Mark a batch down: each of its own discount tiers raised to at least ``markdown``."""
+    if inventory.base_discount is None:
+        inventory.base_discount = inventory.discount or [0, 0, 0]
+    inventory.surplus_discount = markdown
+    inventory.discount = [max(tier or 0, markdown) for tier in inventory.base_discount]
+
+
+def clear_markdown(inventory: Inventory) -> None:
+    """Give a marked down batch its own discount tiers back."""
+    if inventory.base_discount is not None:
+        inventory.discount = inventory.base_discount
+        inventory.base_discount = None
+    inventory.surplus_discount = 0
+
+
+async def reset_markdowns(db: AsyncSession, seller_id) -> None:
+    """
+    Take back the markdowns of a seller's batches, e.g. after the seller
+    changed their policy; the next apply_markdowns() marks them down along
+    the new curve. Batches stay flagged as surplus.
+    """
+    marked_down = (
+        select(Inventory.inventory_id)
+        .where(Inventory.user_id == seller_id, Inventory.base_discount.isnot(None))
+        .order_by(Inventory.inventory_id)
+        .with_for_update()
+        .subquery()
+    )
+    result = await db.execute(
+        update(Inventory)
+        .where(Inventory.inventory_id == marked_down.c.inventory_id)
+        .values(discount=Inventory.base_discount, base_discount=None, surplus_discount=0)
+        .returning(Inventory.product_id)
+        .execution_options(synchronize_session=False)
+    )
+    await refresh_product_availability(db, *result.scalars().all())
+
+
+async def apply_markdowns(
+    db: AsyncSession, today: Optional[date] = None, seller_id=None
+) -> int:
+    """
+    Flag the in-stock batches that entered their markdown window as surplus
+    and mark them down along their seller's curve, in one UPDATE. Sellers
+    without an enabled policy get their batches flagged SURPLUS_WINDOW_DAYS before
+    expiry with no markdown. A markdown raises each of the batch's own
+    discount tiers (kept in base_discount) to at least the markdown, and
+    a run never lowers the markdown already in place, so repeated runs are
+    idempotent. Candidates are found through ix_inventories_expiry_date and
+    locked in inventory_id order, like apply_allocation, so a run can't
+    deadlock with orders. Returns the number of batches changed.
+    """
+    today = today or date.today()
+    days_left = Inventory.expiry_date - today
+    window = case(
+        (MarkdownPolicy.enabled.is_(True), MarkdownPolicy.window_days),
+        else_=settings.SURPLUS_WINDOW_DAYS,
+    )
+    markdown = case(
+        (
+            MarkdownPolicy.enabled.is_(True),
+            cast(
+                func.round(
+                    MarkdownPolicy.start_discount
+                    + (MarkdownPolicy.end_discount - MarkdownPolicy.start_discount)
+                    * cast(MarkdownPolicy.window_days - days_left, Numeric)
+                    / MarkdownPolicy.window_days
+                ),
+                Integer,
+            ),
+        ),
+        else_=0,
+    )
+
+    longest_window = max(MAX_WINDOW_DAYS, settings.SURPLUS_WINDOW_DAYS)
+    candidates = (
+        select(Inventory.inventory_id, markdown.label("markdown"))
+        .outerjoin(MarkdownPolicy, MarkdownPolicy.seller_id == Inventory.user_id)
+        .where(
+            and_(
+                Inventory.expiry_date >= today,
+                Inventory.expiry_date <= today + timedelta(days=longest_window),
+                Inventory.quantity > 0,
+                days_left <= window,
+            )
+        )
+        .order_by(Inventory.inventory_id)
+        .with_for_update(of=Inventory)
+    )
+    if seller_id is not None:
+        candidates = candidates.where(Inventory.user_id == seller_id)
+    candidates = candidates.subquery()
+    new_markdown = func.greatest(Inventory.surplus_discount, candidates.c.markdown)
+    base = func.coalesce(Inventory.base_discount, Inventory.discount)
+    marked_down = [
+        func.greatest(func.coalesce(base[tier], 0), new_markdown) for tier in (1, 2, 3)
+    ]
+
+    result = await db.execute(
+        update(Inventory)
+        .where(
+            Inventory.inventory_id == candidates.c.inventory_id,
+            or_(
+                Inventory.is_surplus.is_(False),
+                candidates.c.markdown > Inventory.surplus_discount,
+            ),
+        )
+        .values(
+            is_surplus=True,
+            surplus_discount=new_markdown,
+            base_discount=base,
+            discount=array(marked_down),
+        )
+        .returning(Inventory.product_id)
+        .execution_options(synchronize_session=False)
+    )
+    product_ids = result.scalars().all()
+    await refresh_product_availability(db, *product_ids)
+    await db.commit()
+    return len(product_ids)
+
+
+async def build_surplus_feed(db: AsyncSession) -> List[dict]:
+    """
+    In-stock surplus batches with their product, soonest expiry first, as
+    SurplusFeedItem rows. Capped at SURPLUS_FEED_MAX_ITEMS.
+    """
+    today = date.today()
+    result = await db.execute(
+        select(
+            Inventory.inventory_id,
+            Inventory.product_id,
+            Inventory.user_id,
+            Product.name,
+            Product.category,
+            Inventory.quantity,
+            Inventory.expiry_date,
+            Inventory.surplus_discount,
+            Product.price,
+            Inventory.discount,
+        )
+        .join(Product, Product.product_id == Inventory.product_id)
+        .where(
+            and_(
+                Inventory.is_surplus.is_(True),
+                Inventory.expiry_date >= today,
+                Inventory.quantity > 0,
+            )
+        )
+        .order_by(
+            Inventory.expiry_date,
+            Inventory.surplus_discount.desc(),
+            Inventory.inventory_id,
+        )
+        .limit(settings.SURPLUS_FEED_MAX_ITEMS)
+    )
+    return [
+        {
+            "inventory_id": row.inventory_id,
+            "product_id": row.product_id,
+            "seller_id": row.user_id,
+            "product_name": row.name,
+            "category": row.category,
+            "quantity": row.quantity,
+            "expiry_date": row.expiry_date,
+            "surplus_discount": row.surplus_discount,
+            "original_price": row.price,
+            "discounted_price": discounted_price(
+                row.price, discount_percent(row.discount, "solo_singletime", False)
+            ).quantize(CENT, rounding=ROUND_HALF_UP),
+        }
+        for row in result.all()
+    ]
+
+
+class SurplusFeed:
+    """
+    The buyer-facing surplus feed of this worker, rebuilt after every
+    markdown run so requests only filter and slice a list. Seller changes
+    made through this worker call mark_stale() and the next request
+    rebuilds it; other workers pick them up on their next run.
+    """
+
+    def __init__(self):
+        self.rows: Optional[List[dict]] = None
+        self.built_at: Optional[datetime] = None
+        self.rebuilds = 0
+        self._lock = asyncio.Lock()
+
+    def mark_stale(self) -> None:
+        self.rows = None
+
+    async def refresh(self, db: AsyncSession) -> List[dict]:
+        rows = await build_surplus_feed(db)
+        self.rows = rows
+        self.built_at = datetime.now(timezone.utc)
+        self.rebuilds += 1
+        return rows
+
+    async def get(self, db: AsyncSession) -> List[dict]:
+        rows = self.rows
+        if rows is not None:
+            return rows
+        # One rebuild at a time; waiters reuse its result
+        async with self._lock:
+            if self.rows is not None:
+                return self.rows
+            return await self.refresh(db)
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self.rows) if self.rows is not None else None,
+            "built_at": self.built_at.isoformat() if self.built_at else None,
+            "rebuilds": self.rebuilds,
+        }
+
+
+surplus_feed = SurplusFeed()
+
+
+async def run_surplus_job() -> None:
+    """
+    Background task: markdowns in one worker at a time, then a rebuild of
+    this worker's feed, every SURPLUS_JOB_INTERVAL_SECONDS.
+    """
+    while True:
+        try:
+            changed = 0
+            async with job_lock("surplus_markdowns") as acquired:
+                if acquired:
+                    async with AsyncSessionLocal() as db:
+                        changed = await apply_markdowns(db)
+            async with AsyncSessionLocal() as db:
+                await surplus_feed.refresh(db)
+            if changed:
+                logger.info("Marked down %d surplus batches", changed)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Surplus markdown job failed")
+        await asyncio.sleep(settings.SURPLUS_JOB_INTERVAL_SECONDS)
@@ -1,33 +1,82 @@
+import time
+_started_at = time.perf_counter()
+
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+
+_settings_started_at = time.perf_counter()
 from app.core.config import settings
-from app.db.database import create_tables, close_db_connection
+_settings_loaded_at = time.perf_counter()
+
+from app.core.password import password_service
+from app.core.responses import FastJSONResponse
+from app.db.availability import run_availability_sweeper
+from app.db.database import close_db_connection
+from app.db.holds import run_hold_sweeper
+from app.db.ledger import run_ledger_job
+from app.db.surplus import run_surplus_job
+from app.db.migrations import check_schema_revision
+from app.db.routing import ReadYourWritesMiddleware, replica_router
+from app.db.query_stats import QueryStatsMiddleware
 from app.api.api import api_router_v1
 
 # Import LLM dependencies
 # from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from dotenv import load_dotenv
 
+# Startup phases in milliseconds, printed once the server is ready
+startup_timings = {
+    "settings": (_settings_loaded_at - _settings_started_at) * 1000,
+    "imports": (time.perf_counter() - _started_at) * 1000,
+}
+
+
+def print_startup_report():
+    print("Startup time report:")
+    for phase, elapsed_ms in startup_timings.items():
+        print(f"  {phase:<16} {elapsed_ms:8.1f} ms")
+    print(f"  {'total':<16} {(time.perf_counter() - _started_at) * 1000:8.1f} ms")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("--- Starting FastAPI Server with PostgreSQL Integration ---")
-    await create_tables()
-    print("Database tables created successfully")
+    # Schema changes are applied with `alembic upgrade head`, not at startup.
+    # The revision check opens the first pooled connection and fails fast
+    # if this build and the database disagree.
+    if settings.DB_CHECK_MIGRATIONS:
+        warmup_started_at = time.perf_counter()
+        revision, _ = await check_schema_revision()
+        startup_timings["engine warm-up"] = (time.perf_counter() - warmup_started_at) * 1000
+        print(f"Database schema is at revision {revision}")
+    print_startup_report()
+    # Keeps the product availability projection current as batches expire
+    availability_sweeper = asyncio.create_task(run_availability_sweeper())
+    hold_sweeper = asyncio.create_task(run_hold_sweeper())
+    surplus_job = asyncio.create_task(run_surplus_job())
+    ledger_job = asyncio.create_task(run_ledger_job())
     yield
     # Shutdown
     print("--- Shutting down FastAPI Server ---")
+    availability_sweeper.cancel()
+    hold_sweeper.cancel()
+    surplus_job.cancel()
+    ledger_job.cancel()
     await close_db_connection()
+    await replica_router.dispose()
     print("Database connection closed")
+    password_service.shutdown()
 
 app = FastAPI(
     title="Saathi E-commerce Backend API",
     description="E-commerce platform backend with PostgreSQL",
     version="1.0.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json" if hasattr(settings, 'API_V1_STR') else "/api/v1/openapi.json",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 app.add_middleware(
     CORSMiddleware,
@@ -42,10 +91,16 @@ app.add_middleware(
     allow_credentials=True,  # Enable credentials for specific origins
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Statement-Count", "X-DB-Time-Ms", "X-Next-Cursor"],
 )
 
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+
 API_V1_PREFIX = "/api/v1"
 
+_routers_started_at = time.perf_counter()
 app.include_router(api_router_v1, prefix=API_V1_PREFIX)
+startup_timings["routers"] = (time.perf_counter() - _routers_started_at) * 1000
 
 
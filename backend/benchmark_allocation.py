@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the allocation engine (app/db/allocation.py). No
+database is needed; stock is generated in memory:
+
+    python benchmark_allocation.py
+
+Each scenario times allocate() against the per-batch DiscountStructure
+pricing the endpoints used before, after checking both price the same.
+"""
+import random
+import sys
+import timeit
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.db.allocation import (
+    GROUP_PURCHASE_MIN_QUANTITY,
+    StockBatch,
+    StockProduct,
+    allocate,
+)
+from app.db.models import DiscountStructure
+
+# (description, products, batches per product, items per order)
+SCENARIOS = [
+    ("single item, few batches", 1, 3, 1),
+    ("single item, many batches", 1, 200, 1),
+    ("typical order", 10, 5, 10),
+    ("large order", 200, 20, 200),
+]
+
+
+def make_stock(n_products: int, n_batches: int, rng: random.Random) -> dict:
+    products = {}
+    for _ in range(n_products):
+        product = StockProduct(uuid.uuid4(), "product", Decimal(rng.randint(100, 10000)) / 100)
+        for b in range(n_batches):
+            product.batches.append(
+                StockBatch(
+                    uuid.uuid4(),
+                    product.product_id,
+                    rng.randint(1, 50),
+                    [rng.choice([0.0, 5.0, 10.0, 12.5]) for _ in range(3)],
+                    date.today() + timedelta(days=b),
+                )
+            )
+        products[product.product_id] = product
+    return products
+
+
+def make_items(products: dict, n_items: int, rng: random.Random) -> list:
+    ids = list(products)
+    items = []
+    for i in range(n_items):
+        product = products[ids[i % len(ids)]]
+        # Deep enough to span several batches
+        items.append((product.product_id, max(1, product.available // 2)))
+    rng.shuffle(items)
+    return items
+
+
+def baseline(products: dict, items: list, purchase_type: str = "solo_singletime") -> Decimal:
+    """FIFO pricing as the endpoints did it, one DiscountStructure per batch."""
+    total = Decimal("0.00")
+    for product_id, quantity in items:
+        product = products[product_id]
+        is_group = quantity > GROUP_PURCHASE_MIN_QUANTITY
+        remaining = quantity
+        for batch in product.batches:
+            if remaining <= 0:
+                break
+            take = min(remaining, batch.quantity)
+            discount_struct = DiscountStructure.from_array(batch.discount)
+            price = discount_struct.calculate_discounted_price(
+                product.price, purchase_type, is_group
+            )
+            total += price * take
+            remaining -= take
+    return total
+
+
+def run() -> bool:
+    rng = random.Random(42)
+    ok = True
+    print(f"{'scenario':<28} {'allocate':>12} {'baseline':>12} {'speedup':>8}")
+
+    for description, n_products, n_batches, n_items in SCENARIOS:
+        products = make_stock(n_products, n_batches, rng)
+        items = make_items(products, n_items, rng)
+
+        engine_total = allocate(products, items).discounted_total
+        baseline_total = baseline(products, items)
+        if engine_total != baseline_total:
+            ok = False
+            print(f"❌ {description}: allocate() {engine_total} != baseline {baseline_total}")
+            continue
+
+        timer = timeit.Timer(lambda: allocate(products, items))
+        number, _ = timer.autorange()
+        engine_us = min(timer.repeat(5, number)) / number * 1e6
+
+        timer = timeit.Timer(lambda: baseline(products, items))
+        number, _ = timer.autorange()
+        baseline_us = min(timer.repeat(5, number)) / number * 1e6
+
+        print(
+            f"{description:<28} {engine_us:>10.1f}us {baseline_us:>10.1f}us "
+            f"{baseline_us / engine_us:>7.1f}x"
+        )
+
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
@@ -1,7 +1,11 @@
 import asyncio
 import asyncpg
+from alembic import command
+from alembic.config import Config
 from app.core.config import settings
-from app.db.database import engine, Base
+from app.db.database import Base
+from app.db import models  # noqa: F401
+from app.db.migrations import ALEMBIC_INI
 
 async def reset_database():
     """Drop all tables and recreate them with the new schema"""
@@ -20,9 +24,8 @@ async def reset_database():
     try:
         # Drop all tables (in reverse order due to foreign key constraints)
         tables_to_drop = [
-            "ratings", "order_items", "orders", "inventories", 
-            "products", "sellers", "buyers", "base_users"
-        ]
+            table.name for table in reversed(Base.metadata.sorted_tables)
+        ] + ["alembic_version"]
         
         for table in tables_to_drop:
             try:
@@ -36,9 +39,8 @@ async def reset_database():
     finally:
         await conn.close()
     
-    # Recreate all tables using SQLAlchemy
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Recreate all tables by running the migrations
+    await asyncio.to_thread(command.upgrade, Config(str(ALEMBIC_INI)), "head")
     
     print("✅ Database schema recreated successfully!")
     print("🎉 Your database is now ready with the new schema")
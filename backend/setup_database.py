@@ -49,7 +49,7 @@ async def setup_database():
         print("🎉 Database setup completed successfully!")
         print("\n📝 Next steps:")
         print("1. Update your .env file to use POSTGRES_DB=saathi")
-        print("2. Run your FastAPI server to create the tables")
+        print("2. Run `alembic upgrade head` to create the tables")
         
     except Exception as e:
         print(f"❌ Database setup failed: {type(e).__name__}: {e}")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Stress test for concurrent stock decrements (app.db.allocation.reserve_items).
+Run against a migrated database (alembic upgrade head):
+
+    python stress_test_stock.py [--orders 500] [--stock 300]
+
+Creates a throwaway seller with one product spread over a few batches, then
+fires many concurrent orders for it, each in its own session and
+transaction, like create_order does. Passes if no batch went negative and
+the units sold match exactly what left the batches. Everything it created
+is deleted afterwards.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import delete, func, select
+
+from app.db.allocation import InsufficientStock, StockConflict, reserve_items
+from app.db.database import AsyncSessionLocal, engine
+from app.db.models import (
+    BaseUser,
+    Inventory,
+    Product,
+    Seller,
+    StockMovement,
+    StockSnapshot,
+)
+
+BATCHES = 4
+
+
+async def create_fixture(stock: int) -> tuple:
+    seller_id = uuid.uuid4()
+    product_id = uuid.uuid4()
+    tag = seller_id.hex[:12]
+
+    async with AsyncSessionLocal() as db:
+        db.add(
+            BaseUser(
+                user_id=seller_id,
+                email=f"stress-{tag}@example.com",
+                mobile_number=f"+00{tag}",
+                password_hash="-",
+            )
+        )
+        await db.flush()
+        db.add(Seller(user_id=seller_id))
+        await db.flush()
+        db.add(
+            Product(
+                product_id=product_id,
+                seller_id=seller_id,
+                name="Stress test product",
+                category="stress-test",
+                price=Decimal("10.00"),
+            )
+        )
+        await db.flush()
+        for b in range(BATCHES):
+            share = stock // BATCHES + (1 if b < stock % BATCHES else 0)
+            db.add(
+                Inventory(
+                    product_id=product_id,
+                    user_id=seller_id,
+                    quantity=share,
+                    discount=[0.0, 0.0, 0.0],
+                )
+            )
+        await db.commit()
+
+    return seller_id, product_id
+
+
+async def delete_fixture(seller_id, product_id) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Inventory).where(Inventory.product_id == product_id))
+        # The ledger has no foreign keys to cascade from
+        await db.execute(delete(StockMovement).where(StockMovement.product_id == product_id))
+        await db.execute(delete(StockSnapshot).where(StockSnapshot.product_id == product_id))
+        await db.execute(delete(Product).where(Product.product_id == product_id))
+        await db.execute(delete(Seller).where(Seller.user_id == seller_id))
+        await db.execute(delete(BaseUser).where(BaseUser.user_id == seller_id))
+        await db.commit()
+
+
+async def place_order(seller_id, product_id, quantity: int, outcomes: dict) -> None:
+    async with AsyncSessionLocal() as db:
+        try:
+            await reserve_items(db, [(product_id, quantity)], seller_id=seller_id)
+            # Hold the row locks a little, like create_order inserting the order
+            await asyncio.sleep(random.uniform(0, 0.002))
+            await db.commit()
+        except InsufficientStock:
+            await db.rollback()
+            outcomes["out_of_stock"] += 1
+            return
+        except StockConflict:
+            await db.rollback()
+            outcomes["conflicts"] += 1
+            return
+
+    outcomes["orders"] += 1
+    outcomes["units"] += quantity
+
+
+async def run(n_orders: int, stock: int) -> bool:
+    seller_id, product_id = await create_fixture(stock)
+    outcomes = {"orders": 0, "units": 0, "out_of_stock": 0, "conflicts": 0}
+
+    try:
+        await asyncio.gather(
+            *(
+                place_order(seller_id, product_id, random.randint(1, 5), outcomes)
+                for _ in range(n_orders)
+            )
+        )
+
+        async with AsyncSessionLocal() as db:
+            quantities = (
+                await db.execute(
+                    select(Inventory.quantity).where(Inventory.product_id == product_id)
+                )
+            ).scalars().all()
+            remaining = (
+                await db.execute(
+                    select(func.sum(Inventory.quantity)).where(
+                        Inventory.product_id == product_id
+                    )
+                )
+            ).scalar()
+    finally:
+        await delete_fixture(seller_id, product_id)
+        await engine.dispose()
+
+    print(
+        f"{n_orders} orders against {stock} units: {outcomes['orders']} placed "
+        f"({outcomes['units']} units), {outcomes['out_of_stock']} out of stock, "
+        f"{outcomes['conflicts']} gave up on contention, {remaining} units left"
+    )
+
+    ok = True
+    if min(quantities) < 0:
+        ok = False
+        print(f"❌ A batch went negative: {quantities}")
+    if outcomes["units"] + remaining != stock:
+        ok = False
+        print(f"❌ Oversold: {outcomes['units']} units sold + {remaining} left != {stock}")
+    if ok:
+        print("✅ No oversell")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=300)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.orders, args.stock)) else 1)
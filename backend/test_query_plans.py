@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Check that the hot query predicates are served by the indexes from the
+migrations. Run against a migrated database (alembic upgrade head):
+
+    python test_query_plans.py
+
+Sequential scans are disabled for the session so the check is meaningful on
+small or empty development databases.
+"""
+import asyncio
+import json
+import sys
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import and_, desc, or_, select, text
+
+from app.db.database import engine
+from app.db.models import (
+    BargainBid,
+    BargainMessage,
+    BargainRoom,
+    GroupOrderParticipant,
+    Inventory,
+    Order,
+    OrderItem,
+    Product,
+    ProductAvailability,
+    StockHold,
+    StockMovement,
+    StockSnapshot,
+)
+from app.api.endpoints.inventory import INVENTORY_KEYSET
+from app.api.endpoints.product import PRODUCT_KEYSET
+from app.db.pagination import encode_cursor
+from app.db.search import product_search_query
+
+SOME_ID = uuid.uuid4()
+TODAY = date.today()
+NOW = datetime.utcnow()
+
+# (description, statement, index expected in the plan)
+CHECKS = [
+    (
+        "FIFO inventory batches",
+        select(Inventory)
+        .where(
+            and_(
+                Inventory.product_id == SOME_ID,
+                Inventory.quantity > 0,
+                (Inventory.expiry_date.is_(None)) | (Inventory.expiry_date >= TODAY),
+            )
+        )
+        .order_by(Inventory.created_at.asc()),
+        "ix_inventories_product_fifo",
+    ),
+    (
+        "Open public bargains",
+        select(BargainRoom)
+        .where(
+            and_(
+                BargainRoom.room_type == "public",
+                BargainRoom.status == "active",
+                BargainRoom.expires_at > NOW,
+            )
+        )
+        .order_by(desc(BargainRoom.created_at))
+        .limit(20),
+        "ix_bargain_rooms_type_status_created_at",
+    ),
+    (
+        "Open public bargains by pincode",
+        select(BargainRoom)
+        .where(
+            and_(
+                BargainRoom.room_type == "public",
+                BargainRoom.status == "active",
+                BargainRoom.expires_at > NOW,
+                BargainRoom.location_pincode == "110001",
+            )
+        )
+        .order_by(desc(BargainRoom.created_at))
+        .limit(20),
+        "ix_bargain_rooms_type_status_pincode",
+    ),
+    (
+        "Recent bids in a room",
+        select(BargainBid)
+        .where(BargainBid.room_id == SOME_ID)
+        .order_by(desc(BargainBid.created_at))
+        .limit(10),
+        "ix_bargain_bids_room_id_created_at",
+    ),
+    (
+        "Recent messages in a room",
+        select(BargainMessage)
+        .where(BargainMessage.room_id == SOME_ID)
+        .order_by(desc(BargainMessage.created_at))
+        .limit(20),
+        "ix_bargain_messages_room_id_created_at",
+    ),
+    (
+        "Items of an order",
+        select(OrderItem).where(OrderItem.order_id == SOME_ID),
+        "ix_order_items_order_id",
+    ),
+    (
+        "Participant of a group order",
+        select(GroupOrderParticipant).where(
+            and_(
+                GroupOrderParticipant.order_id == SOME_ID,
+                GroupOrderParticipant.buyer_id == SOME_ID,
+            )
+        ),
+        "ix_group_order_participants_order_id_buyer_id",
+    ),
+    (
+        "Buyer order history",
+        select(Order).where(Order.buyer_id == SOME_ID).order_by(desc(Order.order_date)),
+        "ix_orders_buyer_id_order_date",
+    ),
+    (
+        "Seller order history",
+        select(Order).where(Order.seller_id == SOME_ID).order_by(desc(Order.order_date)),
+        "ix_orders_seller_id_order_date",
+    ),
+    (
+        "Order history for users who buy and sell",
+        select(Order).where(or_(Order.buyer_id == SOME_ID, Order.seller_id == SOME_ID)),
+        "ix_orders_buyer_id_order_date",
+    ),
+    (
+        "Product search",
+        product_search_query("tomatos", min_price=10, max_price=50).limit(20),
+        "ix_products_search_vector",
+    ),
+    (
+        "Product search typo tolerance",
+        product_search_query("tomatos").limit(20),
+        "ix_products_name_trgm",
+    ),
+    (
+        "Product category filter",
+        select(Product).where(Product.category.ilike("%veg%")).limit(10),
+        "ix_products_category_trgm",
+    ),
+    (
+        "Product listing, deep page",
+        PRODUCT_KEYSET.apply(select(Product), encode_cursor([NOW, SOME_ID]), 0, 10),
+        "ix_products_created_at_product_id",
+    ),
+    (
+        "Seller product listing, deep page",
+        PRODUCT_KEYSET.apply(
+            select(Product).where(Product.seller_id == SOME_ID),
+            encode_cursor([NOW, SOME_ID]),
+            0,
+            10,
+        ),
+        "ix_products_seller_id_created_at",
+    ),
+    (
+        "Seller inventory listing, deep page",
+        INVENTORY_KEYSET.apply(
+            select(Inventory).where(Inventory.user_id == SOME_ID),
+            encode_cursor([NOW, SOME_ID]),
+            0,
+            100,
+        ),
+        "ix_inventories_user_id_created_at",
+    ),
+    (
+        "Products by best price",
+        select(Product)
+        .join(Product.availability)
+        .where(ProductAvailability.best_singletime_price.is_not(None))
+        .order_by(ProductAvailability.best_singletime_price, Product.product_id)
+        .limit(10),
+        "ix_product_availability_best_price",
+    ),
+    (
+        "Products by availability",
+        select(Product)
+        .join(Product.availability)
+        .order_by(desc(ProductAvailability.available_quantity), desc(Product.product_id))
+        .limit(10),
+        "ix_product_availability_quantity",
+    ),
+    (
+        "Expired stock holds",
+        select(StockHold.hold_id)
+        .where(StockHold.expires_at <= NOW)
+        .order_by(StockHold.expires_at)
+        .limit(500),
+        "ix_stock_holds_expires_at",
+    ),
+    (
+        "Near-expiry batches for markdowns",
+        select(Inventory.inventory_id).where(
+            and_(Inventory.expiry_date >= TODAY, Inventory.expiry_date <= TODAY)
+        ),
+        "ix_inventories_expiry_date",
+    ),
+    (
+        "Surplus feed",
+        select(Inventory)
+        .where(and_(Inventory.is_surplus.is_(True), Inventory.expiry_date >= TODAY))
+        .order_by(Inventory.expiry_date),
+        "ix_inventories_surplus_expiry",
+    ),
+    (
+        "Ledger movements of a product since its snapshot",
+        select(StockMovement.kind, StockMovement.quantity_delta).where(
+            and_(
+                StockMovement.product_id == SOME_ID,
+                StockMovement.created_at > NOW,
+                StockMovement.created_at <= NOW,
+            )
+        ),
+        "ix_stock_movements_product_id_created_at",
+    ),
+    (
+        "Ledger movements to compact into snapshots",
+        select(StockMovement.product_id, StockMovement.quantity_delta).where(
+            and_(StockMovement.created_at > NOW, StockMovement.created_at <= NOW)
+        ),
+        "ix_stock_movements_created_at",
+    ),
+    (
+        "Latest stock snapshot of a product",
+        select(StockSnapshot)
+        .where(and_(StockSnapshot.product_id == SOME_ID, StockSnapshot.taken_at <= NOW))
+        .order_by(StockSnapshot.taken_at.desc())
+        .limit(1),
+        "stock_snapshots_pkey",
+    ),
+]
+
+
+def plan_indexes(node: dict) -> set:
+    """Collect every index name used anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    found = {node["Index Name"]} if "Index Name" in node else set()
+    for child in node.get("Plans", []):
+        found |= plan_indexes(child)
+    return found
+
+
+async def check_query_plans() -> bool:
+    dialect = engine.dialect  # asyncpg: no %-escaping in the rendered SQL
+    ok = True
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SET enable_seqscan = off"))
+
+        for description, statement, expected in CHECKS:
+            sql = str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = result.scalar()
+            if isinstance(plan, str):  # asyncpg returns json columns undecoded
+                plan = json.loads(plan)
+            used = plan_indexes(plan[0]["Plan"])
+
+            if expected in used:
+                print(f"✅ {description}: {expected}")
+            else:
+                ok = False
+                print(f"❌ {description}: expected {expected}, plan used {sorted(used) or 'no index'}")
+
+    await engine.dispose()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(check_query_plans()) else 1)
@@ -7,6 +7,8 @@ const API_BASE_URL = "http://localhost:8000/api/v1";
 // Create axios instance
 const api = axios.create({
   baseURL: API_BASE_URL,
+  // Send the API's cookies back (the read-your-writes pin)
+  withCredentials: true,
   headers: {
     "Content-Type": "application/json",
   },